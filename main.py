@@ -1,14 +1,27 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-import zipfile
 import io
 import json
 from datetime import datetime
-from scipy import stats
 from scipy.interpolate import interp1d
 from streamlit_echarts import st_echarts
 from scripts.man import exibir_manual_completo
+from scripts.calibracao import MotorCalibracao, MemoLRU, DADOS_BANCADA_PADRAO, valores_padrao
+from scripts.pacote_lamp import PacoteLamp, arquivos_lamp
+from scripts.lote import configuracao_bancada, configuracao_para_json
+from scripts.espectros import carregar_biblioteca
+from scripts.fix_spectra_interpolate import fix_file
+from scripts.importacao import importar_espectro, PASSO_CANONICO
+from scripts.graficos import (aplicar_perfil_grande, conjunto_dados, conjuntos_dados,
+                              grafico_grande, impressao_digital, pontos, serie_dataset,
+                              PONTOS_POR_GRAFICO)
+from scripts.picos import analisar_picos, picos_como_lista
+from scripts.bandas import CONJUNTOS_BANDAS, calcular_pfd, pfd_como_dicionario, rotulo_banda
+from scripts.inversao import resolver_alvos, GRANDEZAS_ALVO
+from scripts.mistura import limites_mistura, resolver_mistura, resolver_misturas
+from scripts.varredura import (faixa_varredura, parametros_varredura, rotulo_varredura,
+                               varrer_parametros, METRICAS_VARREDURA)
 
 # Configurar página
 # Configuração básica da página
@@ -63,345 +76,33 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-class SistemaCalibracao:
+class SistemaCalibracao(MotorCalibracao):
+    """Adapta o motor de calibração ao st.session_state das páginas"""
+
     def __init__(self):
         self.inicializar_dados()
 
     def inicializar_dados(self):
         """Inicializa ou carrega os dados da sessão"""
-        if 'dados_bancada' not in st.session_state:
-            st.session_state.dados_bancada = {
-                'azul': {
-                    'dados': np.array([
-                        [24.86, 29.3, 27.6, 22.53, 29.51],
-                        [76.45, 74.32, 73.75, 58.78, 66.12],
-                        [114.8, 106.9, 114.6, 102.9, 100.9],
-                        [135.5, 127.1, 138.0, 120.2, 119.8],
-                        [175.7, 177.0, 164.1, 145.0, 170.0]
-                    ]).T,
-                    'valores_referencia': np.array([0, 0.3, 0.5, 0.7, 1.0])
-                },
-                'vermelho': {
-                    'dados': np.array([
-                        [58.12, 57.3, 54.3, 55.9, 52.0],
-                        [143.9, 168.3, 160.4, 147.6, 158.1],
-                        [235.3, 227.2, 198.0, 233.5, 224.5],
-                        [279.5, 293.3, 272.2, 302.7, 281.7],
-                        [360.5, 354.2, 407.3, 398.5, 367.8]
-                    ]).T,
-                    'valores_referencia': np.array([0, 0.3, 0.5, 0.7, 1.0])
-                },
-                'branco': {
-                    'dados': np.array([
-                        [20.61, 24.51, 24.24, 22.42, 23.14],
-                        [62.13, 67.69, 58.93, 59.12, 55.09],
-                        [69.18, 92.19, 91.02, 86.68, 84.73],
-                        [109.8, 104.6, 117.0, 113.7, 110.3],
-                        [120.8, 150.9, 143.3, 130.7, 143.9]
-                    ]).T,
-                    'valores_referencia': np.array([0, 0.3, 0.5, 0.7, 1.0])
-                }
-            }
-
-        if 'parametros_canais' not in st.session_state:
-            st.session_state.parametros_canais = {
-                'intensidade_max_total': 650.0,
-                'intensidade_min_total': 120.0,
-                'proporcao_azul': 1.0,
-                'proporcao_vermelho': 1.0,
-                'proporcao_branco': 1.0
-            }
-
-        if 'parametros_gaussianos' not in st.session_state:
-            st.session_state.parametros_gaussianos = {
-                'canal_vermelho': {'sigma': 0.30, 'mi': 0.5},
-                'canal_azul': {'sigma': 0.30, 'mi': -0.5},
-                'canal_branco': {'sigma': 0.30, 'mi': 0.0}
-            }
-
-        if 'parametros_temporais' not in st.session_state:
-            st.session_state.parametros_temporais = {
-                'hora_inicio': 6,
-                'hora_fim': 18,
-                'n_pontos': 60
-            }
-
-        self.calcular_regressoes()
-
-    def calcular_mediana(self, dados):
-        """Calcula a mediana dos dados"""
-        return np.median(dados, axis=0)
-
-    def calcular_regressao(self, x, y):
-        """Calcula regressão linear"""
-        if len(x) < 2 or len(y) < 2:
-            return {'a': 0, 'b': 0, 'r2': 0, 'r': 0, 'p_value': 1, 'std_err': 0}
-
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-        return {
-            'a': slope,
-            'b': intercept,
-            'r2': r_value**2,
-            'r': r_value,
-            'p_value': p_value,
-            'std_err': std_err
-        }
-
-    def calcular_regressoes(self):
-        """Calcula todas as regressões"""
-        self.regressoes = {}
-
-        for canal in ['azul', 'vermelho', 'branco']:
-            dados = st.session_state.dados_bancada[canal]
-            medianas = self.calcular_mediana(dados['dados'])
-            medias = np.mean(dados['dados'], axis=0)
-            x = dados['valores_referencia']
-
-            regressao_mediana = self.calcular_regressao(x, medianas)
-            valores_previstos_mediana = regressao_mediana['a'] * \
-                x + regressao_mediana['b']
-
-            regressao_media = self.calcular_regressao(x, medias)
-            valores_previstos_media = regressao_media['a'] * \
-                x + regressao_media['b']
-
-            self.regressoes[canal] = {
-                'medianas': medianas,
-                'medias': medias,
-                'regressao_mediana': regressao_mediana,
-                'regressao_media': regressao_media,
-                'valores_previstos_mediana': valores_previstos_mediana,
-                'valores_previstos_media': valores_previstos_media,
-                # Adicionando limites da calibração
-                # Máximo medido na calibração
-                'limite_max_calibracao': np.max(medias),
-                # Mínimo medido na calibração
-                'limite_min_calibracao': np.min(medias)
-            }
-
-    def calcular_gaussiana(self, x, sigma, mi, intensidade_max, intensidade_min):
-        """Calcula a distribuição gaussiana"""
-        return intensidade_min + (intensidade_max - intensidade_min) * np.exp(-((x - mi)**2) / (2 * sigma**2))
-
-    def normalizar_para_ppfd(self, canal, valor_normalizado):
-        """Converte valor normalizado (0-1) para PPFD usando regressão da calibração"""
-        reg = self.regressoes[canal]['regressao_media']
-        return reg['a'] * valor_normalizado + reg['b']
-
-    def ppfd_para_normalizado(self, canal, ppfd):
-        """Converte PPFD para valor normalizado (0-1) usando regressão inversa"""
-        reg = self.regressoes[canal]['regressao_media']
-        if reg['a'] != 0:
-            return (ppfd - reg['b']) / reg['a']
-        return 0
-
-    def calcular_intensidade_canal(self, canal):
-        """Calcula intensidade máxima e mínima para um canal considerando calibração"""
-        params = st.session_state.parametros_canais
-
-        # Calcular proporções normalizadas
-        proporcoes = np.array([
-            params['proporcao_azul'],
-            params['proporcao_vermelho'],
-            params['proporcao_branco']
-        ])
-        proporcoes_norm = proporcoes / proporcoes.sum()
-
-        # Mapear canal para índice
-        canal_idx = {'azul': 0, 'vermelho': 1, 'branco': 2}[canal]
-        proporcao_canal = proporcoes_norm[canal_idx]
-
-        # Distribuir intensidades totais pelas proporções
-        intensidade_max_total = params['intensidade_max_total']
-        intensidade_min_total = params['intensidade_min_total']
-
-        intensidade_max_bruta = intensidade_max_total * proporcao_canal
-        intensidade_min_bruta = intensidade_min_total * proporcao_canal
-
-        # Obter limites da calibração para este canal
-        limite_max_calibracao = self.regressoes[canal]['limite_max_calibracao']
-        limite_min_calibracao = self.regressoes[canal]['limite_min_calibracao']
-
-        # Limitar as intensidades brutas pelos limites da calibração
-        # Se a intensidade calculada for maior que o máximo possível da calibração,
-        # ajustar para o máximo possível
-        if intensidade_max_bruta > limite_max_calibracao:
-            intensidade_max_bruta = limite_max_calibracao
-
-        # Se a intensidade calculada for menor que o mínimo possível da calibração,
-        # ajustar para o mínimo possível
-        if intensidade_min_bruta < limite_min_calibracao:
-            intensidade_min_bruta = limite_min_calibracao
-
-        # Ajustar mínimo para não ser maior que o máximo
-        if intensidade_min_bruta > intensidade_max_bruta:
-            intensidade_min_bruta = max(
-                limite_min_calibracao, intensidade_max_bruta * 0.1)
-
-        # Converter para valores normalizados usando a calibração
-        valor_max_normalizado = self.ppfd_para_normalizado(
-            canal, intensidade_max_bruta)
-        valor_min_normalizado = self.ppfd_para_normalizado(
-            canal, intensidade_min_bruta)
-
-        # Limitar aos limites da calibração (0-1)
-        valor_max_normalizado = max(0, min(1, valor_max_normalizado))
-        valor_min_normalizado = max(0, min(1, valor_min_normalizado))
-
-        # Converter de volta para PPFD usando a calibração
-        intensidade_max_calibrada = self.normalizar_para_ppfd(
-            canal, valor_max_normalizado)
-        intensidade_min_calibrada = self.normalizar_para_ppfd(
-            canal, valor_min_normalizado)
-
-        # Garantir que os valores finais respeitem os limites da calibração
-        intensidade_max_calibrada = min(
-            intensidade_max_calibrada, limite_max_calibracao)
-        intensidade_min_calibrada = max(
-            intensidade_min_calibrada, limite_min_calibracao)
-
-        # Garantir que mínimo não seja maior que máximo
-        if intensidade_min_calibrada > intensidade_max_calibrada:
-            intensidade_min_calibrada = intensidade_max_calibrada * 0.1
-
-        return intensidade_max_calibrada, intensidade_min_calibrada, valor_max_normalizado, valor_min_normalizado
-
-    def gerar_dados_canal(self, canal, sigma, mi):
-        """Gera dados para um canal específico"""
-        # Calcular intensidades usando calibração
-        intensidade_max, intensidade_min, valor_max_norm, valor_min_norm = self.calcular_intensidade_canal(
-            canal)
-
-        tempo = st.session_state.parametros_temporais
-        n_pontos = tempo['n_pontos']
-
-        # Gerar gaussiana no domínio normalizado [-1, 1]
-        x_vals = np.linspace(-1, 1, n_pontos)
-        gaussiana_norm = self.calcular_gaussiana(x_vals, sigma, mi, 1.0, 0.0)
-
-        # Normalizar gaussiana para [0, 1]
-        gauss_min = gaussiana_norm.min()
-        gauss_max = gaussiana_norm.max()
-        if gauss_max > gauss_min:
-            gaussiana_norm = (gaussiana_norm - gauss_min) / \
-                (gauss_max - gauss_min)
-
-        # Mapear para intervalo de operação [valor_min_norm, valor_max_norm]
-        range_norm = valor_max_norm - valor_min_norm
-        valores_norm = valor_min_norm + gaussiana_norm * range_norm
-
-        # Converter para PPFD usando calibração
-        intensidades = np.array(
-            [self.normalizar_para_ppfd(canal, val) for val in valores_norm])
-
-        # Garantir que as intensidades respeitem os limites da calibração
-        limite_max_calibracao = self.regressoes[canal]['limite_max_calibracao']
-        limite_min_calibracao = self.regressoes[canal]['limite_min_calibracao']
-        intensidades = np.clip(
-            intensidades, limite_min_calibracao, limite_max_calibracao)
-
-        # Gerar horários
-        horas_decimais = np.linspace(
-            tempo['hora_inicio'], tempo['hora_fim'], n_pontos)
-
-        if n_pontos < 50:
-            x_interp = np.linspace(-1, 1, 200)
-            f = interp1d(x_vals, intensidades, kind='cubic')
-            intensidades = f(x_interp)
-            horas_decimais = np.linspace(
-                tempo['hora_inicio'], tempo['hora_fim'], 200)
-            x_vals = x_interp
-
-        # GARANTIR QUE OS DADOS SÃO ARRAYS NUMPY
-        horas_decimais = np.array(horas_decimais)
-        intensidades = np.array(intensidades)
-
-        delta_t_segundos = (
-            tempo['hora_fim'] - tempo['hora_inicio']) * 3600 / (len(x_vals) - 1)
-        integral = np.cumsum(intensidades) * delta_t_segundos / 1_000_000
-
-        dli_final = integral[-1]
-        fotoperiodo_segundos = (
-            tempo['hora_fim'] - tempo['hora_inicio']) * 3600
-        ice = dli_final * 1_000_000 / fotoperiodo_segundos if fotoperiodo_segundos > 0 else 0
-
-        return {
-            'x': x_vals,
-            'hora_decimal': horas_decimais,
-            'Intensidade': intensidades,
-            'Integral': integral,
-            'DLI_final': dli_final,
-            'ICE': ice,
-            'intensidade_max': intensidade_max,
-            'intensidade_min': intensidade_min,
-            'limite_max_calibracao': limite_max_calibracao,
-            'limite_min_calibracao': limite_min_calibracao
-        }
-
-    def get_dados_canal(self, canal):
-        """Obtém dados de um canal específico"""
-        params_gauss = st.session_state.parametros_gaussianos[f'canal_{canal}']
-        return self.gerar_dados_canal(canal, params_gauss['sigma'], params_gauss['mi'])
-
-    # Adicione este método dentro da classe SistemaCalibracao:
-
-    def gerar_conteudo_lamp(self, dados, params_temp):
-        """Gera o conteúdo formatado para arquivos LAMP"""
-        conteudo_arquivo = ""
-
-        # Se houver menos de 50 pontos, usar interpolação para mais pontos
-        if len(dados['hora_decimal']) < 50:
-            # Interpolar para ter pelo menos 10 pontos
-            n_pontos_arquivo = 10
-            horas_interp = np.linspace(
-                params_temp['hora_inicio'], params_temp['hora_fim'], n_pontos_arquivo)
-            f = interp1d(dados['hora_decimal'],
-                         dados['Intensidade'], kind='linear')
-            intensidades_interp = f(horas_interp)
-        else:
-            # Usar todos os pontos (limitado a 50 para não ficar muito grande)
-            n_pontos_arquivo = min(50, len(dados['hora_decimal']))
-            idx_selecionados = np.linspace(
-                0, len(dados['hora_decimal'])-1, n_pontos_arquivo, dtype=int)
-            horas_interp = dados['hora_decimal'][idx_selecionados]
-            intensidades_interp = dados['Intensidade'][idx_selecionados]
-
-        # Formatar cada linha
-        for hora, intensidade in zip(horas_interp, intensidades_interp):
-            # Converter hora decimal para horas, minutos, segundos
-            hora_int = int(hora)
-            minuto_int = int((hora - hora_int) * 60)
-            segundo_int = int(((hora - hora_int) * 60 - minuto_int) * 60)
-
-            # Arredondar intensidade para inteiro (como no exemplo)
-            intensidade_int = int(round(intensidade))
-
-            # Formatar linha (hora minuto segundo intensidade)
-            linha = f"{hora_int:02d} {minuto_int:02d} {segundo_int:02d} {intensidade_int}\n"
-            conteudo_arquivo += linha
-
-        return conteudo_arquivo
-
-    def gerar_conteudo_lamp_ice(self, dados, params_temp):
-        """Gera o conteúdo simplificado para arquivos LAMP com apenas ICE inicial e final"""
-        conteudo_arquivo = ""
-
-        # Obter ICE do canal (já calculado no sistema)
-        ice = dados['ICE']
-
-        # Converter ICE para inteiro
-        ice_int = int(round(ice))
-
-        # Linha 1: Horário de início con ICE
-        hora_inicio = params_temp['hora_inicio']
-        linha_inicio = f"{hora_inicio:02d} 00 00 {ice_int}\n"
-
-        # Linha 2: Horário de fim con ICE
-        hora_fim = params_temp['hora_fim']
-        linha_fim = f"{hora_fim:02d} 00 00 {ice_int}\n"
+        padrao = valores_padrao()
+        for chave, valor in padrao.items():
+            if chave not in st.session_state:
+                st.session_state[chave] = valor
+        # Estatísticas da calibração sobrevivem às reexecuções; só a edição de
+        # células e o botão de restaurar as atualizam
+        st.session_state.setdefault('estatisticas_calibracao', {})
+        st.session_state.setdefault('regressoes_calibracao', {})
+
+        super().__init__(
+            st.session_state.dados_bancada,
+            st.session_state.parametros_canais,
+            st.session_state.parametros_gaussianos,
+            st.session_state.parametros_temporais,
+            integracao=st.session_state.get('integracao', 'numerico'),
+            estatisticas=st.session_state.estatisticas_calibracao,
+            regressoes=st.session_state.regressoes_calibracao
+        )
 
-        conteudo_arquivo = linha_inicio + linha_fim
-        return conteudo_arquivo
 
 # ============================================================================
 # CONFIGURAÇÕES ECHARTS
@@ -423,6 +124,24 @@ COLORS = {
     'referencia': '#91cc75'
 }
 
+# Cores dos canais fora do padrão (vermelho distante, UV, verde, ...), em ordem
+CORES_CANAIS_EXTRAS = ['#9a60b4', '#3ba272', '#ea7ccc', '#fac858', '#5b3a29']
+
+
+def cor_canal(canal, indice=0):
+    """Cor de um canal: a da paleta padrão ou uma das cores extras pela posição"""
+    return COLORS.get(canal, CORES_CANAIS_EXTRAS[indice % len(CORES_CANAIS_EXTRAS)])
+
+
+# Emoji dos canais padrão em métricas e títulos; os demais usam um genérico
+EMOJIS_CANAIS = {'vermelho': '🔴', 'azul': '🔵', 'branco': '⚪'}
+
+
+def emoji_canal(canal):
+    """Emoji de um canal nas métricas e títulos"""
+    return EMOJIS_CANAIS.get(canal, '💡')
+
+
 # Configurações de tema padrão
 BASE_OPTIONS = {
     "animation": True,
@@ -537,6 +256,10 @@ def apply_base_config(options):
 
     # ANIMAÇÕES
 
+    # Gráficos grandes usam o perfil leve (animação desligada antes dos padrões abaixo)
+    if grafico_grande(options):
+        aplicar_perfil_grande(options)
+
     # Habilita/desabilita animações globalmente
     if "animation" not in options:
         options["animation"] = True
@@ -594,14 +317,35 @@ def apply_base_config(options):
     return {**BASE_OPTIONS, **options}
 
 
+# Opções de gráficos guardadas por sessão (os menos usados são descartados)
+GRAFICOS_MEMORIZADOS = 32
+
+
+def grafico_memorizado(construtor, *args, **kwargs):
+    """Opções de um gráfico, remontadas só quando as entradas mudam
+
+    A chave é o construtor mais a impressão digital dos argumentos, então o
+    construtor deve depender apenas deles (e das constantes de estilo). As
+    opções devolvidas são compartilhadas entre reruns e não devem ser
+    alteradas por quem as recebe.
+    """
+    if 'memo_graficos' not in st.session_state:
+        st.session_state.memo_graficos = MemoLRU(GRAFICOS_MEMORIZADOS)
+    memo = st.session_state.memo_graficos
+    chave = impressao_digital(construtor.__qualname__, args, kwargs)
+    options = memo.get(chave)
+    if options is None:
+        options = construtor(*args, **kwargs)
+        memo.put(chave, options)
+    return options
+
+
 def criar_grafico_regressao(canal_nome, reg, x_ref, y_medido, y_previsto, cor):
     """Cria gráfico de regressão linear"""
 
-    # Preparar dados CORRETAMENTE para ECharts
-    dados_medidos = [
-        {"value": [float(x_ref[i]), float(y_medido[i])]} for i in range(len(x_ref))]
-    dados_regressao = [
-        {"value": [float(x_ref[i]), float(y_previsto[i])]} for i in range(len(x_ref))]
+    # Pares [x, y] montados de uma vez a partir dos arrays
+    dados_medidos = pontos(x_ref, y_medido)
+    dados_regressao = pontos(x_ref, y_previsto)
 
     a = reg['regressao_mediana']['a']
     b = reg['regressao_mediana']['b']
@@ -670,8 +414,93 @@ def criar_grafico_regressao(canal_nome, reg, x_ref, y_medido, y_previsto, cor):
     return apply_base_config(options)
 
 
-def criar_grafico_comparacao_intensidades(dados_vermelho, dados_azul, dados_branco):
-    """Cria gráfico comparativo das intensidades dos canais"""
+def criar_grafico_calibracao(canal_nome, x_ref, dados, medias, y_previsto, cor):
+    """Cria o gráfico das repetições medidas, da média e da regressão de um canal"""
+    # Preparar dados para o gráfico
+    series_data = []
+
+    # Adicionar repetições
+    for rep in range(5):
+        series_data.append({
+            "name": f'Rep {rep+1}',
+            "type": "scatter",
+            "data": pontos(x_ref, dados[rep]),
+            "symbolSize": 8,
+            "itemStyle": {
+                "color": f'rgba({100 + rep * 30}, {100 + rep * 30}, {100 + rep * 30}, 0.7)'
+            }
+        })
+
+    # Adicionar média
+    series_data.append({
+        "name": 'Média',
+        "type": "line",
+        "data": pontos(x_ref, medias, casas=1),
+        "lineStyle": {
+            "color": COLORS["soma"],
+            "width": 3
+        },
+        "symbol": "circle",
+        "symbolSize": 12,
+        "itemStyle": {
+            "color": COLORS["soma"]
+        }
+    })
+
+    # Adicionar regressão
+    series_data.append({
+        "name": 'Regressão (média)',
+        "type": "line",
+        "data": pontos(x_ref, y_previsto),
+        "lineStyle": {
+            "color": cor,
+            "width": 2,
+            "type": "dashed"
+        },
+        "smooth": True,
+        "showSymbol": False
+    })
+
+    options = {
+        "title": {
+            "text": f'Regressão Linear - Canal {canal_nome}',
+            "left": "center"
+        },
+        "tooltip": {},
+        "legend": {
+            "data": [f'Rep {i+1}' for i in range(5)] + ['Média', 'Regressão (média)'],
+            "top": "10%",
+            "type": "scroll"
+        },
+        "xAxis": {
+            "name": "Valor de Referência",
+            "nameLocation": "middle",
+            "nameGap": 30,
+            "type": "value"
+        },
+        "yAxis": {
+            "name": "PPFD Medido (μmol/m²/s)",
+            "nameLocation": "middle",
+            "nameGap": 50,
+            "type": "value"
+        },
+        "series": series_data,
+        "grid": {
+            "left": "15%",
+            "right": "10%",
+            "bottom": "20%",
+            "top": "20%"
+        }
+    }
+
+    return options
+
+
+def criar_grafico_comparacao_intensidades(dados_canais, cores, max_pontos=PONTOS_POR_GRAFICO):
+    """Cria gráfico comparativo das intensidades dos canais (LTTB acima de max_pontos)
+
+    dados_canais e cores são dicionários por canal, na ordem das séries.
+    """
 
     # Preparar dados suavizados (código existente permanece igual)
     def preparar_dados_suavizados(dados):
@@ -685,33 +514,80 @@ def criar_grafico_comparacao_intensidades(dados_vermelho, dados_azul, dados_bran
             return horas_new, intens_new
         return horas, intens
 
-    horas_v, intens_v = preparar_dados_suavizados(dados_vermelho)
-    horas_a, intens_a = preparar_dados_suavizados(dados_azul)
-    horas_b, intens_b = preparar_dados_suavizados(dados_branco)
+    curvas = {canal: preparar_dados_suavizados(dados) for canal, dados in dados_canais.items()}
 
     # Calcular soma con horas comuns
-    horas_min = max(min(horas_v), min(horas_a), min(horas_b))
-    horas_max = min(max(horas_v), max(horas_a), max(horas_b))
+    horas_min = max(min(horas) for horas, _ in curvas.values())
+    horas_max = min(max(horas) for horas, _ in curvas.values())
     horas_comuns = np.linspace(horas_min, horas_max, 200)
 
     # Interpolar para soma
-    intens_v_interp = np.interp(horas_comuns, horas_v, intens_v)
-    intens_a_interp = np.interp(horas_comuns, horas_a, intens_a)
-    intens_b_interp = np.interp(horas_comuns, horas_b, intens_b)
-    soma_intensidades = intens_v_interp + intens_a_interp + intens_b_interp
-
-    # DADOS PREPARADOS FORA do options (CRÍTICO)
-    dados_vermelho_list = [{"value": [float(h), float(round(i, 2))], "itemStyle": {"color": COLORS['vermelho']}}
-                           for h, i in zip(horas_v, intens_v)]
-    dados_azul_list = [{"value": [float(h), float(round(i, 2))], "itemStyle": {"color": COLORS['azul']}}
-                       for h, i in zip(horas_a, intens_a)]
-    dados_branco_list = [{"value": [float(h), float(round(i, 2))], "itemStyle": {"color": COLORS['branco']}}
-                         for h, i in zip(horas_b, intens_b)]
-    dados_soma_list = [{"value": [float(h), float(round(i, 2))], "itemStyle": {"color": COLORS['soma']}}
-                       for h, i in zip(horas_comuns, soma_intensidades)]
+    soma_intensidades = sum(np.interp(horas_comuns, horas, intens)
+                            for horas, intens in curvas.values())
+
+    # Dados em colunas (um dataset por eixo de horas distinto); a cor fica na série
+    datasets, indices = conjuntos_dados({
+        **curvas,
+        'soma': (horas_comuns, soma_intensidades)
+    }, casas=2, limite=max_pontos)
+
+    series = [{
+        **serie_dataset(canal.capitalize(), canal, indice=indices[canal]),
+        "itemStyle": {"color": cores[canal]},
+        "smooth": 0.5,  # Suavização da linha
+        "lineStyle": {
+            "color": cores[canal],
+            "width": 2.5,
+            "shadowBlur": 0,
+            "shadowColor": cores[canal] + "40"
+        },
+        "showSymbol": False,
+        "areaStyle": {
+            "color": {
+                "type": "linear",
+                "x": 0, "y": 0, "x2": 0, "y2": 1,
+                "colorStops": [
+                    {"offset": 0, "color": cores[canal] + "40"},
+                    {"offset": 1, "color": cores[canal] + "05"}
+                ]
+            }
+        },
+        "emphasis": {
+            "focus": "series",
+            "lineStyle": {
+                "width": 3.5,
+                "shadowBlur": 0,
+                "shadowColor": cores[canal] + "60"
+            }
+        },
+        "animation": True,
+        "animationDuration": 1000,
+        "animationEasing": "cubicInOut",
+        "animationDelay": 200  # Delay para animação em cascata
+    } for canal in dados_canais]
+
+    series.append({
+        **serie_dataset("Soma Total", 'soma', indice=indices['soma']),
+        "itemStyle": {"color": COLORS['soma']},
+        "smooth": 0.5,
+        "lineStyle": {
+            "color": COLORS['soma'],
+            "width": 3.5,
+            "type": "dashed",
+            "shadowBlur": 0,
+            "shadowColor": COLORS['soma'] + "60"
+        },
+        "showSymbol": False,
+        "emphasis": {"focus": "series"},
+        "animation": True,
+        "animationDuration": 1000,
+        "animationEasing": "cubicInOut",
+        "animationDelay": 200  # Delay para animação em cascata
+    })
 
     options = {
-        "color": [COLORS['vermelho'], COLORS['azul'], COLORS['branco'], COLORS['soma']],
+        "dataset": datasets,
+        "color": [cores[canal] for canal in dados_canais] + [COLORS['soma']],
         "title": {
             "text": "Comparação de Intensidades por Canal",
             "subtext": "Curvas suavizadas con interpolação cúbica",
@@ -729,7 +605,7 @@ def criar_grafico_comparacao_intensidades(dados_vermelho, dados_azul, dados_bran
             }
         },
         "legend": {
-            "data": ["Vermelho", "Azul", "Branco", "Soma Total"],
+            "data": [canal.capitalize() for canal in dados_canais] + ["Soma Total"],
             "top": "bottom",
             "left": "center",
             "type": "scroll",
@@ -769,118 +645,7 @@ def criar_grafico_comparacao_intensidades(dados_vermelho, dados_azul, dados_bran
             "type": "value",
             "axisLine": {"show": True, "lineStyle": {"color": "#333", "width": 1.5}}
         },
-        "series": [
-            {
-                "name": "Vermelho",
-                "type": "line",
-                "data": dados_vermelho_list,
-                "smooth": 0.5,  # Suavização da linha
-                "lineStyle": {
-                    "color": COLORS['vermelho'],
-                    "width": 2.5,
-                    "shadowBlur": 0,
-                    "shadowColor": COLORS['vermelho'] + "40"
-                },
-                "showSymbol": False,
-                "areaStyle": {
-                    "color": {
-                        "type": "linear",
-                        "x": 0, "y": 0, "x2": 0, "y2": 1,
-                        "colorStops": [
-                            {"offset": 0, "color": COLORS['vermelho'] + "40"},
-                            {"offset": 1, "color": COLORS['vermelho'] + "05"}
-                        ]
-                    }
-                },
-                "emphasis": {
-                    "focus": "series",
-                    "lineStyle": {
-                        "width": 3.5,
-                        "shadowBlur": 0,
-                        "shadowColor": COLORS['vermelho'] + "60"
-                    }
-                },
-                "animation": True,
-                "animationDuration": 1000,
-                "animationEasing": "cubicInOut",
-                "animationDelay": 200  # Delay para animação em cascata
-            },
-            {
-                "name": "Azul",
-                "type": "line",
-                "data": dados_azul_list,
-                "smooth": 0.5,
-                "lineStyle": {
-                    "color": COLORS['azul'],
-                    "width": 2.5,
-                    "shadowBlur": 0,
-                    "shadowColor": COLORS['azul'] + "40"
-                },
-                "showSymbol": False,
-                "areaStyle": {
-                    "color": {
-                        "type": "linear",
-                        "x": 0, "y": 0, "x2": 0, "y2": 1,
-                        "colorStops": [
-                            {"offset": 0, "color": COLORS['azul'] + "40"},
-                            {"offset": 1, "color": COLORS['azul'] + "05"}
-                        ]
-                    }
-                },
-                "emphasis": {"focus": "series"},
-                "animation": True,
-                "animationDuration": 1000,
-                "animationEasing": "cubicInOut",
-                "animationDelay": 200  # Delay para animação em cascata
-            },
-            {
-                "name": "Branco",
-                "type": "line",
-                "data": dados_branco_list,
-                "smooth": 0.5,
-                "lineStyle": {
-                    "color": COLORS['branco'],
-                    "width": 2.5,
-                    "shadowBlur": 0,
-                    "shadowColor": COLORS['branco'] + "40"
-                },
-                "showSymbol": False,
-                "areaStyle": {
-                    "color": {
-                        "type": "linear",
-                        "x": 0, "y": 0, "x2": 0, "y2": 1,
-                        "colorStops": [
-                            {"offset": 0, "color": COLORS['branco'] + "40"},
-                            {"offset": 1, "color": COLORS['branco'] + "05"}
-                        ]
-                    }
-                },
-                "emphasis": {"focus": "series"},
-                "animation": True,
-                "animationDuration": 1000,
-                "animationEasing": "cubicInOut",
-                "animationDelay": 200  # Delay para animação em cascata
-            },
-            {
-                "name": "Soma Total",
-                "type": "line",
-                "data": dados_soma_list,
-                "smooth": 0.5,
-                "lineStyle": {
-                    "color": COLORS['soma'],
-                    "width": 3.5,
-                    "type": "dashed",
-                    "shadowBlur": 0,
-                    "shadowColor": COLORS['soma'] + "60"
-                },
-                "showSymbol": False,
-                "emphasis": {"focus": "series"},
-                "animation": True,
-                "animationDuration": 1000,
-                "animationEasing": "cubicInOut",
-                "animationDelay": 200  # Delay para animação em cascata
-            }
-        ],
+        "series": series,
         "dataZoom": [
             {"type": "inside", "xAxisIndex": 0},
             {
@@ -921,22 +686,8 @@ def criar_grafico_comparacao_intensidades(dados_vermelho, dados_azul, dados_bran
 def criar_grafico_barras_dli(dli_data):
     """Cria gráfico de barras para DLI"""
     data = [
-        {
-            "value": round(float(dli_data['DLI Final (mol/m²)'][0]), 2),
-            "itemStyle": {"color": COLORS['vermelho']}
-        },
-        {
-            "value": round(float(dli_data['DLI Final (mol/m²)'][1]), 2),
-            "itemStyle": {"color": COLORS['azul']}
-        },
-        {
-            "value": round(float(dli_data['DLI Final (mol/m²)'][2]), 2),
-            "itemStyle": {"color": COLORS['branco']}
-        },
-        {
-            "value": round(float(dli_data['DLI Final (mol/m²)'][3]), 2),
-            "itemStyle": {"color": COLORS['soma']}
-        }
+        {"value": round(float(valor), 2), "itemStyle": {"color": cor}}
+        for valor, cor in zip(dli_data['DLI Final (mol/m²)'], dli_data['Cor'])
     ]
 
     options = {
@@ -1024,22 +775,8 @@ def criar_grafico_barras_dli(dli_data):
 def criar_grafico_barras_ice(ice_data):
     """Cria gráfico de barras para ICE"""
     data = [
-        {
-            "value": round(float(ice_data['ICE (μmol/m²/s)'][0]), 2),
-            "itemStyle": {"color": COLORS['vermelho']}
-        },
-        {
-            "value": round(float(ice_data['ICE (μmol/m²/s)'][1]), 2),
-            "itemStyle": {"color": COLORS['azul']}
-        },
-        {
-            "value": round(float(ice_data['ICE (μmol/m²/s)'][2]), 2),
-            "itemStyle": {"color": COLORS['branco']}
-        },
-        {
-            "value": round(float(ice_data['ICE (μmol/m²/s)'][3]), 2),
-            "itemStyle": {"color": COLORS['soma']}
-        }
+        {"value": round(float(valor), 2), "itemStyle": {"color": cor}}
+        for valor, cor in zip(ice_data['ICE (μmol/m²/s)'], ice_data['Cor'])
     ]
 
     options = {
@@ -1120,8 +857,8 @@ def criar_grafico_barras_ice(ice_data):
     return apply_base_config(options)
 
 
-def criar_grafico_canal_detalhes(dados, canal_nome, cor, params_gauss):
-    """Crea gráfico detalhado de um canal"""
+def criar_grafico_canal_detalhes(dados, canal_nome, cor, params_gauss, max_pontos=PONTOS_POR_GRAFICO):
+    """Crea gráfico detalhado de um canal (LTTB acima de max_pontos)"""
     # Suavizar dados
     if len(dados['hora_decimal']) < 200:
         f = interp1d(dados['hora_decimal'], dados['Intensidade'], kind='cubic')
@@ -1196,7 +933,7 @@ def criar_grafico_canal_detalhes(dados, canal_nome, cor, params_gauss):
             {
                 "name": "Intensidade",
                 "type": "line",
-                "data": [[float(horas_suave[i]), float(intens_suave[i])] for i in range(len(horas_suave))],
+                "data": pontos(horas_suave, intens_suave, limite=max_pontos),
                 "smooth": 0.5,
                 "lineStyle": {
                     "color": cor,
@@ -1295,8 +1032,8 @@ def criar_grafico_canal_detalhes(dados, canal_nome, cor, params_gauss):
     return apply_base_config(options)
 
 
-def criar_grafico_integral(dados, canal_nome, cor):
-    """Cria gráfico da integral acumulada"""
+def criar_grafico_integral(dados, canal_nome, cor, max_pontos=PONTOS_POR_GRAFICO):
+    """Cria gráfico da integral acumulada (LTTB acima de max_pontos)"""
     if len(dados['hora_decimal']) < 200:
         f = interp1d(dados['hora_decimal'], dados['Integral'], kind='cubic')
         horas_suave = np.linspace(
@@ -1359,7 +1096,7 @@ def criar_grafico_integral(dados, canal_nome, cor):
             {
                 "name": "Integral Acumulada",
                 "type": "line",
-                "data": [[float(horas_suave[i]), float(integral_suave[i])] for i in range(len(horas_suave))],
+                "data": pontos(horas_suave, integral_suave, limite=max_pontos),
                 "smooth": True,
                 "lineStyle": {
                     "color": cor,
@@ -1392,8 +1129,8 @@ def criar_grafico_integral(dados, canal_nome, cor):
     return apply_base_config(options)
 
 
-def criar_grafico_gaussiana(dados, canal_nome, cor, sigma, mi):
-    """Cria gráfico da distribuição gaussiana"""
+def criar_grafico_gaussiana(dados, canal_nome, cor, sigma, mi, max_pontos=PONTOS_POR_GRAFICO):
+    """Cria gráfico da distribuição gaussiana (LTTB acima de max_pontos)"""
     # Suavizar a gaussiana
     if len(dados['x']) < 200:
         f = interp1d(dados['x'], dados['Intensidade'], kind='cubic')
@@ -1440,7 +1177,7 @@ def criar_grafico_gaussiana(dados, canal_nome, cor, sigma, mi):
             {
                 "name": "Distribuição Gaussiana",
                 "type": "line",
-                "data": [[float(round(x, 2)), float(round(y, 2))] for x, y in zip(x_suave, intens_suave)],
+                "data": pontos(x_suave, intens_suave, casas=2, limite=max_pontos),
                 "smooth": True,
                 "lineStyle": {"color": cor, "width": 3},
                 "showSymbol": False,
@@ -1468,7 +1205,7 @@ def criar_grafico_gaussiana(dados, canal_nome, cor, sigma, mi):
             {
                 "name": f"Área ±σ ({sigma*100}%)",
                 "type": "line",
-                "data": [[float(round(x, 2)), float(round(y, 2))] for x, y in zip(area_x, area_y)],
+                "data": pontos(area_x, area_y, casas=2, limite=max_pontos),
                 "smooth": True,
                 "lineStyle": {"color": "#73c0de", "width": 0},
                 "areaStyle": {
@@ -1488,8 +1225,8 @@ def criar_grafico_gaussiana(dados, canal_nome, cor, sigma, mi):
     return apply_base_config(options)
 
 
-def criar_grafico_comparacao_intensidades_barras(intensidades_max, intensidades_min):
-    """Cria gráfico de barras comparativo"""
+def criar_grafico_comparacao_intensidades_barras(nomes, cores, intensidades_max, intensidades_min):
+    """Cria gráfico de barras comparativo (uma barra de máximo e uma de mínimo por canal)"""
     options = {
         "title": {
             "text": "Comparação de Intensidades por Canal",
@@ -1508,7 +1245,7 @@ def criar_grafico_comparacao_intensidades_barras(intensidades_max, intensidades_
         },
         "xAxis": {
             "type": "category",
-            "data": ["Azul", "Vermelho", "Branco"],
+            "data": nomes,
             "axisTick": {
                 "show": False
             }
@@ -1540,12 +1277,8 @@ def criar_grafico_comparacao_intensidades_barras(intensidades_max, intensidades_
                 "name": "Intensidade Máxima",
                 "type": "bar",
                 "data": [
-                    {"value": float(round(intensidades_max[0], 2)), "itemStyle": {
-                        "color": COLORS['azul']}},
-                    {"value": float(round(intensidades_max[1], 2)), "itemStyle": {
-                        "color": COLORS['vermelho']}},
-                    {"value": float(round(intensidades_max[2], 2)), "itemStyle": {
-                        "color": COLORS['branco']}}
+                    {"value": float(round(valor, 2)), "itemStyle": {"color": cor}}
+                    for valor, cor in zip(intensidades_max, cores)
                 ],
                 "barWidth": "40%",
                 "itemStyle": {
@@ -1572,12 +1305,8 @@ def criar_grafico_comparacao_intensidades_barras(intensidades_max, intensidades_
                 "name": "Intensidade Mínima",
                 "type": "bar",
                 "data": [
-                    {"value": float(round(intensidades_min[0], 2)), "itemStyle": {
-                        "color": COLORS['azul'] + "80"}},
-                    {"value": float(round(intensidades_min[1], 2)), "itemStyle": {
-                        "color": COLORS['vermelho'] + "80"}},
-                    {"value": float(round(intensidades_min[2], 2)), "itemStyle": {
-                        "color": COLORS['branco'] + "80"}}
+                    {"value": float(round(valor, 2)), "itemStyle": {"color": cor + "80"}}
+                    for valor, cor in zip(intensidades_min, cores)
                 ],
                 "barWidth": "40%",
                 "itemStyle": {
@@ -1604,6 +1333,72 @@ def criar_grafico_comparacao_intensidades_barras(intensidades_max, intensidades_
 
     return apply_base_config(options)
 
+def criar_grafico_mapa_calor(resultado, metrica, cor):
+    """Cria mapa de calor de uma métrica sobre dois eixos da varredura"""
+    eixo_x, eixo_y = resultado['dims']
+    valores_x = resultado['coords'][eixo_x]
+    valores_y = resultado['coords'][eixo_y]
+    matriz = np.asarray(resultado[metrica])
+
+    # ECharts heatmap: [índice_x, índice_y, valor]
+    ix, iy = np.meshgrid(np.arange(len(valores_x)),
+                         np.arange(len(valores_y)), indexing='ij')
+    dados = np.column_stack([ix.ravel(), iy.ravel(),
+                             np.round(matriz.ravel(), 3)]).tolist()
+
+    options = {
+        "title": {
+            "text": f"{METRICAS_VARREDURA[metrica]} - Canal {resultado['canal'].capitalize()}",
+            "subtext": f"{matriz.size} configurações avaliadas"
+        },
+        "tooltip": {"position": "top"},
+        "grid": {
+            "left": "60px",
+            "right": "40px",
+            "bottom": "90px",
+            "top": "60px",
+            "containLabel": True
+        },
+        "xAxis": {
+            "type": "category",
+            "name": rotulo_varredura(eixo_x),
+            "nameLocation": "middle",
+            "nameGap": 30,
+            "data": [f"{v:.2f}" for v in valores_x],
+            "splitArea": {"show": True}
+        },
+        "yAxis": {
+            "type": "category",
+            "name": rotulo_varredura(eixo_y),
+            "nameLocation": "middle",
+            "nameGap": 50,
+            "data": [f"{v:.2f}" for v in valores_y],
+            "splitArea": {"show": True}
+        },
+        "visualMap": {
+            "min": float(np.nanmin(matriz)),
+            "max": float(np.nanmax(matriz)),
+            "calculable": True,
+            "orient": "horizontal",
+            "left": "center",
+            "bottom": 0,
+            "inRange": {"color": ["#f7f7f7", cor]}
+        },
+        "series": [{
+            "name": METRICAS_VARREDURA[metrica],
+            "type": "heatmap",
+            "data": dados,
+            "emphasis": {
+                "itemStyle": {
+                    "shadowBlur": 10,
+                    "shadowColor": "rgba(0, 0, 0, 0.3)"
+                }
+            }
+        }]
+    }
+
+    return apply_base_config(options)
+
 # ============================================================================
 # INICIALIZAÇÃO DO SISTEMA E INTERFACE
 # ============================================================================
@@ -1612,319 +1407,258 @@ def criar_grafico_comparacao_intensidades_barras(intensidades_max, intensidades_
 # Inicializar sistema
 sistema = SistemaCalibracao()
 
-with st.sidebar:
-    st.header("📜 Navegação")
 
-    # Navegação principal
-    aba_selecionada = st.radio(
-        "Selecione a seção:",
-        ["📊 Visão Geral",
-         "🧪 Calibração Bancada",
-         "🎛️ Configurar Canais",
-         "༗ Espectros"],
-        label_visibility="collapsed"
-    )
+def cor_canal_bancada(canal):
+    """Cor de um canal pela sua posição em canais_lamp() (a mesma da página de espectros)"""
+    return cor_canal(canal, sistema.canais_lamp().index(canal))
+
+
+def atualizar_horario():
+    """Callback dos widgets de horário: grava os parâmetros antes da execução"""
+    st.session_state.parametros_temporais.update({
+        'hora_inicio': st.session_state.hora_inicio_config,
+        'hora_fim': st.session_state.hora_fim_config,
+        'n_pontos': st.session_state.n_pontos_config
+    })
+
+
+def atualizar_gaussianas():
+    """Callback dos sliders de σ/μ: grava os parâmetros antes da execução (sem st.rerun())"""
+    st.session_state.parametros_gaussianos.update({
+        f'canal_{canal}': {'sigma': st.session_state[f'sigma_{canal}_config'],
+                           'mi': st.session_state[f'mi_{canal}_config']}
+        for canal in sistema.canais
+    })
+
+    # Incrementar contador para forçar animação
+    if 'animacao_counter' in st.session_state:
+        st.session_state.animacao_counter += 1
+
+
+def atualizar_integracao():
+    """Callback do modo de integração: guarda o modo e o aplica ao motor já construído
+
+    O modo fica em uma chave própria porque a do toggle é descartada ao trocar de aba.
+    """
+    st.session_state.integracao = ('analitico' if st.session_state.integracao_analitica_config
+                                   else 'numerico')
+    sistema.integracao = st.session_state.integracao
 
-    if aba_selecionada != "🧪 Calibração Bancada":
-        st.header("⚙️ Configurações")
 
+def exibir_configuracoes():
+    """Horário, gaussianas e arquivos LAMP no topo das abas que usam o fotoperíodo
+
+    Chamada dentro do fragmento da aba: mudar um parâmetro reexecuta só a aba,
+    com o valor já gravado pelo callback.
+    """
+    col_horario, col_gaussianas, col_arquivos = st.columns(3)
+
+    with col_horario:
         with st.expander("⏰ Horário", expanded=False):
             # Colunas para hora início e fim lado a lado
             col_hora1, col_hora2 = st.columns(2)
 
             with col_hora1:
-                hora_inicio = st.number_input("Início", 0, 23,
-                                              st.session_state.parametros_temporais['hora_inicio'],
-                                              key="hora_inicio_sidebar")
+                st.number_input("Início", 0, 23,
+                                st.session_state.parametros_temporais['hora_inicio'],
+                                key="hora_inicio_config", on_change=atualizar_horario)
 
             with col_hora2:
-                hora_fim = st.number_input("Fim", 0, 23,
-                                           st.session_state.parametros_temporais['hora_fim'],
-                                           key="hora_fim_sidebar")
+                st.number_input("Fim", 0, 23,
+                                st.session_state.parametros_temporais['hora_fim'],
+                                key="hora_fim_config", on_change=atualizar_horario)
 
             # Nº de pontos embaixo, ocupando largura total
-            n_pontos = st.slider("Nº de Pontos", 10, 60,
-                                 st.session_state.parametros_temporais['n_pontos'],
-                                 key="n_pontos_sidebar")
-
-            if (hora_inicio != st.session_state.parametros_temporais['hora_inicio'] or
-                hora_fim != st.session_state.parametros_temporais['hora_fim'] or
-                    n_pontos != st.session_state.parametros_temporais['n_pontos']):
-                st.session_state.parametros_temporais.update({
-                    'hora_inicio': hora_inicio,
-                    'hora_fim': hora_fim,
-                    'n_pontos': n_pontos
-                })
-                st.rerun()
+            st.slider("Nº de Pontos", 10, 60,
+                      st.session_state.parametros_temporais['n_pontos'],
+                      key="n_pontos_config", on_change=atualizar_horario)
 
+            st.toggle("Integração analítica (DLI/ICE exatos)",
+                      value=sistema.integracao == 'analitico',
+                      key="integracao_analitica_config", on_change=atualizar_integracao,
+                      help="Calcula DLI, ICE e integral acumulada pela forma fechada da gaussiana (erf), independente do nº de pontos")
+
+    with col_gaussianas:
         with st.expander("📐 Gaussianas", expanded=False):
             col1, col2 = st.columns(2)
-            with col1:
-                sigma_vermelho = st.slider("σ Vermelho", 0.1, 1.0,
-                                           st.session_state.parametros_gaussianos['canal_vermelho']['sigma'],
-                                           0.01, key="sigma_v_sidebar")
-                sigma_azul = st.slider("σ Azul", 0.1, 1.0,
-                                       st.session_state.parametros_gaussianos['canal_azul']['sigma'],
-                                       0.01, key="sigma_a_sidebar")
-                sigma_branco = st.slider("σ Branco", 0.1, 1.0,
-                                         st.session_state.parametros_gaussianos['canal_branco']['sigma'],
-                                         0.01, key="sigma_b_sidebar")
-
-            with col2:
-                mi_vermelho = st.slider("μ Vermelho", -1.0, 1.0,
-                                        st.session_state.parametros_gaussianos['canal_vermelho']['mi'],
-                                        0.05, key="mi_v_sidebar")
-                mi_azul = st.slider("μ Azul", -1.0, 1.0,
-                                    st.session_state.parametros_gaussianos['canal_azul']['mi'],
-                                    0.05, key="mi_a_sidebar")
-                mi_branco = st.slider("μ Branco", -1.0, 1.0,
-                                      st.session_state.parametros_gaussianos['canal_branco']['mi'],
-                                      0.05, key="mi_b_sidebar")
-
-            if (sigma_vermelho != st.session_state.parametros_gaussianos['canal_vermelho']['sigma'] or
-                sigma_azul != st.session_state.parametros_gaussianos['canal_azul']['sigma'] or
-                sigma_branco != st.session_state.parametros_gaussianos['canal_branco']['sigma'] or
-                mi_vermelho != st.session_state.parametros_gaussianos['canal_vermelho']['mi'] or
-                mi_azul != st.session_state.parametros_gaussianos['canal_azul']['mi'] or
-                    mi_branco != st.session_state.parametros_gaussianos['canal_branco']['mi']):
-
-                st.session_state.parametros_gaussianos.update({
-                    'canal_vermelho': {'sigma': sigma_vermelho, 'mi': mi_vermelho},
-                    'canal_azul': {'sigma': sigma_azul, 'mi': mi_azul},
-                    'canal_branco': {'sigma': sigma_branco, 'mi': mi_branco}
-                })
+            for canal in sistema.canais_lamp():
+                params_gauss = st.session_state.parametros_gaussianos[f'canal_{canal}']
+                with col1:
+                    st.slider(f"σ {canal.capitalize()}", 0.1, 1.0, params_gauss['sigma'],
+                              0.01, key=f"sigma_{canal}_config", on_change=atualizar_gaussianas)
+                with col2:
+                    st.slider(f"μ {canal.capitalize()}", -1.0, 1.0, params_gauss['mi'],
+                              0.05, key=f"mi_{canal}_config", on_change=atualizar_gaussianas)
+
+    with col_arquivos:
+        # Seção para gerar arquivos LAMP
+        with st.expander("📄 Gerar Arquivos", expanded=False):
+            exibir_gerar_arquivos()
 
-                # Incrementar contador para forçar animação
-                if 'animacao_counter' in st.session_state:
-                    st.session_state.animacao_counter += 1
 
-                st.rerun()
+@st.fragment
+def exibir_gerar_arquivos():
+    """Arquivos LAMP das abas; escolher arquivo ou gerar reexecuta só este bloco"""
+    # Arquivo LAMP -> canal de origem, pelas saídas definidas na bancada
+    canal_map = dict(arquivos_lamp(sistema))
 
-        # Seção para gerar arquivos LAMP
+    # Selecionar qual arquivo gerar
+    arquivo_selecionado = st.selectbox(
+        "Selecione o arquivo:",
+        list(canal_map),
+        key="arquivo_lamp"
+    )
 
-        with st.expander("📄 Gerar Arquivos", expanded=False):
-            # Selecionar qual arquivo gerar
-            arquivo_selecionado = st.selectbox(
-                "Selecione o arquivo:",
-                ["LAMP_CH1.txt",
-                 "LAMP_CH2.txt",
-                 "LAMP_CH3.txt",
-                 "LAMP_CH4.txt"],
-                key="arquivo_lamp"
-            )
+    canal_nome = canal_map[arquivo_selecionado]
 
-            # Mapear seleção para canal
-            canal_map = {
-                "LAMP_CH1.txt": "vermelho",
-                "LAMP_CH2.txt": "azul",
-                "LAMP_CH3.txt": "branco",
-                # Usa dados do branco
-                "LAMP_CH4.txt": "branco"
-            }
+    # Resolução da curva completa (None mantém o arquivo compacto de até 50 linhas)
+    resolucoes_lamp = {
+        "Padrão (até 50 linhas)": None,
+        "1 linha por minuto": 60,
+        "1 linha a cada 10 s": 10,
+        "1 linha por segundo": 1
+    }
+    resolucao_lamp = resolucoes_lamp[st.selectbox(
+        "Resolução da curva:", list(resolucoes_lamp), key="resolucao_lamp")]
+
+    # Colunas para os botões
+    col1, col2, col3 = st.columns(3)
 
-            canal_nome = canal_map[arquivo_selecionado]
-
-            # Colunas para os botões
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                # Botão para gerar arquivo individual con curva completa
-                if st.button("⚡ Curva", use_container_width=True,
-                             help="Gera arquivo con curva gaussiana completa (múltiplos pontos)"):
-                    # Obter dados do canal
-                    dados = sistema.get_dados_canal(canal_nome)
-                    params_temp = st.session_state.parametros_temporais
-
-                    # Criar conteúdo do arquivo usando o método do sistema
-                    conteudo_arquivo = sistema.gerar_conteudo_lamp(
-                        dados, params_temp)
-
-                    # Nome do arquivo baseado na seleção
-                    nome_arquivo = arquivo_selecionado
-
-                    # Criar download
-                    st.download_button(
-                        label=f"⬇️ Baixar TXT",
-                        data=conteudo_arquivo,
-                        file_name=nome_arquivo,
-                        mime="text/plain",
-                        use_container_width=True,
-                        key=f"download_{nome_arquivo}"
-                    )
-
-            with col2:
-                # Botão para gerar arquivo simplificado con ICE
-                if st.button("📊 Linear", use_container_width=True,
-                             help="Gera arquivo con apenas início e fim con ICE (2 linhas)"):
-                    # Obter dados do canal
-                    dados = sistema.get_dados_canal(canal_nome)
-                    params_temp = st.session_state.parametros_temporais
-
-                    # Criar conteúdo simplificado con ICE
-                    conteudo_arquivo = sistema.gerar_conteudo_lamp_ice(
-                        dados, params_temp)
-
-                    # Nome do arquivo baseado na seleção (adiciona _ICE)
-                    nome_arquivo = arquivo_selecionado.replace(
-                        '.txt', '_ICE.txt')
-
-                    # Criar download
-                    st.download_button(
-                        label=f"⬇️ Baixar TXT",
-                        data=conteudo_arquivo,
-                        file_name=nome_arquivo,
-                        mime="text/plain",
-                        use_container_width=True,
-                        key=f"download_ice_{arquivo_selecionado.replace('.txt', '')}"
-                    )
-
-            with col3:
-                # Botão para gerar todos os arquivos (ambos os formatos)
-                if st.button("📦 Todos", use_container_width=True,
-                             help="Gera todos os arquivos em ambos formatos"):
-                    # Criar arquivo ZIP con todos os arquivos
-
-                    buffer = io.BytesIO()
-                    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                        # Gerar cada um dos 4 arquivos em ambos formatos
-                        arquivos_para_gerar = [
-                            ("LAMP_CH1.txt", "vermelho"),
-                            ("LAMP_CH2.txt", "azul"),
-                            ("LAMP_CH3.txt", "branco"),
-                            ("LAMP_CH4.txt", "branco")
-                        ]
-
-                        # Primeiro: arquivos con curva completa
-                        for nome_arquivo, canal in arquivos_para_gerar:
-                            dados = sistema.get_dados_canal(canal)
-                            params_temp = st.session_state.parametros_temporais
-                            conteudo = sistema.gerar_conteudo_lamp(
-                                dados, params_temp)
-                            zip_file.writestr(
-                                f"curva_completa/{nome_arquivo}", conteudo)
-
-                        # Segundo: arquivos con ICE simplificado
-                        for nome_arquivo, canal in arquivos_para_gerar:
-                            dados = sistema.get_dados_canal(canal)
-                            params_temp = st.session_state.parametros_temporais
-                            conteudo = sistema.gerar_conteudo_lamp_ice(
-                                dados, params_temp)
-                            nome_ice = nome_arquivo.replace('.txt', '_ICE.txt')
-                            zip_file.writestr(
-                                f"ice_simplificado/{nome_ice}", conteudo)
-
-                        # Adicionar um arquivo README
-                        readme_content = f"""
-                        ARQUIVOS DE CONFIGURAÇÃO LAMP - AMBOS FORMATOS
-                        Gerado em: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-                        ESTRUTURA DO ZIP:
-                        ├── curva_completa/        - Arquivos con curva gaussiana completa
-                        │   ├── LAMP_CH1.txt      - Canal Vermelho (curva completa)
-                        │   ├── LAMP_CH2.txt      - Canal Azul (curva completa)
-                        │   ├── LAMP_CH3.txt      - Canal Branco (curva completa)
-                        │   └── LAMP_CH4.txt      - Cópia do Branco (curva completa)
-                        │
-                        └── ice_simplificado/     - Arquivos simplificados con ICE
-                            ├── LAMP_CH1_ICE.txt - Canal Vermelho (apenas ICE)
-                            ├── LAMP_CH2_ICE.txt - Canal Azul (apenas ICE)
-                            ├── LAMP_CH3_ICE.txt - Canal Branco (apenas ICE)
-                            └── LAMP_CH4_ICE.txt - Cópia do Branco (apenas ICE)
-
-                        VALORES DE ICE POR CANAL:
-                        - Vermelho: {sistema.get_dados_canal('vermelho')['ICE']:.1f} μmol/m²/s
-
-                        - Azul: {sistema.get_dados_canal('azul')['ICE']:.1f} μmol/m²/s
-                        - Branco: {sistema.get_dados_canal('branco')['ICE']:.1f} μmol/m²/s
-
-                        Configurações utilizadas:
-                        - Intensidade Total Máxima: {st.session_state.parametros_canais['intensidade_max_total']} μmol/m²/s
-                        - Intensidade Total Mínima: {st.session_state.parametros_canais['intensidade_min_total']} μmol/m²/s
-                        - Fotoperíodo: {st.session_state.parametros_temporais['hora_inicio']}:00 às {st.session_state.parametros_temporais['hora_fim']}:00
-                        - Número de pontos: {st.session_state.parametros_temporais['n_pontos']}
-
-                        FORMATO DOS ARQUIVOS:
-
-                        1. Curva completa:
-                        HH MM SS INTENSIDADE
-                        (Múltiplas linhas ao longo do fotoperíodo)
-
-                        2. ICE simplificado:
-                        HH_INICIO 00 00 ICE
-                        HH_FIM 00 00 ICE
-                        (Apenas 2 linhas: início e fim con valor de ICE)
-                        """
-                        zip_file.writestr("README.txt", readme_content)
-
-                        # Adicionar também um arquivo CSV con os ICEs
-                        ice_data = []
-                        for canal_nome, canal_display in [('vermelho', 'Vermelho'), ('azul', 'Azul'), ('branco', 'Branco')]:
-                            dados_canal = sistema.get_dados_canal(canal_nome)
-                            ice_data.append({
-                                'Canal': canal_display,
-                                'ICE_μmol_m2_s': round(dados_canal['ICE'], 1),
-                                'DLI_mol_m2': round(dados_canal['DLI_final'], 3),
-                                'Intensidade_Max': round(dados_canal['intensidade_max'], 1),
-                                'Intensidade_Min': round(dados_canal['intensidade_min'], 1)
-                            })
-
-                        df_ice = pd.DataFrame(ice_data)
-                        csv_ice = df_ice.to_csv(index=False)
-                        zip_file.writestr("valores_ice.csv", csv_ice)
-
-                    buffer.seek(0)
-
-                    # Criar download do ZIP
-                    st.download_button(
-                        label="📥 Baixar ZIP",
-                        data=buffer,
-                        file_name="lamp_config_completo.zip",
-                        mime="application/zip",
-                        use_container_width=True,
-                        key="download_all_formats_zip"
-                    )
-
-            # Resumo dos ICEs (se gerado Todos)
-            with st.expander("👁️ Preview ICE e DLI", expanded=False):
-                for canal_nome, canal_display in [('vermelho', 'Vermelho'), ('azul', 'Azul'), ('branco', 'Branco')]:
-                    dados_canal = sistema.get_dados_canal(canal_nome)
-                    st.metric(
-                        f"ICE {canal_display}",
-                        f"{dados_canal['ICE']:.1f} μmol/m²/s",
-                        f"DLI: {dados_canal['DLI_final']:.1f} mol/m²")
-
-            # Mostrar preview do arquivo selecionado
-            with st.expander("👁️ Preview Graussin", expanded=False):
-                dados = sistema.get_dados_canal(canal_nome)
-                params_temp = st.session_state.parametros_temporais
-                # Usar o método do sistema
+    with col1:
+        # Botão para gerar arquivo individual con curva completa
+        if st.button("⚡ Curva", use_container_width=True,
+                     help="Gera arquivo con curva gaussiana completa (múltiplos pontos)"):
+            # Obter dados do canal
+            dados = sistema.get_dados_canal(canal_nome)
+            params_temp = st.session_state.parametros_temporais
+
+            # Criar conteúdo do arquivo usando o método do sistema
+            if resolucao_lamp is None:
                 conteudo_arquivo = sistema.gerar_conteudo_lamp(
                     dados, params_temp)
-                st.code(conteudo_arquivo, language="text")
+            else:
+                # Alta resolução: blocos gerados sob demanda direto no buffer
+                conteudo_arquivo = io.BytesIO()
+                sistema.escrever_conteudo_lamp(
+                    conteudo_arquivo, canal_nome, resolucao_lamp)
+                conteudo_arquivo.seek(0)
 
-        # Botão de instruções completas
-        if st.button("Manual do Sistema",
-                     use_container_width=True,
-                     icon="📖",
-                     help="Instruções detalhadas do sistema",
-                     type="primary"):
-            st.session_state.show_full_manual = True
+            # Nome do arquivo baseado na seleção
+            nome_arquivo = arquivo_selecionado
 
-    # 6. Rodapé
-    st.markdown("---")
-    with st.container():
-        footer_cols = st.columns(3)
+            # Criar download
+            st.download_button(
+                label=f"⬇️ Baixar TXT",
+                data=conteudo_arquivo,
+                file_name=nome_arquivo,
+                mime="text/plain",
+                use_container_width=True,
+                key=f"download_{nome_arquivo}"
+            )
 
-        with footer_cols[0]:
-            st.caption("Última versão:")
-            st.caption("1.0")
+    with col2:
+        # Botão para gerar arquivo simplificado con ICE
+        if st.button("📊 Linear", use_container_width=True,
+                     help="Gera arquivo con apenas início e fim con ICE (2 linhas)"):
+            # Obter dados do canal
+            dados = sistema.get_dados_canal(canal_nome)
+            params_temp = st.session_state.parametros_temporais
+
+            # Criar conteúdo simplificado con ICE
+            conteudo_arquivo = sistema.gerar_conteudo_lamp_ice(
+                dados, params_temp)
+
+            # Nome do arquivo baseado na seleção (adiciona _ICE)
+            nome_arquivo = arquivo_selecionado.replace(
+                '.txt', '_ICE.txt')
+
+            # Criar download
+            st.download_button(
+                label=f"⬇️ Baixar TXT",
+                data=conteudo_arquivo,
+                file_name=nome_arquivo,
+                mime="text/plain",
+                use_container_width=True,
+                key=f"download_ice_{arquivo_selecionado.replace('.txt', '')}"
+            )
 
-        with footer_cols[1]:
-            st.caption("Meios de Contato:")
-            st.caption("laac@ufv.br")
+    with col3:
+        # Botão para gerar todos os arquivos (ambos os formatos)
+        if st.button("📦 Todos", use_container_width=True,
+                     help="Gera todos os arquivos em ambos formatos"):
+            # Pacote ZIP em cache pelo hash das entradas (reaproveita arquivos inalterados)
+            if 'pacote_lamp' not in st.session_state:
+                st.session_state.pacote_lamp = PacoteLamp()
+            conteudo_zip = st.session_state.pacote_lamp.gerar(
+                sistema, resolucao_lamp)
+
+            # Criar download do ZIP
+            st.download_button(
+                label="📥 Baixar ZIP",
+                data=conteudo_zip,
+                file_name="lamp_config_completo.zip",
+                mime="application/zip",
+                use_container_width=True,
+                key="download_all_formats_zip"
+            )
 
-        with footer_cols[2]:
-            st.caption("Última atualização:")
+    # Resumo dos ICEs (se gerado Todos)
+    with st.expander("👁️ Preview ICE e DLI", expanded=False):
+        dados_preview = sistema.get_dados_canais()
+        for canal_preview in sistema.canais_lamp():
+            dados_canal = dados_preview[canal_preview]
+            st.metric(
+                f"ICE {canal_preview.capitalize()}",
+                f"{dados_canal['ICE']:.1f} μmol/m²/s",
+                f"DLI: {dados_canal['DLI_final']:.1f} mol/m²")
+
+    # Mostrar preview do arquivo selecionado
+    with st.expander("👁️ Preview Graussin", expanded=False):
+        dados = sistema.get_dados_canal(canal_nome)
+        params_temp = st.session_state.parametros_temporais
+        # Usar o método do sistema
+        conteudo_arquivo = sistema.gerar_conteudo_lamp(
+            dados, params_temp)
+        st.code(conteudo_arquivo, language="text")
+
+
+with st.sidebar:
+    st.header("📜 Navegação")
+
+    # Navegação principal
+    aba_selecionada = st.radio(
+        "Selecione a seção:",
+        ["📊 Visão Geral",
+         "🧪 Calibração Bancada",
+         "🎛️ Configurar Canais",
+         "༗ Espectros"],
+        label_visibility="collapsed"
+    )
+
+    if aba_selecionada != "🧪 Calibração Bancada":
+        # Botão de instruções completas
+        if st.button("Manual do Sistema",
+                     use_container_width=True,
+                     icon="📖",
+                     help="Instruções detalhadas do sistema",
+                     type="primary"):
+            st.session_state.show_full_manual = True
+
+    # 6. Rodapé
+    st.markdown("---")
+    with st.container():
+        footer_cols = st.columns(3)
+
+        with footer_cols[0]:
+            st.caption("Última versão:")
+            st.caption("1.0")
+
+        with footer_cols[1]:
+            st.caption("Meios de Contato:")
+            st.caption("laac@ufv.br")
+
+        with footer_cols[2]:
+            st.caption("Última atualização:")
             st.caption(datetime.now().strftime("%d/%m/%Y"))
 
 # ============================================================================
@@ -1949,39 +1683,29 @@ if st.session_state.show_full_manual:
 # ============================================================================
 
 
+@st.fragment
 def exibir_visao_geral():
-    """Exibe a visão geral do sistema"""
+    """Exibe a visão geral do sistema; os controles do fotoperíodo reexecutam só esta aba"""
 
-    # Obter dados dos canais
-    dados_vermelho = sistema.get_dados_canal('vermelho')
-    dados_azul = sistema.get_dados_canal('azul')
-    dados_branco = sistema.get_dados_canal('branco')
+    exibir_configuracoes()
 
-    # Métricas em tempo real
-    col1, col2, col3, col4 = st.columns(4)
-
-    with col1:
-        st.metric(
-            "🔴 DLI Vermelho",
-            f"{dados_vermelho['DLI_final']:.2f} mol/m²",
-            delta=f"ICE: {dados_vermelho['ICE']:.1f} μmol/m²/s"
-        )
+    # Obter dados dos canais (um único bloco vetorizado)
+    dados_canais = sistema.get_dados_canais()
+    canais = sistema.canais_lamp()
+    cores = {canal: cor_canal_bancada(canal) for canal in canais}
 
-    with col2:
-        st.metric(
-            "🔵 DLI Azul",
-            f"{dados_azul['DLI_final']:.2f} mol/m²",
-            delta=f"ICE: {dados_azul['ICE']:.1f} μmol/m²/s"
-        )
+    # Métricas em tempo real
+    colunas_metricas = st.columns(len(canais) + 1)
 
-    with col3:
-        st.metric(
-            "⚪ DLI Branco",
-            f"{dados_branco['DLI_final']:.2f} mol/m²",
-            delta=f"ICE: {dados_branco['ICE']:.1f} μmol/m²/s"
-        )
+    for canal, col in zip(canais, colunas_metricas):
+        with col:
+            st.metric(
+                f"{emoji_canal(canal)} DLI {canal.capitalize()}",
+                f"{dados_canais[canal]['DLI_final']:.2f} mol/m²",
+                delta=f"ICE: {dados_canais[canal]['ICE']:.1f} μmol/m²/s"
+            )
 
-    with col4:
+    with colunas_metricas[-1]:
         params = st.session_state.parametros_canais
         st.metric(
             "Intensidade Máx Total",
@@ -1992,13 +1716,7 @@ def exibir_visao_geral():
     # Regressões lineares da bancada - LADO A LADO
     st.header("📐 Regressões Lineares da Bancada")
 
-    col1, col2, col3 = st.columns(3)
-
-    for idx, (canal_nome, col, cor) in enumerate(zip(
-        ['azul', 'vermelho', 'branco'],
-        [col1, col2, col3],
-        [COLORS['azul'], COLORS['vermelho'], COLORS['branco']]
-    )):
+    for canal_nome, col in zip(sistema.canais, st.columns(len(sistema.canais))):
         with col:
             reg = sistema.regressoes[canal_nome]
             x_ref = st.session_state.dados_bancada[canal_nome]['valores_referencia']
@@ -2006,8 +1724,9 @@ def exibir_visao_geral():
             y_previsto = reg['valores_previstos_mediana']
 
             # Criar gráfico ECharts
-            options = criar_grafico_regressao(
-                canal_nome, reg, x_ref, y_medido, y_previsto, cor)
+            options = grafico_memorizado(
+                criar_grafico_regressao, canal_nome, reg, x_ref, y_medido, y_previsto,
+                cores[canal_nome])
             st_echarts(options=options, height=400, key=f"reg_{canal_nome}",
                        renderer="canvas",
                        theme="light")
@@ -2032,244 +1751,189 @@ def exibir_visao_geral():
     st.header("📈 Comparação entre Canais")
 
     # Gráfico 1: Intensidades comparadas con soma - CORREÇÃO 1
-    options_intensidades = criar_grafico_comparacao_intensidades(
-        dados_vermelho, dados_azul, dados_branco)
-    # Corrigido: Adicionar apply_base_config
-    options_intensidades = apply_base_config(options_intensidades)
+    options_intensidades = grafico_memorizado(
+        criar_grafico_comparacao_intensidades,
+        {canal: dados_canais[canal] for canal in canais}, cores)
     st_echarts(options=options_intensidades, height=500,
                key="comparacao_intensidades")
 
-    # Criar abas para cada canal
-    tab1, tab2, tab3 = st.columns(3)
-
-    with tab1:
-        params_v = st.session_state.parametros_gaussianos['canal_vermelho']
-        dados_v = sistema.get_dados_canal('vermelho')
-
-        # Criar DataFrame com todos os pontos da gaussiana
-        df_gauss_v = pd.DataFrame({
-            'id': range(1, len(dados_v['x']) + 1),
-            'x_normalizado': dados_v['x'],
-            'hora_decimal': dados_v['hora_decimal'],
-            'hora_formato': [f"{int(h)}:{int((h-int(h))*60):02d}:{int(((h-int(h))*60 - int((h-int(h))*60))*60):02d}" for h in dados_v['hora_decimal']],
-            'intensidade_ppfd': dados_v['Intensidade'],
-            'integral_acumulada': dados_v['Integral']
-        })
-
-        # Adicionar informações de resumo
-        st.markdown(f"""
-        **Parâmetros da Distribuição:**
-        - σ (Sigma): `{params_v['sigma']:.3f}`
-        - μ (Mi): `{params_v['mi']:.3f}`
-        - Intensidade Máxima: `{dados_v['intensidade_max']:.1f}` μmol/m²/s
-        - Intensidade Mínima: `{dados_v['intensidade_min']:.1f}` μmol/m²/s
-        - Limite Máx Calibração: `{dados_v.get('limite_max_calibracao', 'N/A'):.1f}` μmol/m²/s
-        - Limite Mín Calibração: `{dados_v.get('limite_min_calibracao', 'N/A'):.1f}` μmol/m²/s
-        - ICE: `{dados_v['ICE']:.1f}` μmol/m²/s
-        - DLI Final: `{dados_v['DLI_final']:.3f}` mol/m²
-        """)
-
-        # Mostrar tabela con todos os pontos (limitado a 50 pontos para não ficar muito grande)
-        if len(df_gauss_v) > 50:
-            df_display_v = df_gauss_v.iloc[::len(df_gauss_v)//50]
-        else:
-            df_display_v = df_gauss_v
-
-        st.dataframe(
-            df_display_v,
-            column_config={
-                "x_normalizado": st.column_config.NumberColumn("x (normalizado)", format="%.3f"),
-                "hora_decimal": st.column_config.NumberColumn("Hora (decimal)", format="%.4f"),
-                "hora_formato": st.column_config.TextColumn("Hora (HH:MM:SS)"),
-                "intensidade_ppfd": st.column_config.NumberColumn("PPFD (μmol/m²/s)", format="%.1f"),
-                "integral_acumulada": st.column_config.NumberColumn("Integral (mol/m²)", format="%.6f")
-            },
-            hide_index=True,
-            use_container_width=True,
-            height=400
-        )
-
-        # Botão para baixar dados completos
-        csv_v = df_gauss_v.to_csv(index=False)
-        st.download_button(
-            label="📥 Baixar dados completos (CSV)",
-            data=csv_v,
-            file_name="gaussiana_vermelho_completa.csv",
-            mime="text/csv",
-            key="download_v"
-        )
-
-    with tab2:
-        params_a = st.session_state.parametros_gaussianos['canal_azul']
-        dados_a = sistema.get_dados_canal('azul')
-
-        # Criar DataFrame com todos os pontos da gaussiana
-        df_gauss_a = pd.DataFrame({
-            'id': range(1, len(dados_a['x']) + 1),
-            'x_normalizado': dados_a['x'],
-            'hora_decimal': dados_a['hora_decimal'],
-            'hora_formato': [f"{int(h)}:{int((h-int(h))*60):02d}:{int(((h-int(h))*60 - int((h-int(h))*60))*60):02d}" for h in dados_a['hora_decimal']],
-            'intensidade_ppfd': dados_a['Intensidade'],
-            'integral_acumulada': dados_a['Integral']
-        })
-
-        # Adicionar informações de resumo
-        st.markdown(f"""
-        **Parâmetros da Distribuição:**
-        - σ (Sigma): `{params_a['sigma']:.3f}`
-        - μ (Mi): `{params_a['mi']:.3f}`
-        - Intensidade Máxima: `{dados_a['intensidade_max']:.1f}` μmol/m²/s
-        - Intensidade Mínima: `{dados_a['intensidade_min']:.1f}` μmol/m²/s
-        - Limite Máx Calibração: `{dados_a.get('limite_max_calibracao', 'N/A'):.1f}` μmol/m²/s
-        - Limite Mín Calibração: `{dados_a.get('limite_min_calibracao', 'N/A'):.1f}` μmol/m²/s
-        - ICE: `{dados_a['ICE']:.1f}` μmol/m²/s
-        - DLI Final: `{dados_a['DLI_final']:.3f}` mol/m²
-        """)
-
-        # Mostrar tabela con todos os pontos
-        if len(df_gauss_a) > 50:
-            df_display_a = df_gauss_a.iloc[::len(df_gauss_a)//50]
-        else:
-            df_display_a = df_gauss_a
-
-        st.dataframe(
-            df_display_a,
-            column_config={
-                "x_normalizado": st.column_config.NumberColumn("x (normalizado)", format="%.3f"),
-                "hora_decimal": st.column_config.NumberColumn("Hora (decimal)", format="%.4f"),
-                "hora_formato": st.column_config.TextColumn("Hora (HH:MM:SS)"),
-                "intensidade_ppfd": st.column_config.NumberColumn("PPFD (μmol/m²/s)", format="%.1f"),
-                "integral_acumulada": st.column_config.NumberColumn("Integral (mol/m²)", format="%.6f")
-            },
-            hide_index=True,
-            use_container_width=True,
-            height=400
-        )
-
-        # Botão para baixar dados completos
-        csv_a = df_gauss_a.to_csv(index=False)
-        st.download_button(
-            label="📥 Baixar dados completos (CSV)",
-            data=csv_a,
-            file_name="gaussiana_azul_completa.csv",
-            mime="text/csv",
-            key="download_a"
-        )
-
-    with tab3:
-        params_b = st.session_state.parametros_gaussianos['canal_branco']
-        dados_b = sistema.get_dados_canal('branco')
-
-        # Criar DataFrame com todos os pontos da gaussiana
-        df_gauss_b = pd.DataFrame({
-            'id': range(1, len(dados_b['x']) + 1),
-            'x_normalizado': dados_b['x'],
-            'hora_decimal': dados_b['hora_decimal'],
-            'hora_formato': [f"{int(h)}:{int((h-int(h))*60):02d}:{int(((h-int(h))*60 - int((h-int(h))*60))*60):02d}" for h in dados_b['hora_decimal']],
-            'intensidade_ppfd': dados_b['Intensidade'],
-            'integral_acumulada': dados_b['Integral']
-        })
+    # Uma coluna por canal com parâmetros, tabela e download da gaussiana
+    for canal, col in zip(canais, st.columns(len(canais))):
+        with col:
+            params_gauss = st.session_state.parametros_gaussianos[f'canal_{canal}']
+            dados = dados_canais[canal]
+
+            # Criar DataFrame com todos os pontos da gaussiana
+            df_gauss = pd.DataFrame({
+                'id': range(1, len(dados['x']) + 1),
+                'x_normalizado': dados['x'],
+                'hora_decimal': dados['hora_decimal'],
+                'hora_formato': [f"{int(h)}:{int((h-int(h))*60):02d}:{int(((h-int(h))*60 - int((h-int(h))*60))*60):02d}" for h in dados['hora_decimal']],
+                'intensidade_ppfd': dados['Intensidade'],
+                'integral_acumulada': dados['Integral']
+            })
 
-        # Adicionar informações de resumo
-        st.markdown(f"""
-        **Parâmetros da Distribuição:**
-        - σ (Sigma): `{params_b['sigma']:.3f}`
-        - μ (Mi): `{params_b['mi']:.3f}`
-        - Intensidade Máxima: `{dados_b['intensidade_max']:.1f}` μmol/m²/s
-        - Intensidade Mínima: `{dados_b['intensidade_min']:.1f}` μmol/m²/s
-        - Limite Máx Calibração: `{dados_b.get('limite_max_calibracao', 'N/A'):.1f}` μmol/m²/s
-        - Limite Mín Calibração: `{dados_b.get('limite_min_calibracao', 'N/A'):.1f}` μmol/m²/s
-        - ICE: `{dados_b['ICE']:.1f}` μmol/m²/s
-        - DLI Final: `{dados_b['DLI_final']:.3f}` mol/m²
-        """)
-
-        # Mostrar tabela con todos os pontos
-        if len(df_gauss_b) > 50:
-            df_display_b = df_gauss_b.iloc[::len(df_gauss_b)//50]
-        else:
-            df_display_b = df_gauss_b
-
-        st.dataframe(
-            df_display_b,
-            column_config={
-                "x_normalizado": st.column_config.NumberColumn("x (normalizado)", format="%.3f"),
-                "hora_decimal": st.column_config.NumberColumn("Hora (decimal)", format="%.4f"),
-                "hora_formato": st.column_config.TextColumn("Hora (HH:MM:SS)"),
-                "intensidade_ppfd": st.column_config.NumberColumn("PPFD (μmol/m²/s)", format="%.1f"),
-                "integral_acumulada": st.column_config.NumberColumn("Integral (mol/m²)", format="%.6f")
-            },
-            hide_index=True,
-            use_container_width=True,
-            height=400
-        )
+            # Adicionar informações de resumo
+            st.markdown(f"""
+            **Parâmetros da Distribuição:**
+            - σ (Sigma): `{params_gauss['sigma']:.3f}`
+            - μ (Mi): `{params_gauss['mi']:.3f}`
+            - Intensidade Máxima: `{dados['intensidade_max']:.1f}` μmol/m²/s
+            - Intensidade Mínima: `{dados['intensidade_min']:.1f}` μmol/m²/s
+            - Limite Máx Calibração: `{dados.get('limite_max_calibracao', 'N/A'):.1f}` μmol/m²/s
+            - Limite Mín Calibração: `{dados.get('limite_min_calibracao', 'N/A'):.1f}` μmol/m²/s
+            - ICE: `{dados['ICE']:.1f}` μmol/m²/s
+            - DLI Final: `{dados['DLI_final']:.3f}` mol/m²
+            """)
+
+            # Mostrar tabela con todos os pontos (limitado a 50 pontos para não ficar muito grande)
+            if len(df_gauss) > 50:
+                df_display = df_gauss.iloc[::len(df_gauss)//50]
+            else:
+                df_display = df_gauss
+
+            st.dataframe(
+                df_display,
+                column_config={
+                    "x_normalizado": st.column_config.NumberColumn("x (normalizado)", format="%.3f"),
+                    "hora_decimal": st.column_config.NumberColumn("Hora (decimal)", format="%.4f"),
+                    "hora_formato": st.column_config.TextColumn("Hora (HH:MM:SS)"),
+                    "intensidade_ppfd": st.column_config.NumberColumn("PPFD (μmol/m²/s)", format="%.1f"),
+                    "integral_acumulada": st.column_config.NumberColumn("Integral (mol/m²)", format="%.6f")
+                },
+                hide_index=True,
+                use_container_width=True,
+                height=400
+            )
 
-        # Botão para baixar dados completos
-        csv_b = df_gauss_b.to_csv(index=False)
-        st.download_button(
-            label="📥 Baixar dados completos (CSV)",
-            data=csv_b,
-            file_name="gaussiana_branco_completa.csv",
-            mime="text/csv",
-            key="download_b"
-        )
+            # Botão para baixar dados completos
+            st.download_button(
+                label="📥 Baixar dados completos (CSV)",
+                data=df_gauss.to_csv(index=False),
+                file_name=f"gaussiana_{canal}_completa.csv",
+                mime="text/csv",
+                key=f"download_{canal}"
+            )
 
-    # Gráfico 2: DLIs finais comparados
+    # Gráfico 2: DLIs finais comparados (o total soma todos os canais da bancada)
     dli_data = {
-        'Canal': ['Vermelho', 'Azul', 'Branco', 'Total'],
-        'DLI Final (mol/m²)': [
-            dados_vermelho['DLI_final'],
-            dados_azul['DLI_final'],
-            dados_branco['DLI_final'],
-            dados_vermelho['DLI_final'] +
-            dados_azul['DLI_final'] + dados_branco['DLI_final']
-        ],
-        'ICE (μmol/m²/s)': [
-            dados_vermelho['ICE'],
-            dados_azul['ICE'],
-            dados_branco['ICE'],
-            dados_vermelho['ICE'] + dados_azul['ICE'] + dados_branco['ICE']
-        ]
+        'Canal': [canal.capitalize() for canal in canais] + ['Total'],
+        'DLI Final (mol/m²)': [dados_canais[canal]['DLI_final'] for canal in canais] +
+                              [sum(dados_canais[canal]['DLI_final'] for canal in canais)],
+        'ICE (μmol/m²/s)': [dados_canais[canal]['ICE'] for canal in canais] +
+                           [sum(dados_canais[canal]['ICE'] for canal in canais)],
+        'Cor': [cores[canal] for canal in canais] + [COLORS['soma']]
     }
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        options_dli = criar_grafico_barras_dli(dli_data)
+        options_dli = grafico_memorizado(criar_grafico_barras_dli, dli_data)
         st_echarts(options=options_dli, height=300, key="barras_dli")
 
     with col2:
-        options_ice = criar_grafico_barras_ice(dli_data)
+        options_ice = grafico_memorizado(criar_grafico_barras_ice, dli_data)
         st_echarts(options=options_ice, height=300, key="barras_ice")
 
     # Gráfico de Comparação de Intensidades por Canal
     # Calcular intensidades por canal
     with col3:
         # Usar intensidades calculadas que respeitam a calibração
-        intensidades_max = [dados_azul['intensidade_max'],
-                            dados_vermelho['intensidade_max'],
-                            dados_branco['intensidade_max']]
-        intensidades_min = [dados_azul['intensidade_min'],
-                            dados_vermelho['intensidade_min'],
-                            dados_branco['intensidade_min']]
-
-        options_barras = criar_grafico_comparacao_intensidades_barras(
-            intensidades_max, intensidades_min)
+        options_barras = grafico_memorizado(
+            criar_grafico_comparacao_intensidades_barras,
+            [canal.capitalize() for canal in sistema.canais],
+            [cores[canal] for canal in sistema.canais],
+            [dados_canais[canal]['intensidade_max'] for canal in sistema.canais],
+            [dados_canais[canal]['intensidade_min'] for canal in sistema.canais])
         st_echarts(options=options_barras, height=300,
                    key="comparacao_intensidades_barras_visao_geral")
 
 
+# Widgets cujo valor inicial vem da bancada; são descartados ao importar outra
+PREFIXOS_WIDGETS_BANCADA = ('input_', 'sigma_', 'mi_', 'prop_', 'alvo_', 'hora_inicio_config',
+                            'hora_fim_config', 'n_pontos_config', 'int_max_total_config',
+                            'int_min_total_config', 'canal_detalhado_config',
+                            'canal_configuracao_atual', 'resultado_alvos')
+
+
+def importar_bancada():
+    """Callback do upload: a bancada do JSON (mesmo formato da exportação) substitui a da sessão"""
+    arquivo = st.session_state.upload_bancada_json
+    if arquivo is None:
+        return
+    try:
+        config = configuracao_bancada(json.loads(arquivo.getvalue()))
+    except (ValueError, KeyError, TypeError) as e:
+        st.session_state.erro_importacao_bancada = str(e)
+        return
+
+    for chave, valor in config.items():
+        st.session_state[chave] = valor
+    # Estatísticas e widgets voltam a ser montados a partir da bancada importada
+    st.session_state.estatisticas_calibracao = {}
+    st.session_state.regressoes_calibracao = {}
+    for chave in [chave for chave in st.session_state
+                  if str(chave).startswith(PREFIXOS_WIDGETS_BANCADA)]:
+        del st.session_state[chave]
+
+
 def exibir_calibracao_bancada():
     """Exibe a interface de calibração da bancada"""
 
-    # Selecionar canal
-    canal_selecionado = st.selectbox(
-        "Selecione o canal para calibração:",
-        ["Vermelho", "Azul", "Branco"],
-        key="canal_calibracao"
-    )
+    col_canal, col_importar = st.columns([3, 1])
+
+    with col_canal:
+        # Selecionar canal
+        canal_selecionado = st.selectbox(
+            "Selecione o canal para calibração:",
+            sistema.canais_lamp(),
+            format_func=str.capitalize,
+            key="canal_calibracao"
+        )
+
+    with col_importar:
+        # Bancada exportada (ou preparada para o lote), inclusive com canais extras
+        st.file_uploader("Importar Bancada (JSON)", type="json", key="upload_bancada_json",
+                         on_change=importar_bancada,
+                         help="Substitui calibração e parâmetros pelos do arquivo")
+        erro = st.session_state.pop('erro_importacao_bancada', None)
+        if erro is not None:
+            st.error(f"Bancada inválida: {erro}")
+
+    exibir_grade_calibracao(canal_selecionado)
+
+
+def atualizar_celula_calibracao(canal_key, rep, intens):
+    """Callback de uma célula: só a regressão do canal é refeita"""
+    sistema.atualizar_celula(canal_key, rep, intens,
+                             st.session_state[f"input_{canal_key}_{rep}_{intens}"])
 
-    canal_key = canal_selecionado.lower()
+
+def restaurar_calibracao(canal_key):
+    """Callback do botão de restaurar: valores padrão do canal e células redefinidas"""
+    n_repeticoes, n_intensidades = st.session_state.dados_bancada[canal_key]['dados'].shape
+    st.session_state.dados_bancada[canal_key]['dados'] = DADOS_BANCADA_PADRAO[canal_key]['dados'].copy()
+    st.session_state.dados_bancada[canal_key]['valores_referencia'] = \
+        DADOS_BANCADA_PADRAO[canal_key]['valores_referencia'].copy()
+    sistema.calcular_regressoes((canal_key,))
+
+    # As células voltam a ler o valor padrão na próxima execução
+    for rep in range(n_repeticoes):
+        for intens in range(n_intensidades):
+            st.session_state.pop(f"input_{canal_key}_{rep}_{intens}", None)
+    st.session_state[f'restaurado_{canal_key}'] = True
+
+
+@st.fragment
+def exibir_grade_calibracao(canal_key):
+    """Métricas, grade de medições e gráfico de um canal
+
+    Editar uma célula ou restaurar o canal reexecuta só este fragmento; a
+    regressão já foi atualizada no callback, então métricas e gráfico refletem
+    a edição na mesma execução.
+    """
     dados_canal = st.session_state.dados_bancada[canal_key]
+    n_repeticoes, n_intensidades = dados_canal['dados'].shape
 
     col1, col2 = st.columns([3, 1])
 
@@ -2292,53 +1956,28 @@ def exibir_calibracao_bancada():
                     st.metric(label, value, delta=unit if unit else None)
 
     with col2:
-        if st.button(icon="🔄", label="Restaurar Valores Padrão",
-                     key=f"reset_button_{canal_key}",
-                     help="Restaura os valores padrão de calibração para este canal"):
-            # Restaurar valores padrão para cada canal
-            if canal_key == 'azul':
-                default_data = np.array([
-                    [24.86, 29.3, 27.6, 22.53, 29.51],
-                    [76.45, 74.32, 73.75, 58.78, 66.12],
-                    [114.8, 106.9, 114.6, 102.9, 100.9],
-                    [135.5, 127.1, 138.0, 120.2, 119.8],
-                    [175.7, 177.0, 164.1, 145.0, 170.0]
-                ]).T
-                default_ref = np.array([0, 0.3, 0.5, 0.7, 1.0])
-            elif canal_key == 'vermelho':
-                default_data = np.array([
-                    [58.12, 57.3, 54.3, 55.9, 52.0],
-                    [143.9, 168.3, 160.4, 147.6, 158.1],
-                    [235.3, 227.2, 198.0, 233.5, 224.5],
-                    [279.5, 293.3, 272.2, 302.7, 281.7],
-                    [360.5, 354.2, 407.3, 398.5, 367.8]
-                ]).T
-                default_ref = np.array([0, 0.3, 0.5, 0.7, 1.0])
-            else:  # branco
-                default_data = np.array([
-                    [20.61, 24.51, 24.24, 22.42, 23.14],
-                    [62.13, 67.69, 58.93, 59.12, 55.09],
-                    [69.18, 92.19, 91.02, 86.68, 84.73],
-                    [109.8, 104.6, 117.0, 113.7, 110.3],
-                    [120.8, 150.9, 143.3, 130.7, 143.9]
-                ]).T
-                default_ref = np.array([0, 0.3, 0.5, 0.7, 1.0])
-
-            st.session_state.dados_bancada[canal_key]['dados'] = default_data
-            st.session_state.dados_bancada[canal_key]['valores_referencia'] = default_ref
-
-            sistema.calcular_regressoes()
-
-            st.success(
-                f"✅ Valores padrão restaurados para {canal_key.capitalize()}!")
-            st.rerun()
+        # Canais fora do padrão (importados) não têm valores padrão para restaurar
+        st.button(icon="🔄", label="Restaurar Valores Padrão",
+                  key=f"reset_button_{canal_key}",
+                  help="Restaura os valores padrão de calibração para este canal",
+                  on_click=restaurar_calibracao, args=(canal_key,),
+                  disabled=canal_key not in DADOS_BANCADA_PADRAO)
 
         # Exibir mensagem de confirmação se acabou de restaurar
         if st.session_state.get(f'restaurado_{canal_key}', False):
-            st.info(
-                f"Valores padrão do canal {canal_key.capitalize()} foram restaurados.")
+            st.success(
+                f"✅ Valores padrão restaurados para {canal_key.capitalize()}!")
             st.session_state[f'restaurado_{canal_key}'] = False
 
+        # Configuração completa da bancada para a exportação em lote (scripts/lote.py)
+        st.download_button(
+            icon="💾", label="Exportar Bancada (JSON)",
+            data=configuracao_para_json(sistema, "bancada"),
+            file_name="bancada.json",
+            mime="application/json",
+            key="download_bancada_json",
+            help="Salva calibração e parâmetros para processamento em lote")
+
     # Interface de entrada de dados
     col1, col2 = st.columns([2, 2])
 
@@ -2348,139 +1987,79 @@ def exibir_calibracao_bancada():
 
         grid_container = st.container()
         with grid_container:
-            cols = st.columns(6, width=800)
+            cols = st.columns(n_intensidades + 1, width=800)
             with cols[0]:
                 st.markdown("**Repetição**", unsafe_allow_html=True,
                             text_alignment="center")
-            for i in range(5):
+            for i in range(n_intensidades):
                 with cols[i+1]:
                     st.markdown(
                         f"**Intensidade**</br>{ref_vals[i]*100}%</br>",
                         unsafe_allow_html=True,
                         text_alignment="center")
 
-            for rep in range(5):
-                cols = st.columns(6, width=800)
+            for rep in range(n_repeticoes):
+                cols = st.columns(n_intensidades + 1, width=800)
                 with cols[0]:
                     st.markdown(f"**{rep+1}**", text_alignment="center")
-                for intens in range(5):
+                for intens in range(n_intensidades):
                     with cols[intens+1]:
-                        key = f"input_{canal_key}_{rep}_{intens}"
-                        valor = st.number_input(
+                        st.number_input(
                             "",
                             min_value=0.0,
                             max_value=1000.0,
                             value=float(dados_canal['dados'][rep, intens]),
                             step=0.1,
                             format="%.2f",
-                            key=key,
+                            key=f"input_{canal_key}_{rep}_{intens}",
                             label_visibility="collapsed",
+                            on_change=atualizar_celula_calibracao,
+                            args=(canal_key, rep, intens)
                         )
-                        if valor != dados_canal['dados'][rep, intens]:
-                            dados_canal['dados'][rep, intens] = valor
-                            sistema.calcular_regressoes()
 
     # Criar gráfico para regressão
     with col2:
-        reg = sistema.regressoes[canal_key]
-        x_ref = st.session_state.dados_bancada[canal_key]['valores_referencia']
+        regressao = sistema.regressoes[canal_key]
+        options = grafico_memorizado(
+            criar_grafico_calibracao, canal_key.capitalize(),
+            st.session_state.dados_bancada[canal_key]['valores_referencia'],
+            dados_canal['dados'], regressao['medias'], regressao['valores_previstos_media'],
+            cor_canal_bancada(canal_key))
+        st_echarts(options=options, height=500, key="calibracao_grafico",
+                   renderer="canvas")
 
-        # Preparar dados para o gráfico
-        series_data = []
 
-        # Adicionar repetições
-        for rep in range(5):
-            series_data.append({
-                "name": f'Rep {rep+1}',
-                "type": "scatter",
-                "data": [[float(x_ref[i]), float(dados_canal['dados'][rep, i])] for i in range(5)],
-                "symbolSize": 8,
-                "itemStyle": {
-                    "color": f'rgba({100 + rep * 30}, {100 + rep * 30}, {100 + rep * 30}, 0.7)'
-                }
-            })
+def aplicar_alvos_gaussianas(alvos, grandeza):
+    """Resolve σ para os alvos informados e aplica aos parâmetros da sessão"""
+    solucao = resolver_alvos(sistema, alvos, grandeza)
+    st.session_state.resultado_alvos = solucao['resultados']
 
-        # Adicionar média
-        medias = sistema.regressoes[canal_key]['medias']
-        series_data.append({
-            "name": 'Média',
-            "type": "line",
-            "data": [[float(round(x_ref[i], 1)), float(round(medias[i], 1))] for i in range(5)],
-            "lineStyle": {
-                "color": COLORS["soma"],
-                "width": 3
-            },
-            "symbol": "circle",
-            "symbolSize": 12,
-            "itemStyle": {
-                "color": COLORS["soma"]
-            }
-        })
+    for canal, resultado in solucao['resultados'].items():
+        st.session_state.parametros_gaussianos[f'canal_{canal}']['sigma'] = resultado['sigma']
+        # Sincroniza o slider de σ com o novo valor
+        st.session_state[f'sigma_{canal}_config'] = resultado['sigma']
 
-        # Adicionar regressão
-        y_previsto = sistema.regressoes[canal_key]['valores_previstos_media']
-        series_data.append({
-            "name": 'Regressão (média)',
-            "type": "line",
-            "data": [[float(x_ref[i]), float(y_previsto[i])] for i in range(5)],
-            "lineStyle": {
-                "color": COLORS['vermelho'] if canal_key == 'vermelho' else COLORS['azul'] if canal_key == 'azul' else COLORS['branco'],
-                "width": 2,
-                "type": "dashed"
-            },
-            "smooth": True,
-            "showSymbol": False
-        })
 
-        options = {
-            "title": {
-                "text": f'Regressão Linear - Canal {canal_selecionado}',
-                "left": "center"
-            },
-            "tooltip": {},
-            "legend": {
-                "data": [f'Rep {i+1}' for i in range(5)] + ['Média', 'Regressão (média)'],
-                "top": "10%",
-                "type": "scroll"
-            },
-            "xAxis": {
-                "name": "Valor de Referência",
-                "nameLocation": "middle",
-                "nameGap": 30,
-                "type": "value"
-            },
-            "yAxis": {
-                "name": "PPFD Medido (μmol/m²/s)",
-                "nameLocation": "middle",
-                "nameGap": 50,
-                "type": "value"
-            },
-            "series": series_data,
-            "grid": {
-                "left": "15%",
-                "right": "10%",
-                "bottom": "20%",
-                "top": "20%"
-            }
-        }
-
-        st_echarts(options=options, height=500, key="calibracao_grafico",
-                   renderer="canvas")
+def atualizar_parametros_canais():
+    """Callback de proporções e totais: grava os parâmetros antes da execução"""
+    params = st.session_state.parametros_canais
+    params['intensidade_max_total'] = st.session_state.int_max_total_config
+    params['intensidade_min_total'] = st.session_state.int_min_total_config
+    for canal in sistema.canais:
+        params[f'proporcao_{canal}'] = float(st.session_state[f'prop_{canal}_config'])
 
 
+@st.fragment
 def exibir_configurar_canais():
-    """Exibe a interface para configurar os canais"""
+    """Exibe a interface para configurar os canais; seus controles reexecutam só esta aba"""
+
+    exibir_configuracoes()
+
+    canais = sistema.canais_lamp()
 
     # Inicializar estado da visualização se não existir
-    if 'canal_configuracao_atual' not in st.session_state:
-        st.session_state.canal_configuracao_atual = "Vermelho"
-
-    if 'ultima_atualizacao_config' not in st.session_state:
-        st.session_state.ultima_atualizacao_config = {
-            'proporcoes': (1.0, 1.0, 1.0),
-            'gaussianas': (0.3, 0.3, 0.3, 0.5, -0.5, 0.0),
-            'intensidades': (650.0, 120.0)
-        }
+    if st.session_state.get('canal_configuracao_atual') not in canais:
+        st.session_state.canal_configuracao_atual = canais[0]
 
     # Formulário de configuração
     col1, col2, col3 = st.columns([1, 2, 2])
@@ -2488,69 +2067,37 @@ def exibir_configurar_canais():
     with col1:
         st.subheader("🔍 Visualizar", anchor=False)
         # Seletor para visualização detalhada do canal
-        canal_selecionado = st.selectbox(
+        canal_nome = st.selectbox(
             "Selecione o canal",
-            ["Vermelho", "Azul", "Branco"],
+            canais,
+            format_func=str.capitalize,
             key="canal_detalhado_config",
-            index=["Vermelho", "Azul", "Branco"].index(
-                st.session_state.canal_configuracao_atual)
+            index=canais.index(st.session_state.canal_configuracao_atual)
         )
 
         # Armazenar a seleção atual
-        if canal_selecionado != st.session_state.canal_configuracao_atual:
-            st.session_state.canal_configuracao_atual = canal_selecionado
-
-        # Mapear seleção para nomes internos
-        canal_map = {
-            "Vermelho": ("vermelho", "🔴", "Vermelho"),
-            "Azul": ("azul", "🔵", "Azul"),
-            "Branco": ("branco", "⚪", "Branco")
-        }
+        st.session_state.canal_configuracao_atual = canal_nome
 
-    canal_nome, emoji, nome_display = canal_map[canal_selecionado]
+    emoji, nome_display = emoji_canal(canal_nome), canal_nome.capitalize()
 
     with col2:
         st.subheader("📊 Proporções",
                      help="Proporção física entre os LEDs", anchor=False)
 
-        # Number inputs con valores inteiros de 1 a 5
-        col_slider1, col_slider2, col_slider3 = st.columns(3)
-
-        with col_slider1:
-            proporcao_azul = st.number_input(
-                "Azul",
-                min_value=1,
-                max_value=5,
-                value=int(
-                    st.session_state.parametros_canais['proporcao_azul']),
-                step=1,
-                key="prop_azul_config",
-                help="Proporção do canal Azul (1 a 5)"
-            )
-
-        with col_slider2:
-            proporcao_vermelho = st.number_input(
-                "Vermelho",
-                min_value=1,
-                max_value=5,
-                value=int(
-                    st.session_state.parametros_canais['proporcao_vermelho']),
-                step=1,
-                key="prop_vermelho_config",
-                help="Proporção do canal Vermelho (1 a 5)"
-            )
-
-        with col_slider3:
-            proporcao_branco = st.number_input(
-                "Branco",
-                min_value=1,
-                max_value=5,
-                value=int(
-                    st.session_state.parametros_canais['proporcao_branco']),
-                step=1,
-                key="prop_branco_config",
-                help="Proporção do canal Branco (1 a 5)"
-            )
+        # Number inputs con valores inteiros de 1 a 5, um por canal da bancada
+        for canal, col_proporcao in zip(sistema.canais, st.columns(len(sistema.canais))):
+            with col_proporcao:
+                st.number_input(
+                    canal.capitalize(),
+                    min_value=1,
+                    max_value=5,
+                    value=int(
+                        st.session_state.parametros_canais[f'proporcao_{canal}']),
+                    step=1,
+                    key=f"prop_{canal}_config",
+                    help=f"Proporção do canal {canal.capitalize()} (1 a 5)",
+                    on_change=atualizar_parametros_canais
+                )
 
     with col3:
         st.subheader("⚡ Intensidades Totais",
@@ -2561,46 +2108,46 @@ def exibir_configurar_canais():
         col_max, col_min = st.columns(2)
 
         with col_max:
-            intensidade_max_total = st.number_input(
+            st.number_input(
                 "Máx. Total (μmol/m²/s)",
                 min_value=0.0,
                 max_value=2000.0,
                 value=st.session_state.parametros_canais['intensidade_max_total'],
                 step=10.0,
                 key="int_max_total_config",
-                help="Intensidade máxima total combinada dos canais"
+                help="Intensidade máxima total combinada dos canais",
+                on_change=atualizar_parametros_canais
             )
 
         with col_min:
-            intensidade_min_total = st.number_input(
+            st.number_input(
                 "Mín. Total (μmol/m²/s)",
                 min_value=0.0,
                 max_value=1000.0,
                 value=st.session_state.parametros_canais['intensidade_min_total'],
                 step=10.0,
                 key="int_min_total_config",
-                help="Intensidade mínima total combinada dos canais"
+                help="Intensidade mínima total combinada dos canais",
+                on_change=atualizar_parametros_canais
             )
 
     # Exibir detalhes do canal selecionado
     st.markdown("---")
 
-    # Obter dados do canal
-    dados = sistema.get_dados_canal(canal_nome)
+    # Obter dados de todos os canais em um único bloco vetorizado
+    dados_canais = sistema.get_dados_canais()
+    dados = dados_canais[canal_nome]
     params_gauss = st.session_state.parametros_gaussianos[f'canal_{canal_nome}']
     params_temp = st.session_state.parametros_temporais
 
     # Gráfico comparativo de intensidades
     st.subheader(f"📈 Comparação de Intensidades - Todos os Canais")
 
-    # Obter dados de todos os canais para o gráfico comparativo
-    dados_vermelho = sistema.get_dados_canal('vermelho')
-    dados_azul = sistema.get_dados_canal('azul')
-    dados_branco = sistema.get_dados_canal('branco')
-
-    options_intensidades = criar_grafico_comparacao_intensidades(
-        dados_vermelho, dados_azul, dados_branco)
-    options_intensidades = apply_base_config(options_intensidades)
+    # Dados de todos os canais para o gráfico comparativo
+    options_intensidades = grafico_memorizado(
+        criar_grafico_comparacao_intensidades,
+        {canal: dados_canais[canal] for canal in canais},
+        {canal: cor_canal_bancada(canal) for canal in canais})
 
     # Usar uma chave estável para o gráfico comparativo
     st_echarts(options=options_intensidades, height=500,
@@ -2608,37 +2155,6 @@ def exibir_configurar_canais():
 
     st.subheader(f"{emoji} Detalhes do Canal {nome_display}")
 
-    # Verificar se houve mudanças nos parâmetros
-    mudancas_detectadas = False
-    proporcoes_atual = (
-        float(proporcao_azul),
-        float(proporcao_vermelho),
-        float(proporcao_branco)
-    )
-    proporcoes_anterior = st.session_state.ultima_atualizacao_config['proporcoes']
-
-    intensidades_atual = (intensidade_max_total, intensidade_min_total)
-    intensidades_anterior = st.session_state.ultima_atualizacao_config['intensidades']
-
-    # Verificar se houve mudanças
-    if (proporcoes_atual != proporcoes_anterior or
-            intensidades_atual != intensidades_anterior):
-        mudancas_detectadas = True
-        st.session_state.ultima_atualizacao_config.update({
-            'proporcoes': proporcoes_atual,
-            'intensidades': intensidades_atual
-        })
-
-    # Atualizar parâmetros somente se houver mudanças
-    if mudancas_detectadas:
-        st.session_state.parametros_canais.update({
-            'intensidade_max_total': intensidade_max_total,
-            'intensidade_min_total': intensidade_min_total,
-            'proporcao_azul': float(proporcao_azul),
-            'proporcao_vermelho': float(proporcao_vermelho),
-            'proporcao_branco': float(proporcao_branco)
-        })
-
     container_detalhes = st.container()
 
     with container_detalhes:
@@ -2646,15 +2162,15 @@ def exibir_configurar_canais():
 
         with col1:
             # Gráfico de intensidade - usar chave única baseada no canal
-            cor = COLORS['vermelho'] if canal_nome == 'vermelho' else COLORS['azul'] if canal_nome == 'azul' else COLORS['branco']
-            options_intensidade = criar_grafico_canal_detalhes(
-                dados, canal_nome, cor, params_gauss)
+            cor = cor_canal_bancada(canal_nome)
+            options_intensidade = grafico_memorizado(
+                criar_grafico_canal_detalhes, dados, canal_nome, cor, params_gauss)
             st_echarts(options=options_intensidade, height=400,
                        key=f"intensidade_{canal_nome}_config_detalhe")
 
         with col2:
             # Gráfico da integral - usar chave única baseada no canal
-            options_integral = criar_grafico_integral(dados, canal_nome, cor)
+            options_integral = grafico_memorizado(criar_grafico_integral, dados, canal_nome, cor)
             st_echarts(options=options_integral, height=400,
                        key=f"integral_{canal_nome}_config_detalhe",
                        renderer="canvas",
@@ -2662,56 +2178,101 @@ def exibir_configurar_canais():
 
         with col3:
             # Gráfico da distribuição gaussiana - usar chave única baseada no canal
-            options_gaussiana = criar_grafico_gaussiana(
-                dados, canal_nome, cor, params_gauss['sigma'], params_gauss['mi'])
+            options_gaussiana = grafico_memorizado(
+                criar_grafico_gaussiana, dados, canal_nome, cor,
+                params_gauss['sigma'], params_gauss['mi'])
             st_echarts(options=options_gaussiana, height=400,
                        key=f"gaussiana_{canal_nome}_config_detalhe")
 
+    # Ajuste inverso: σ de cada canal a partir de um DLI/ICE alvo
+    with st.expander("🎯 Ajuste por Alvo (DLI/ICE)", expanded=False):
+        st.caption("Resolve apenas o σ de cada canal, com o modo de integração atual. "
+                   "Proporções e totais de intensidade não são alterados: um alvo fora da "
+                   "faixa atingível exige ajustá-los manualmente.")
+        grandeza = st.radio("Grandeza alvo", list(GRANDEZAS_ALVO),
+                            format_func=GRANDEZAS_ALVO.get, horizontal=True,
+                            key="alvo_grandeza")
+
+        alvos = {}
+        for canal, coluna in zip(canais, st.columns(len(canais))):
+            with coluna:
+                alvos[canal] = st.number_input(
+                    f"{canal.capitalize()} - {GRANDEZAS_ALVO[grandeza]}",
+                    min_value=0.0,
+                    value=round(float(dados_canais[canal][grandeza]), 3),
+                    step=0.1,
+                    format="%.3f",
+                    key=f"alvo_{grandeza}_{canal}")
+
+        st.button("Calcular σ", key="calcular_alvos", use_container_width=True,
+                  on_click=aplicar_alvos_gaussianas, args=(alvos, grandeza),
+                  help="Mantém μ, proporções e totais; ajusta apenas σ de cada canal")
+
+        for canal, resultado in st.session_state.get('resultado_alvos', {}).items():
+            if resultado['atingivel']:
+                st.success(f"{canal.capitalize()}: {resultado['mensagem']}")
+            else:
+                st.warning(f"{canal.capitalize()}: {resultado['mensagem']}")
+
+    # Varredura de parâmetros do canal selecionado
+    with st.expander(f"🗺️ Varredura de Parâmetros - Canal {nome_display}", expanded=False):
+        exibir_varredura(canal_nome, cor)
+
+
+@st.fragment
+def exibir_varredura(canal_nome, cor):
+    """Mapa de calor da varredura; eixos, métrica e grade reexecutam só este fragmento"""
+    col_vx, col_vy, col_vm, col_vn = st.columns(4)
+    # Inclui as proporções dos canais extras da bancada
+    parametros = parametros_varredura(sistema.canais)
+
+    with col_vx:
+        eixo_x = st.selectbox(
+            "Eixo X", parametros,
+            format_func=rotulo_varredura, index=0, key="varredura_eixo_x")
+
+    with col_vy:
+        opcoes_y = [p for p in parametros if p != eixo_x]
+        eixo_y = st.selectbox(
+            "Eixo Y", opcoes_y,
+            format_func=rotulo_varredura, index=0, key="varredura_eixo_y")
+
+    with col_vm:
+        metrica = st.selectbox(
+            "Métrica", list(METRICAS_VARREDURA),
+            format_func=METRICAS_VARREDURA.get, key="varredura_metrica")
+
+    with col_vn:
+        n_grade = st.slider("Pontos por eixo", 5, 60, 25, key="varredura_n")
+
+    grades = {}
+    for eixo in (eixo_x, eixo_y):
+        inicio, fim = faixa_varredura(eixo)
+        if eixo.startswith('proporcao_'):
+            grades[eixo] = np.arange(inicio, fim + 1)
+        else:
+            grades[eixo] = np.linspace(inicio, fim, n_grade)
+
+    resultado = varrer_parametros(sistema, canal_nome, **grades)
+    st_echarts(options=grafico_memorizado(criar_grafico_mapa_calor, resultado, metrica, cor),
+               height=450, key="varredura_mapa_calor")
+
 
 def exibir_simular_espectro():
     """Exibe a interface para simulação de espectros usando ECharts"""
 
-    import json
     import os
-    # Carregar espectros do arquivo spectra_data.json
+    # Carregar espectros da biblioteca compilada de spectra_data.json
+    # (recompilada apenas quando o checksum do JSON muda; leitura por memória mapeada)
     spectra_path = os.path.join(os.path.dirname(__file__), "spectra_data.json")
-    # usar cache para leitura do JSON (evita re-leitura em cada rerun)
+    biblioteca = carregar_biblioteca(spectra_path)
 
-    @st.cache_data
-    def load_spectra(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    spectra_data = load_spectra(spectra_path)
-
-    # Verificar consistência dos comprimentos entre 'wavelengths' e arrays de dados
-    def _check_spectra_lengths(spectra):
-        candidate_keys = ("irradiance",
-                          "absorbance", "values", "data")
-        problems = []
-        for name, obj in spectra.items():
-            wl = obj.get("wavelengths")
-            if not isinstance(wl, list):
-                problems.append(
-                    (name, "wavelengths missing or not list", None, None))
-                continue
-            wl_len = len(wl)
-            found = False
-            for k in candidate_keys:
-                if k in obj:
-                    found = True
-                    arr = obj.get(k)
-                    if not isinstance(arr, list):
-                        problems.append((name, k + " not list", wl_len, None))
-                    elif len(arr) != wl_len:
-                        problems.append((name, k, wl_len, len(arr)))
-                    break
-            if not found:
-                problems.append(
-                    (name, "no data array (irradiance/absorbance/...)", wl_len, None))
-        return problems
-
-    inconsistencies = _check_spectra_lengths(spectra_data)
+    relatorio_correcao = st.session_state.pop('relatorio_correcao_espectros', None)
+    if relatorio_correcao is not None:
+        st.success("Correção executada. spectra_data.json recarregado (original salvo em .bak).")
+        st.code("\n".join(str(linha) for linha in relatorio_correcao) or "(sem alterações)")
+
+    inconsistencies = biblioteca.inconsistencias()
     if inconsistencies:
         # Agrupar todas as mensagens em um único balão para manter a interface limpa
         lines = [
@@ -2725,41 +2286,16 @@ def exibir_simular_espectro():
                     f" - {name}: {key} (wavelengths={wl_len} vs {key}={arr_len})")
         st.warning("\n".join(lines))
 
-        # Oferecer ação de correção automática
-        if st.button("Corrigir automaticamente (interpolar) usando scripts/fix_spectra_interpolate.py"):
-            import subprocess
+        # Oferecer ação de correção automática (no próprio processo, com escrita atômica)
+        if st.button("Corrigir automaticamente (interpolar)"):
             try:
-                res = subprocess.run(
-                    ["python3", "scripts/fix_spectra_interpolate.py"], capture_output=True, text=True, check=False)
-                st.code(res.stdout or "(sem saída)")
-                if res.stderr:
-                    st.error(res.stderr)
-                # limpar cache e recarregar os dados
-                try:
-                    load_spectra.clear()
-                except Exception:
-                    pass
-                spectra_data = load_spectra(spectra_path)
-                st.success(
-                    "Correção executada. spectra_data.json recarregado.")
-                # recomputar inconsistências para informar ao usuário
-                inconsistencies = _check_spectra_lengths(spectra_data)
-                if inconsistencies:
-                    lines2 = ["Após correção, ainda há inconsistências:"]
-                    for entry in inconsistencies:
-                        name, key, wl_len, arr_len = entry
-                        lines2.append(
-                            f" - {name}: {key} (wavelengths={wl_len} vs {key}={arr_len})")
-                    st.warning("\n".join(lines2))
-                    st.stop()
-                else:
-                    st.info(
-                        "Todos os espectros têm comprimentos compatíveis agora.")
-                    st.info(
-                        "Por favor, recarregue manualmente a página (F5) para aplicar as mudanças e continuar.")
-                    st.stop()
+                relatorio, _ = fix_file(spectra_path)
             except Exception as e:
-                st.error(f"Falha ao executar o script de correção: {e}")
+                st.error(f"Falha ao corrigir spectra_data.json: {e}")
+            else:
+                # Na próxima execução o checksum alterado força a recompilação
+                st.session_state.relatorio_correcao_espectros = relatorio
+                st.rerun()
 
         # Interromper a execução enquanto houver inconsistências para evitar renderizar gráficos
         st.info("Corrija as inconsistências no arquivo spectra_data.json ou use o botão acima. A página ficará parada até a correção.")
@@ -2786,7 +2322,7 @@ def exibir_simular_espectro():
         }
         return nomes.get(chave, chave)
 
-    opcoes_espectros = list(spectra_data.keys())
+    opcoes_espectros = biblioteca.nomes()
     opcoes_amigaveis = [nome_amigavel(k) for k in opcoes_espectros]
 
     # Divisão em duas colunas para configurações
@@ -2824,7 +2360,7 @@ def exibir_simular_espectro():
         )
         limiar_picos = float(limiar_picos_pct) / 100.0
 
-    c_native, c_log, col3, col4 = st.columns([2, 2, 1, 1])
+    c_native, c_log, c_bandas, c_ponderacao = st.columns([2, 2, 2, 2])
 
     with c_native:
         use_native = st.checkbox(
@@ -2841,101 +2377,85 @@ def exibir_simular_espectro():
             help="Normaliza visualmente os espectros dos LEDs para o intervalo [0,1] apenas na visualização (não altera cálculos)."
         )
 
+    with c_bandas:
+        conjunto_bandas = st.selectbox(
+            "Bandas PFD:",
+            list(CONJUNTOS_BANDAS),
+            help="Conjunto de bandas integradas nas tabelas de PFD (PAR ou PAR estendido)."
+        )
+        bandas = CONJUNTOS_BANDAS[conjunto_bandas]
+
+    with c_ponderacao:
+        # Fotorreceptores/pigmentos da biblioteca podem ponderar o erro do ajuste LAMP
+        ponderacao = st.selectbox(
+            "Ponderação do erro:",
+            ["Uniforme"] + [nome for nome in biblioteca.nomes()
+                            if biblioteca.tipo(nome) == "absorbance"],
+            help="Pondera o erro do ajuste das proporções LAMP pelo espectro de absorção escolhido (ex.: fotorreceptor)."
+        )
+
     # grid preliminar (pode ser sobrescrito pela resolução nativa mais abaixo)
     wavelengths = np.arange(faixa_min, faixa_max + resolucao, resolucao)
 
-    espectro_json = spectra_data.get(espectro_ref)
-    if espectro_json is None:
+    if espectro_ref not in biblioteca:
         st.error(
             f"Espectro '{espectro_ref}' não encontrado no arquivo spectra_data.json.")
         return
 
-    # Cálculos pesados e reamostragem cacheados para minimizar custo em reruns
+    # Cálculos pesados e reamostragem cacheados para minimizar custo em reruns.
+    # A chave é o nome do espectro + versão (checksum) da biblioteca: custo O(1)
+    # independente do tamanho da biblioteca, que não entra no hash (_biblioteca).
+    # Canais da bancada na ordem das saídas LAMP: (canal, espectro do LED na
+    # biblioteca, primeira saída LAMP); os LEDs formam a base das misturas
+    primeira_saida = {}
+    for saida, canal in sistema.saidas_lamp():
+        primeira_saida.setdefault(canal, saida)
+    canais_lamp = tuple((canal, sistema.espectro_canal(canal), saida)
+                        for canal, saida in primeira_saida.items())
+
+    def pesos_ponderacao(ponderacao, wavelengths, biblioteca):
+        """Pesos do erro do ajuste: absorção normalizada (0-1) ou None se uniforme"""
+        if ponderacao == "Uniforme":
+            return None
+        pesos = np.clip(biblioteca.reamostrar(ponderacao, wavelengths), 0, None)
+        return pesos / pesos.max() if pesos.max() > 0 else pesos
+
+    # Limites de calibração entram na chave (recalibrar refaz o ajuste); a solução
+    # anterior (_inicio) só acelera o ajuste e fica fora do hash.
     @st.cache_data
-    def compute_spectral_data(espectro_json, spectra_data, faixa_min, faixa_max, resolucao, use_native, max_points=2000):
+    def compute_spectral_data(espectro_ref, versao_biblioteca, faixa_min, faixa_max, resolucao, use_native,
+                              bandas, ponderacao, canais_lamp, limites_calibracao, _biblioteca,
+                              _inicio=None):
         # preparar grade
         wavelengths = np.arange(faixa_min, faixa_max + resolucao, resolucao)
 
         # resolver grade nativa
         if use_native:
-            native_wl = np.array(espectro_json.get(
-                "wavelengths", []), dtype=float)
+            native_wl = np.asarray(_biblioteca.comprimentos_onda(espectro_ref), dtype=float)
             if native_wl.size > 0:
                 mask = (native_wl >= faixa_min) & (native_wl <= faixa_max)
                 native_grid = native_wl[mask]
                 if native_grid.size > 0:
                     wavelengths = native_grid
 
-        # safety cap
-        if len(wavelengths) > max_points:
-            factor = int(np.ceil(len(wavelengths) / max_points))
-            wavelengths = wavelengths[::factor]
+        # Cálculos na grade completa; os gráficos reduzem a PONTOS_POR_GRAFICO por LTTB
 
-        espectro_wl = np.array(espectro_json.get(
-            "wavelengths", []), dtype=float)
-        if "absorbance" in espectro_json:
-            espectro_vals = np.array(espectro_json["absorbance"], dtype=float)
+        tipo_dados = _biblioteca.tipo(espectro_ref)
+        if tipo_dados == "absorbance":
             tipo_espectro = "absorbância"
             cor_espectro = "#2E86AB"
-        elif "irradiance" in espectro_json:
-            espectro_vals = np.array(espectro_json["irradiance"], dtype=float)
+        elif tipo_dados == "irradiance":
             tipo_espectro = "irradiance"
             cor_espectro = "#FFD166"
         else:
-            espectro_vals = np.array([])
             tipo_espectro = "unknown"
             cor_espectro = "#999"
 
-        if espectro_wl.size == 0 or espectro_vals.size == 0:
-            espectro_ref_valores = np.zeros_like(wavelengths, dtype=float)
-        else:
-            espectro_ref_valores = np.interp(
-                wavelengths, espectro_wl, espectro_vals)
-
-        # carregar LEDs e reamostrar
-        def interp_led(key):
-            led_json = spectra_data.get(key, {})
-            if not led_json:
-                return np.zeros_like(wavelengths, dtype=float)
-            xp = np.array(led_json.get("wavelengths", []), dtype=float)
-            # try common keys for led data
-            fp = None
-            for k in ("irradiance", "absorbance", "values", "data"):
-                if k in led_json:
-                    fp = np.array(led_json.get(k, []), dtype=float)
-                    break
-            if fp is None:
-                fp = np.array([])
-
-            if xp.size == 0 or fp.size == 0:
-                return np.zeros_like(wavelengths, dtype=float)
-
-            if xp.size == fp.size:
-                order = np.argsort(xp)
-                xp_s = xp[order]
-                fp_s = fp[order]
-                return np.interp(wavelengths, xp_s, fp_s)
-
-            if fp.size == 1:
-                return np.full_like(wavelengths, float(fp[0]), dtype=float)
-
-            # fallback: assume fp sampled uniformly across xp_range
-            try:
-                xp_fp = np.linspace(xp.min(), xp.max(), fp.size)
-                f = interp1d(xp_fp, fp, kind='linear',
-                             bounds_error=False, fill_value=0.0)
-                fp_on_xp = f(xp) if xp.size > 1 else np.full_like(
-                    xp, float(fp.mean()))
-                order = np.argsort(xp)
-                xp_s = xp[order]
-                fp_s = fp_on_xp[order]
-                return np.interp(wavelengths, xp_s, fp_s)
-            except Exception:
-                return np.zeros_like(wavelengths, dtype=float)
-
-        led_vermelho = interp_led("LED_Vermelho")
-        led_azul = interp_led("LED_Azul")
-        led_branco = interp_led("LED_Branco")
+        # Biblioteca inteira reamostrada uma vez por grade; cada espectro é uma linha
+        espectro_ref_valores = _biblioteca.reamostrar(espectro_ref, wavelengths)
+        # Matriz (canais, comprimentos) com o espectro do LED de cada canal
+        leds = np.vstack([_biblioteca.reamostrar(espectro, wavelengths)
+                          for _, espectro, _ in canais_lamp])
 
         # escala se for irradiance
         if tipo_espectro == "irradiance" and espectro_ref_valores.sum() > 0:
@@ -2946,107 +2466,79 @@ def exibir_simular_espectro():
 
         # funções utilitarias
         def identificar_picos(espectro, wavelengths, threshold=0.3):
-            picos = []
-            for i in range(1, len(espectro)-1):
-                if espectro[i] > espectro[i-1] and espectro[i] > espectro[i+1] and espectro[i] > threshold:
-                    picos.append({'wavelength': float(
-                        wavelengths[i]), 'intensity': float(espectro[i]), 'fwhm': 20})
-            return picos
-
-        def calcular_pfd_bandas(espectro, wavelengths):
-            bandas = {'UV': (380, 400), 'BLUE': (400, 500), 'GREEN': (
-                500, 600), 'RED': (600, 700), 'FAR_RED': (700, 780)}
-            resultados = {}
-            for nome, (min_wl, max_wl) in bandas.items():
-                mask = (wavelengths >= min_wl) & (wavelengths <= max_wl)
-                if np.any(mask):
-                    area = np.trapezoid(espectro[mask], wavelengths[mask])
-                    resultados[nome] = float(area / 1000)
-                else:
-                    resultados[nome] = 0.0
-            mask_par = (wavelengths >= 400) & (wavelengths <= 700)
-            resultados['PPFD'] = float(np.trapezoid(
-                espectro[mask_par], wavelengths[mask_par]) / 1000) if np.any(mask_par) else 0.0
-            return resultados
-
-        def calcular_lamp_otimo(espectro_ref, led_v, led_a, led_b):
-            X = np.column_stack([led_v, led_a, led_b])
-            coef, residuals, rank, s = np.linalg.lstsq(
-                X, espectro_ref, rcond=None)
-            coef = np.maximum(coef, 0)
-            if coef.max() > 0:
-                coef = coef / coef.max()
-            return [float(c) for c in coef]
+            # posição, altura, proeminência e FWHM medida de cada máximo local
+            return picos_como_lista(analisar_picos(wavelengths, espectro, threshold))
 
         picos_ref = identificar_picos(espectro_ref_valores, wavelengths)
-        pfd_ref = calcular_pfd_bandas(espectro_ref_valores, wavelengths)
-        pfd_vermelho = calcular_pfd_bandas(led_vermelho, wavelengths)
-        pfd_azul = calcular_pfd_bandas(led_azul, wavelengths)
-        pfd_branco = calcular_pfd_bandas(led_branco, wavelengths)
-
-        coef = calcular_lamp_otimo(
-            espectro_ref_valores, led_vermelho, led_azul, led_branco)
-
-        proporcoes_lamp = {
-            'LAMP_CH1_Vermelho': coef[0], 'LAMP_CH2_Azul': coef[1], 'LAMP_CH3_Branco': coef[2]}
-
-        lamp_ch1 = led_vermelho * proporcoes_lamp['LAMP_CH1_Vermelho']
-        lamp_ch2 = led_azul * proporcoes_lamp['LAMP_CH2_Azul']
-        lamp_ch3 = led_branco * proporcoes_lamp['LAMP_CH3_Branco']
-        lamp_soma = lamp_ch1 + lamp_ch2 + lamp_ch3
-        pfd_lamp_ch1 = calcular_pfd_bandas(lamp_ch1, wavelengths)
-        pfd_lamp_ch2 = calcular_pfd_bandas(lamp_ch2, wavelengths)
-        pfd_lamp_ch3 = calcular_pfd_bandas(lamp_ch3, wavelengths)
-        pfd_lamp_soma = calcular_pfd_bandas(lamp_soma, wavelengths)
+
+        # Mistura LAMP: mínimos quadrados com cada LED entre 0 e o máximo da
+        # calibração do canal; o alvo é a referência com a intensidade de 650 μmol/m²/s
+        integral_ref = np.trapezoid(espectro_ref_valores, wavelengths) / 1000
+        alvo_mistura = espectro_ref_valores * \
+            (650 / integral_ref if integral_ref > 0 else 1.0)
+        pesos_mistura = pesos_ponderacao(ponderacao, wavelengths, _biblioteca)
+        inferior, superior = limites_mistura(leds, wavelengths, limites_calibracao)
+        mistura = resolver_mistura(leds, alvo_mistura, inferior, superior,
+                                   pesos_mistura, _inicio)
+
+        # Proporções exibidas relativas ao canal mais usado
+        coeficientes = mistura['coeficientes']
+        proporcoes_lamp = (coeficientes / coeficientes.max()
+                           if coeficientes.max() > 0 else coeficientes)
+        ppfd_mistura = calcular_pfd(leds, wavelengths, {'PPFD': (400, 700)})[:, 0] * coeficientes
+
+        lamp = leds * proporcoes_lamp[:, None]
+        lamp_soma = lamp.sum(axis=0)
+
+        # PFDs de todos os espectros em um único produto com a matriz de pesos das bandas
+        pilha = np.vstack([espectro_ref_valores, leds, lamp, lamp_soma])
+        pfds = [pfd_como_dicionario(pfd, bandas) for pfd in calcular_pfd(pilha, wavelengths, bandas)]
+        n_canais = len(canais_lamp)
 
         return {
             'wavelengths': wavelengths,
             'espectro_ref_valores': espectro_ref_valores,
-            'led_vermelho': led_vermelho,
-            'led_azul': led_azul,
-            'led_branco': led_branco,
+            'leds': leds,
             'picos_ref': picos_ref,
-            'pfd_ref': pfd_ref,
-            'pfd_vermelho': pfd_vermelho,
-            'pfd_azul': pfd_azul,
-            'pfd_branco': pfd_branco,
+            'pfd_ref': pfds[0],
+            'pfd_leds': pfds[1:1 + n_canais],
             'proporcoes_lamp': proporcoes_lamp,
-            'lamp_ch1': lamp_ch1,
-            'lamp_ch2': lamp_ch2,
-            'lamp_ch3': lamp_ch3,
+            'mistura': mistura,
+            'ppfd_mistura': ppfd_mistura,
+            'lamp': lamp,
             'lamp_soma': lamp_soma,
-            'pfd_lamp_ch1': pfd_lamp_ch1,
-            'pfd_lamp_ch2': pfd_lamp_ch2,
-            'pfd_lamp_ch3': pfd_lamp_ch3,
-            'pfd_lamp_soma': pfd_lamp_soma,
+            'pfd_lamp': pfds[1 + n_canais:1 + 2 * n_canais],
+            'pfd_lamp_soma': pfds[-1],
             'tipo_espectro': tipo_espectro,
             'cor_espectro': cor_espectro
         }
 
     # calcular (cacheado) - menor custo nas reruns
+    limites_calibracao = tuple(
+        float(sistema.regressoes[canal]['limite_max_calibracao'])
+        for canal, _, _ in canais_lamp)
     computed = compute_spectral_data(
-        espectro_json, spectra_data, faixa_min, faixa_max, resolucao, use_native)
+        espectro_ref, biblioteca.versao, faixa_min, faixa_max, resolucao, use_native,
+        bandas, ponderacao, canais_lamp, limites_calibracao, biblioteca,
+        st.session_state.get('mistura_anterior'))
+    st.session_state.mistura_anterior = computed['mistura']['coeficientes']
 
     # expandir resultados locais
     wavelengths = computed['wavelengths']
     espectro_ref_valores = computed['espectro_ref_valores']
-    led_vermelho = computed['led_vermelho']
-    led_azul = computed['led_azul']
-    led_branco = computed['led_branco']
+    leds = computed['leds']
     picos_ref = computed['picos_ref']
     pfd_ref = computed['pfd_ref']
-    pfd_vermelho = computed['pfd_vermelho']
-    pfd_azul = computed['pfd_azul']
-    pfd_branco = computed['pfd_branco']
     proporcoes_lamp = computed['proporcoes_lamp']
-    lamp_ch1 = computed['lamp_ch1']
-    lamp_ch2 = computed['lamp_ch2']
-    lamp_ch3 = computed['lamp_ch3']
+    mistura = computed['mistura']
+    ppfd_mistura = computed['ppfd_mistura']
+    lamp = computed['lamp']
     lamp_soma = computed['lamp_soma']
-    pfd_lamp_ch1 = computed['pfd_lamp_ch1']
-    pfd_lamp_ch2 = computed['pfd_lamp_ch2']
-    pfd_lamp_ch3 = computed['pfd_lamp_ch3']
     pfd_lamp_soma = computed['pfd_lamp_soma']
+
+    # Rótulo e cor de cada canal (LAMP_CH1 (Vermelho), ...)
+    rotulos_lamp = [f"LAMP_CH{saida} ({canal.capitalize()})" for canal, _, saida in canais_lamp]
+    cores_canais = [cor_canal(canal, i) for i, (canal, _, _) in enumerate(canais_lamp)]
     tipo_espectro = computed['tipo_espectro']
     cor_espectro = computed['cor_espectro']
 
@@ -3077,15 +2569,6 @@ def exibir_simular_espectro():
             return np.zeros_like(a)
         return (a - amin) / (amax - amin)
 
-    viz_led_vermelho = led_vermelho.copy()
-    viz_led_azul = led_azul.copy()
-    viz_led_branco = led_branco.copy()
-
-    if 'use_norm_leds' in locals() and use_norm_leds:
-        viz_led_vermelho = _to_0_1_for_viz(viz_led_vermelho)
-        viz_led_azul = _to_0_1_for_viz(viz_led_azul)
-        viz_led_branco = _to_0_1_for_viz(viz_led_branco)
-
     # preparar markPoints com coordenadas de picos (pode identificar múltiplos picos)
     def _peak_markpoints(wl, arr, rel_threshold=0.3, max_peaks=5):
         try:
@@ -3097,11 +2580,8 @@ def exibir_simular_espectro():
             maxv = np.nanmax(a)
             if not np.isfinite(maxv) or maxv <= 0:
                 return {}
-            thresh = maxv * float(rel_threshold)
-            points = []
-            for i in range(1, len(a)-1):
-                if a[i] > a[i-1] and a[i] > a[i+1] and a[i] >= thresh:
-                    points.append((float(w[i]), float(a[i])))
+            picos = analisar_picos(w, a, float(rel_threshold), relativo=True)
+            points = list(zip(picos['wavelength'].tolist(), picos['altura'].tolist()))
             if not points:
                 # fallback: use global max if no local peaks above threshold
                 idx = int(np.nanargmax(a))
@@ -3135,14 +2615,6 @@ def exibir_simular_espectro():
         user_thresh = float(limiar_picos)
     except Exception:
         user_thresh = 0.25
-    mark_v = _peak_markpoints(
-        wavelengths, viz_led_vermelho, rel_threshold=user_thresh)
-    mark_a = _peak_markpoints(
-        wavelengths, viz_led_azul, rel_threshold=user_thresh)
-    mark_b = _peak_markpoints(
-        wavelengths, viz_led_branco, rel_threshold=user_thresh)
-    mark_ref = _peak_markpoints(
-        wavelengths, espectro_ref_valores, rel_threshold=max(0.05, user_thresh * 0.8))
 
     # ============================================================================
     # CÁLCULO DE ICE PARA CADA LAMP BASEADO NO ESPECTRO DE REFERÊNCIA
@@ -3154,81 +2626,88 @@ def exibir_simular_espectro():
 
     # Obter proporções atuais dos canais
     proporcoes_atuais = np.array([
-        st.session_state.parametros_canais['proporcao_vermelho'],
-        st.session_state.parametros_canais['proporcao_azul'],
-        st.session_state.parametros_canais['proporcao_branco']
+        st.session_state.parametros_canais[f'proporcao_{canal}'] for canal, _, _ in canais_lamp
     ])
+    n_canais = len(canais_lamp)
 
     # Normalizar proporções
     if proporcoes_atuais.sum() > 0:
         proporcoes_norm = proporcoes_atuais / proporcoes_atuais.sum()
     else:
-        proporcoes_norm = np.array([0.33, 0.33, 0.34])
+        proporcoes_norm = np.full(n_canais, 1 / n_canais)
 
     # Calcular ICE baseado na eficiência espectral
     # ICE será proporcional ao PPFD do espectro de referência nas faixas dos LEDs
     ppfd_ref_total = pfd_ref['PPFD']
 
-    # Calcular eficiência de cada LED para o espectro de referência
-    # Usar a correlação entre os espectros
-    eficiencia_v = np.correlate(led_vermelho, espectro_ref_valores)[
-        0] if len(led_vermelho) > 0 else 0
-    eficiencia_a = np.correlate(led_azul, espectro_ref_valores)[
-        0] if len(led_azul) > 0 else 0
-    eficiencia_b = np.correlate(led_branco, espectro_ref_valores)[
-        0] if len(led_branco) > 0 else 0
+    # Eficiência de cada LED para o espectro de referência: correlação
+    # (produto escalar) de cada linha da matriz de LEDs com a referência
+    eficiencias = leds @ espectro_ref_valores
 
     # Normalizar eficiências
-    eficiencias = np.array([eficiencia_v, eficiencia_a, eficiencia_b])
     if eficiencias.sum() > 0:
         eficiencias_norm = eficiencias / eficiencias.sum()
     else:
-        eficiencias_norm = np.array([0.33, 0.33, 0.34])
+        eficiencias_norm = np.full(n_canais, 1 / n_canais)
 
     # Calcular ICE para cada canal (fixo durante o dia)
     # Baseado na intensidade máxima e eficiência espectral
     ice_base = intensidade_min_total + \
         (intensidade_max_total - intensidade_min_total) * 0.7
 
-    ice_lamp_ch1 = ice_base * \
-        proporcoes_norm[0] * eficiencias_norm[0] * \
-        proporcoes_lamp['LAMP_CH1_Vermelho']
-    ice_lamp_ch2 = ice_base * \
-        proporcoes_norm[1] * eficiencias_norm[1] * \
-        proporcoes_lamp['LAMP_CH2_Azul']
-    ice_lamp_ch3 = ice_base * \
-        proporcoes_norm[2] * eficiencias_norm[2] * \
-        proporcoes_lamp['LAMP_CH3_Branco']
+    ice_lamp = ice_base * proporcoes_norm * eficiencias_norm * proporcoes_lamp
 
     # Arredondar para inteiros (como no padrão LAMP)
-    ice_lamp_ch1_int = int(round(ice_lamp_ch1))
-    ice_lamp_ch2_int = int(round(ice_lamp_ch2))
-    ice_lamp_ch3_int = int(round(ice_lamp_ch3))
+    ice_lamp_int = [int(round(ice)) for ice in ice_lamp]
 
     # Obter horários do sistema
     hora_inicio = st.session_state.parametros_temporais['hora_inicio']
     hora_fim = st.session_state.parametros_temporais['hora_fim']
 
     # Gerar conteúdo LAMP_ para cada canal (formato HH MM SS ICE)
-    conteudo_lamp_ch1 = f"{hora_inicio:02d} 00 00 {ice_lamp_ch1_int}\n{hora_fim:02d} 00 00 {ice_lamp_ch1_int}\n"
-    conteudo_lamp_ch2 = f"{hora_inicio:02d} 00 00 {ice_lamp_ch2_int}\n{hora_fim:02d} 00 00 {ice_lamp_ch2_int}\n"
-    conteudo_lamp_ch3 = f"{hora_inicio:02d} 00 00 {ice_lamp_ch3_int}\n{hora_fim:02d} 00 00 {ice_lamp_ch3_int}\n"
+    conteudos_lamp = [f"{hora_inicio:02d} 00 00 {ice}\n{hora_fim:02d} 00 00 {ice}\n"
+                      for ice in ice_lamp_int]
 
     # ============================================================================
     # GRAFICOS ESPECTRAIS
     # ============================================================================
 
-    # Gráfico 1: Espectros comparados
-    col1, col2 = st.columns([1, 1])
-
-    # placeholders para evitar remounts visíveis durante reruns
-    ph_leds = col1.empty()
-    ph_lamp = col2.empty()
-
-    with ph_leds:
-        # Gráfico comparativo de LEDs
-        options_leds = {
-            "color": [COLORS['vermelho'], COLORS['azul'], COLORS['branco'], COLORS['referencia']],
+    def _serie_espectro(nome, dimensao, cor, mark_point=None):
+        """Série de linha (coluna do dataset do gráfico) com área em degradê na cor do canal"""
+        serie = serie_dataset(nome, dimensao)
+        if mark_point is not None:
+            serie["markPoint"] = mark_point
+        serie.update({
+            "smooth": True,
+            "lineStyle": {"color": cor, "width": 2},
+            "areaStyle": {
+                "color": {
+                    "type": "linear",
+                    "x": 0, "y": 0, "x2": 0, "y2": 1,
+                    "colorStops": [
+                        {"offset": 0, "color": cor + "40"},
+                        {"offset": 1, "color": cor + "05"}
+                    ]
+                }
+            },
+            "showSymbol": False
+        })
+        return serie
+
+    def _grafico_espectros_leds(wavelengths, leds, espectro_ref, espectro_ref_valores, canais_lamp,
+                                cores_canais, faixa_min, faixa_max, normalizar, limiar):
+        """Espectros dos LEDs (normalizados ou não) e a referência, com os picos marcados"""
+        viz_leds = [_to_0_1_for_viz(led) if normalizar else led.copy() for led in leds]
+        marks_leds = [_peak_markpoints(wavelengths, viz, rel_threshold=limiar)
+                      for viz in viz_leds]
+        mark_ref = _peak_markpoints(
+            wavelengths, espectro_ref_valores, rel_threshold=max(0.05, limiar * 0.8))
+        options = {
+            "dataset": conjunto_dados(wavelengths, {
+                **{f"led_{i}": viz for i, viz in enumerate(viz_leds)},
+                "referencia": espectro_ref_valores
+            }, casas=4),
+            "color": [*cores_canais, COLORS['referencia']],
             "title": {
                 "text": "Espectros dos LEDs da Bancada",
                 "subtext": "Espectros normalizados para comparação",
@@ -3240,7 +2719,7 @@ def exibir_simular_espectro():
                 "axisPointer": {"type": "cross"}
             },
             "legend": {
-                "data": ["LED Vermelho", "LED Azul", "LED Branco", espectro_ref],
+                "data": [*(f"LED {canal.capitalize()}" for canal, _, _ in canais_lamp), espectro_ref],
                 "top": "10%",
                 "type": "scroll",
                 "padding": [50, 0, 0, 0],
@@ -3263,70 +2742,10 @@ def exibir_simular_espectro():
                 "type": "value"
             },
             "series": [
+                *(_serie_espectro(f"LED {canal.capitalize()}", f"led_{i}", cor, mark)
+                  for i, ((canal, _, _), cor, mark) in enumerate(zip(canais_lamp, cores_canais, marks_leds))),
                 {
-                    "name": "LED Vermelho",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, viz_led_vermelho)],
-                    "markPoint": mark_v,
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['vermelho'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0,
-                                    "color": COLORS['vermelho'] + "40"},
-                                {"offset": 1,
-                                    "color": COLORS['vermelho'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": "LED Azul",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, viz_led_azul)],
-                    "markPoint": mark_a,
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['azul'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0, "color": COLORS['azul'] + "40"},
-                                {"offset": 1, "color": COLORS['azul'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": "LED Branco",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, viz_led_branco)],
-                    "markPoint": mark_b,
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['branco'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0,
-                                    "color": COLORS['branco'] + "40"},
-                                {"offset": 1, "color": COLORS['branco'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": espectro_ref,
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, espectro_ref_valores)],
+                    **serie_dataset(espectro_ref, "referencia"),
                     "markPoint": mark_ref,
                     "smooth": True,
                     "lineStyle": {
@@ -3359,16 +2778,23 @@ def exibir_simular_espectro():
                 "containLabel": True
             }
         }
-        st_echarts(options=apply_base_config(options_leds),
-                   height=350, key="espectros_leds")
+        return apply_base_config(options)
 
-    with ph_lamp:
-        # Gráfico dos espectros LAMP_CH
-        options_lamp_espectros = {
-            "color": [COLORS['vermelho'], COLORS['azul'], COLORS['branco'], COLORS['soma'], COLORS['referencia']],
+    def _grafico_espectros_lamp(wavelengths, lamp, lamp_soma, espectro_ref, espectro_ref_valores,
+                                canais_lamp, rotulos_lamp, cores_canais, proporcoes_lamp,
+                                faixa_min, faixa_max):
+        """Espectros LAMP_CH da mistura, a soma e a referência"""
+        options = {
+            "dataset": conjunto_dados(wavelengths, {
+                **{f"lamp_{i}": valores for i, valores in enumerate(lamp)},
+                "soma": lamp_soma,
+                "referencia": espectro_ref_valores
+            }, casas=4),
+            "color": [*cores_canais, COLORS['soma'], COLORS['referencia']],
             "title": {
                 "text": "Espectros LAMP_CH Otimizados",
-                "subtext": f"Proporções: CH1={proporcoes_lamp['LAMP_CH1_Vermelho']:.2f}, CH2={proporcoes_lamp['LAMP_CH2_Azul']:.2f}, CH3={proporcoes_lamp['LAMP_CH3_Branco']:.2f}",
+                "subtext": "Proporções: " + ", ".join(
+                    f"CH{saida}={proporcao:.2f}" for (_, _, saida), proporcao in zip(canais_lamp, proporcoes_lamp)),
                 "left": "center",
                 "padding": [0, 0, 0, 0]
             },
@@ -3377,8 +2803,7 @@ def exibir_simular_espectro():
                 "axisPointer": {"type": "cross"}
             },
             "legend": {
-                "data": ["LAMP_CH1 (Vermelho)", "LAMP_CH2 (Azul)",
-                         "LAMP_CH3 (Branco)", "Soma Total", espectro_ref],
+                "data": [*rotulos_lamp, "Soma Total", espectro_ref],
                 "type": "scroll",
                 "top": "10%",
                 "padding": [50, 0, 0, 0],
@@ -3401,88 +2826,11 @@ def exibir_simular_espectro():
                 "type": "value"
             },
             "series": [
+                *(_serie_espectro(rotulo, f"lamp_{i}", cor)
+                  for i, (rotulo, cor) in enumerate(zip(rotulos_lamp, cores_canais))),
+                _serie_espectro("Soma Total", "soma", COLORS['soma']),
                 {
-                    "name": "LAMP_CH1 (Vermelho)",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, lamp_ch1)],
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['vermelho'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0,
-                                    "color": COLORS['vermelho'] + "40"},
-                                {"offset": 1,
-                                    "color": COLORS['vermelho'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": "LAMP_CH2 (Azul)",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, lamp_ch2)],
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['azul'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0, "color": COLORS['azul'] + "40"},
-                                {"offset": 1, "color": COLORS['azul'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": "LAMP_CH3 (Branco)",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, lamp_ch3)],
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['branco'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0,
-                                    "color": COLORS['branco'] + "40"},
-                                {"offset": 1,
-                                    "color": COLORS['branco'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": "Soma Total",
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, lamp_soma)],
-                    "smooth": True,
-                    "lineStyle": {"color": COLORS['soma'], "width": 2},
-                    "areaStyle": {
-                        "color": {
-                            "type": "linear",
-                            "x": 0, "y": 0, "x2": 0, "y2": 1,
-                            "colorStops": [
-                                {"offset": 0,
-                                    "color": COLORS['soma'] + "40"},
-                                {"offset": 1,
-                                    "color": COLORS['soma'] + "05"}
-                            ]
-                        }
-                    },
-                    "showSymbol": False
-                },
-                {
-                    "name": espectro_ref,
-                    "type": "line",
-                    "data": [[float(wl), float(round(val, 4))] for wl, val in zip(wavelengths, espectro_ref_valores)],
+                    **serie_dataset(espectro_ref, "referencia"),
                     "smooth": True,
                     "lineStyle": {"color": COLORS['referencia'], "width": 1, "type": "dashed"},
                     "showSymbol": False
@@ -3510,61 +2858,17 @@ def exibir_simular_espectro():
                 "containLabel": True
             }
         }
-        st_echarts(options=apply_base_config(
-            options_lamp_espectros), height=350, key="espectros_lamp")
-
-    # ============================================================================
-    # GRÁFICO E TABELA DE ICE FIXO
-    # ============================================================================
+        return apply_base_config(options)
 
-    col_ice1, col_ice2 = st.columns([1, 1])
-
-    ph_ice = col_ice2.empty()
-
-    with col_ice1:
-        # Tabela com valores de ICE
-        st.markdown("**📊 Valores de ICE Fixos**")
-
-        df_ice_fixo = pd.DataFrame({
-            'Canal': ['LAMP_CH1 (Vermelho)', 'LAMP_CH1 (Vermelho)',
-                      'LAMP_CH2 (Azul)', 'LAMP_CH2 (Azul)',
-                      'LAMP_CH3 (Branco)', 'LAMP_CH3 (Branco)'],
-            'ICE (μmol/m²/s)': [ice_lamp_ch1_int, ice_lamp_ch1_int,
-                                ice_lamp_ch2_int,  ice_lamp_ch2_int,
-                                ice_lamp_ch3_int, ice_lamp_ch3_int],
-            'Proporção': [
-                f"{proporcoes_lamp['LAMP_CH1_Vermelho']:.3f}",
-                f"{proporcoes_lamp['LAMP_CH1_Vermelho']:.3f}",
-                f"{proporcoes_lamp['LAMP_CH2_Azul']:.3f}",
-                f"{proporcoes_lamp['LAMP_CH2_Azul']:.3f}",
-                f"{proporcoes_lamp['LAMP_CH3_Branco']:.3f}",
-                f"{proporcoes_lamp['LAMP_CH3_Branco']:.3f}"
-            ],
-            'Hora': [
-                f"{hora_inicio:02d} 00 00 {ice_lamp_ch1_int}",
-                f"{hora_fim:02d} 00 00 {ice_lamp_ch1_int}",
-                f"{hora_inicio:02d} 00 00 {ice_lamp_ch2_int}",
-                f"{hora_fim:02d} 00 00 {ice_lamp_ch2_int}",
-                f"{hora_inicio:02d} 00 00 {ice_lamp_ch3_int}",
-                f"{hora_fim:02d} 00 00 {ice_lamp_ch3_int}"
-            ]
-        })
-
-        st.dataframe(df_ice_fixo, use_container_width=True, hide_index=True)
-
-    with ph_ice:
-        # Gráfico de barras mostrando ICE fixo por canal
+    def _grafico_ice_fixo(ice_lamp_int, canais_lamp, cores_canais, hora_inicio, hora_fim):
+        """Barras do ICE fixo de cada canal LAMP"""
         # Preparar dados para o gráfico
         data_barras_ice = [
-            {"value": ice_lamp_ch1_int, "itemStyle": {
-                "color": COLORS['vermelho']}},
-            {"value": ice_lamp_ch2_int, "itemStyle": {
-                "color": COLORS['azul']}},
-            {"value": ice_lamp_ch3_int, "itemStyle": {
-                "color": COLORS['branco']}}
+            {"value": ice, "itemStyle": {"color": cor}}
+            for ice, cor in zip(ice_lamp_int, cores_canais)
         ]
 
-        options_ice_fixo = {
+        options = {
             "title": {
                 "text": "ICE Fixo por Canal LAMP",
                 "subtext": f"Valores constantes durante {hora_inicio:02d}:00-{hora_fim:02d}:00",
@@ -3576,7 +2880,7 @@ def exibir_simular_espectro():
             },
             "xAxis": {
                 "type": "category",
-                "data": ["LAMP_CH1", "LAMP_CH2", "LAMP_CH3"],
+                "data": [f"LAMP_CH{saida}" for _, _, saida in canais_lamp],
                 "axisLabel": {
                     "rotate": 0,
                     "interval": 0
@@ -3621,10 +2925,58 @@ def exibir_simular_espectro():
                 "containLabel": True
             }
         }
+        return apply_base_config(options)
+
+    # Gráfico 1: Espectros comparados
+    col1, col2 = st.columns([1, 1])
 
-        with ph_ice:
-            st_echarts(options=apply_base_config(
-                options_ice_fixo), height=300, key="ice_fixo")
+    # placeholders para evitar remounts visíveis durante reruns
+    ph_leds = col1.empty()
+    ph_lamp = col2.empty()
+
+    with ph_leds:
+        # Gráfico comparativo de LEDs
+        options_leds = grafico_memorizado(
+            _grafico_espectros_leds, wavelengths, leds, espectro_ref, espectro_ref_valores,
+            canais_lamp, cores_canais, faixa_min, faixa_max, use_norm_leds, user_thresh)
+        st_echarts(options=options_leds, height=350, key="espectros_leds")
+
+    with ph_lamp:
+        # Gráfico dos espectros LAMP_CH
+        options_lamp_espectros = grafico_memorizado(
+            _grafico_espectros_lamp, wavelengths, lamp, lamp_soma, espectro_ref,
+            espectro_ref_valores, canais_lamp, rotulos_lamp, cores_canais, proporcoes_lamp,
+            faixa_min, faixa_max)
+        st_echarts(options=options_lamp_espectros, height=350, key="espectros_lamp")
+
+    # ============================================================================
+    # GRÁFICO E TABELA DE ICE FIXO
+    # ============================================================================
+
+    col_ice1, col_ice2 = st.columns([1, 1])
+
+    ph_ice = col_ice2.empty()
+
+    with col_ice1:
+        # Tabela com valores de ICE
+        st.markdown("**📊 Valores de ICE Fixos**")
+
+        # Duas linhas por canal: início e fim do fotoperíodo
+        df_ice_fixo = pd.DataFrame({
+            'Canal': [rotulo for rotulo in rotulos_lamp for _ in range(2)],
+            'ICE (μmol/m²/s)': [ice for ice in ice_lamp_int for _ in range(2)],
+            'Proporção': [f"{proporcao:.3f}" for proporcao in proporcoes_lamp for _ in range(2)],
+            'Hora': [f"{hora:02d} 00 00 {ice}" for ice in ice_lamp_int
+                     for hora in (hora_inicio, hora_fim)]
+        })
+
+        st.dataframe(df_ice_fixo, use_container_width=True, hide_index=True)
+
+    with ph_ice:
+        # Gráfico de barras mostrando ICE fixo por canal
+        options_ice_fixo = grafico_memorizado(
+            _grafico_ice_fixo, ice_lamp_int, canais_lamp, cores_canais, hora_inicio, hora_fim)
+        st_echarts(options=options_ice_fixo, height=300, key="ice_fixo")
 
     # Resultados numéricos e tabelas
     col_res1, col_res2, col_res3 = st.columns(3)
@@ -3632,85 +2984,150 @@ def exibir_simular_espectro():
     with col_res1:
         st.markdown("**📈 PROPORÇÕES LAMP ÓTIMAS**")
         df_proporcoes = pd.DataFrame([
-            {"Canal": "LAMP_CH1 (Vermelho)",
-                "Proporção": f"{proporcoes_lamp['LAMP_CH1_Vermelho']:.3f}"},
-            {"Canal": "LAMP_CH2 (Azul)",
-                "Proporção": f"{proporcoes_lamp['LAMP_CH2_Azul']:.3f}"},
-            {"Canal": "LAMP_CH3 (Branco)",
-                "Proporção": f"{proporcoes_lamp['LAMP_CH3_Branco']:.3f}"}
+            {"Canal": rotulo, "Proporção": f"{proporcao:.3f}"}
+            for rotulo, proporcao in zip(rotulos_lamp, proporcoes_lamp)
         ])
+        df_proporcoes['PPFD (μmol/m²/s)'] = [f"{v:.1f}" for v in ppfd_mistura]
+        df_proporcoes['Limite Calibração'] = [f"{v:.1f}" for v in limites_calibracao]
+        df_proporcoes['Saturado'] = ["Sim" if s else "Não" for s in mistura['saturados']]
         st.dataframe(df_proporcoes, use_container_width=True,
                      hide_index=True)
+        st.caption(f"Erro do ajuste (ponderação: {ponderacao}): {mistura['residuo']:.4g}")
 
         # Botões de download para arquivos LAMP_ individuais
         st.markdown("**📥 Download Arquivos LAMP**")
 
-        col_dl1, col_dl2, col_dl3 = st.columns([1, 1, 1])
-
-        with col_dl1:
-            st.download_button(
-                label="CH1.txt",
-                data=conteudo_lamp_ch1,
-                file_name="LAMP_CH1.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
-
-        with col_dl2:
-            st.download_button(
-                label="CH2.txt",
-                data=conteudo_lamp_ch2,
-                file_name="LAMP_CH2.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
-
-        with col_dl3:
-            st.download_button(
-                label="CH3.txt",
-                data=conteudo_lamp_ch3,
-                file_name="LAMP_CH3.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
+        for col_dl, (_, _, saida), conteudo in zip(st.columns(n_canais), canais_lamp, conteudos_lamp):
+            with col_dl:
+                st.download_button(
+                    label=f"CH{saida}.txt",
+                    data=conteudo,
+                    file_name=f"LAMP_CH{saida}.txt",
+                    mime="text/plain",
+                    use_container_width=True
+                )
 
     with col_res2:
         st.markdown("**🔬 PFDs DO ESPECTRO DE REFERÊNCIA**")
         df_pfd_ref = pd.DataFrame([
-            {"Banda": "PPFD (400-700nm)",
-                "Valor (μmol/m²/s)": f"{pfd_ref['PPFD']:.1f}"},
-            {"Banda": "BLUE (400-500nm)",
-                "Valor (μmol/m²/s)": f"{pfd_ref['BLUE']:.1f}"},
-            {"Banda": "GREEN (500-600nm)",
-                "Valor (μmol/m²/s)": f"{pfd_ref['GREEN']:.1f}"},
-            {"Banda": "RED (600-700nm)",
-                "Valor (μmol/m²/s)": f"{pfd_ref['RED']:.1f}"},
-            {"Banda": "FAR RED (700-780nm)",
-                "Valor (μmol/m²/s)": f"{pfd_ref['FAR_RED']:.1f}"},
-            {"Banda": "UV (380-400nm)",
-                "Valor (μmol/m²/s)": f"{pfd_ref['UV']:.1f}"}
+            {"Banda": rotulo_banda(nome, bandas),
+                "Valor (μmol/m²/s)": f"{valor:.1f}"}
+            for nome, valor in pfd_ref.items()
         ])
         st.dataframe(df_pfd_ref, use_container_width=True, hide_index=True)
 
     with col_res3:
         st.markdown("**⚡ PFDs DA SOMA LAMP**")
         df_pfd_lamp = pd.DataFrame([
-            {"Banda": "PPFD (400-700nm)",
-                "Valor (μmol/m²/s)": f"{pfd_lamp_soma['PPFD']:.1f}"},
-            {"Banda": "BLUE (400-500nm)",
-                "Valor (μmol/m²/s)": f"{pfd_lamp_soma['BLUE']:.1f}"},
-            {"Banda": "GREEN (500-600nm)",
-                "Valor (μmol/m²/s)": f"{pfd_lamp_soma['GREEN']:.1f}"},
-            {"Banda": "RED (600-700nm)",
-                "Valor (μmol/m²/s)": f"{pfd_lamp_soma['RED']:.1f}"},
-            {"Banda": "FAR RED (700-780nm)",
-                "Valor (μmol/m²/s)": f"{pfd_lamp_soma['FAR_RED']:.1f}"},
-            {"Banda": "UV (380-400nm)",
-                "Valor (μmol/m²/s)": f"{pfd_lamp_soma['UV']:.1f}"}
+            {"Banda": rotulo_banda(nome, bandas),
+                "Valor (μmol/m²/s)": f"{valor:.1f}"}
+            for nome, valor in pfd_lamp_soma.items()
         ])
         st.dataframe(df_pfd_lamp, use_container_width=True,
                      hide_index=True)
 
+    # Picos do espectro de referência com proeminência e FWHM medidas
+    with st.expander(f"📍 Picos do espectro de referência ({len(picos_ref)})", expanded=False):
+        if picos_ref:
+            df_picos = pd.DataFrame([{
+                "λ (nm)": f"{p['wavelength']:.1f}",
+                "Altura": f"{p['intensity']:.4g}",
+                "Proeminência": f"{p['prominence']:.4g}",
+                "FWHM (nm)": f"{p['fwhm']:.1f}"
+            } for p in picos_ref])
+            st.dataframe(df_picos, use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum pico acima do limiar no espectro de referência.")
+
+    # Comparação em lote: a mistura LAMP de todos os espectros da biblioteca em uma
+    # única resolução com vários alvos sobre a mesma base de LEDs
+    @st.cache_data
+    def comparar_referencias(versao_biblioteca, faixa_min, faixa_max, resolucao, bandas,
+                             ponderacao, canais_lamp, limites_calibracao, _biblioteca):
+        wavelengths = np.arange(faixa_min, faixa_max + resolucao, resolucao)
+
+        espectros_leds = [espectro for _, espectro, _ in canais_lamp]
+        leds = np.vstack([_biblioteca.reamostrar(espectro, wavelengths) for espectro in espectros_leds])
+        nomes = [nome for nome in _biblioteca.nomes() if nome not in espectros_leds]
+        alvos = _biblioteca.matriz_reamostrada(wavelengths)[[_biblioteca.linha(nome) for nome in nomes]]
+
+        # Mesmo alvo do ajuste individual: cada espectro com a intensidade de 650 μmol/m²/s
+        integrais = np.trapezoid(alvos, wavelengths, axis=1) / 1000
+        validos = integrais > 0
+        nomes = [nome for nome, valido in zip(nomes, validos) if valido]
+        alvos = alvos[validos] * (650 / integrais[validos])[:, None]
+
+        pesos = pesos_ponderacao(ponderacao, wavelengths, _biblioteca)
+        inferior, superior = limites_mistura(leds, wavelengths, limites_calibracao)
+        misturas = resolver_misturas(leds, alvos, inferior, superior, pesos)
+
+        coeficientes = misturas['coeficientes']
+        maximos = coeficientes.max(axis=1, keepdims=True)
+        proporcoes = np.divide(coeficientes, maximos, out=np.zeros_like(coeficientes),
+                               where=maximos > 0)
+        norma_alvos = np.sqrt((alvos * alvos if pesos is None else pesos * alvos * alvos).sum(axis=1))
+        erro_relativo = misturas['residuo'] / np.where(norma_alvos > 0, norma_alvos, 1.0) * 100
+        pfd_misturas = calcular_pfd(coeficientes @ leds, wavelengths, bandas)
+
+        canais = [f"CH{saida} ({canal.capitalize()})" for canal, _, saida in canais_lamp]
+        tabela = pd.DataFrame({
+            'Espectro': nomes,
+            'Tipo': [_biblioteca.tipo(nome) for nome in nomes],
+            'Erro Relativo (%)': np.round(erro_relativo, 2),
+            **{canal: np.round(proporcoes[:, i], 3) for i, canal in enumerate(canais)},
+            'Saturados': [", ".join(canal for canal, s in zip(canais, linha) if s) or "-"
+                          for linha in misturas['saturados']],
+            **{rotulo_banda(banda, bandas): np.round(pfd_misturas[:, i], 2)
+               for i, banda in enumerate(bandas)}
+        })
+        tabela = tabela.sort_values('Erro Relativo (%)', kind='stable').reset_index(drop=True)
+        tabela.index = tabela.index + 1
+        return tabela
+
+    with st.expander("🧬 Comparar todos os espectros de referência", expanded=False):
+        st.caption("Mistura LAMP ótima de cada espectro da biblioteca com os LEDs da bancada, "
+                   "ordenada pelo erro relativo do ajuste. PFDs da mistura LAMP resultante.")
+        st.dataframe(comparar_referencias(
+            biblioteca.versao, faixa_min, faixa_max, resolucao, bandas, ponderacao,
+            canais_lamp, limites_calibracao, biblioteca), use_container_width=True)
+
+    # Importação de espectros medidos: o arquivo é lido em blocos e anexado à biblioteca compilada
+    with st.expander("📥 Importar espectro medido (CSV/TXT/XLSX/XLS)", expanded=False):
+        exibir_importacao_espectro(spectra_path)
+
+
+@st.fragment
+def exibir_importacao_espectro(spectra_path):
+    """Formulário de importação; arquivo e campos reexecutam só este fragmento"""
+    import os
+
+    st.caption(f"Exportação do espectrômetro reamostrada na grade canônica ({PASSO_CANONICO:g} nm, "
+               "média por intervalo) e anexada à biblioteca sem reescrever o spectra_data.json.")
+    resumo_importacao = st.session_state.pop('resumo_importacao', None)
+    if resumo_importacao:
+        st.success(f"{resumo_importacao['nome']} importado: {resumo_importacao['amostras']} amostras → "
+                   f"{resumo_importacao['pontos']} pontos ({resumo_importacao['faixa'][0]:g}-"
+                   f"{resumo_importacao['faixa'][1]:g} nm).")
+    arquivo_medido = st.file_uploader("Arquivo do espectrômetro",
+                                      type=["csv", "txt", "dat", "xlsx", "xls"])
+    c_nome, c_tipo, c_col_wl, c_col_valor = st.columns(4)
+    nome_importado = c_nome.text_input(
+        "Nome na biblioteca",
+        value=os.path.splitext(arquivo_medido.name)[0] if arquivo_medido else "")
+    tipo_importado = c_tipo.selectbox("Tipo de dado", ["irradiance", "absorbance"])
+    coluna_wl = c_col_wl.number_input("Coluna do comprimento de onda", min_value=1, value=1, step=1)
+    coluna_valor = c_col_valor.number_input("Coluna do valor", min_value=1, value=2, step=1)
+    if st.button("Importar para a biblioteca", disabled=arquivo_medido is None):
+        try:
+            resumo = importar_espectro(arquivo_medido, spectra_path, nome_importado or None,
+                                       tipo_importado, colunas=(coluna_wl - 1, coluna_valor - 1))
+        except Exception as e:
+            st.error(f"Falha na importação: {e}")
+        else:
+            st.session_state.resumo_importacao = {
+                chave: valor for chave, valor in resumo.items() if chave != 'biblioteca'}
+            st.rerun()
+
 
 # ============================================================================
 # ROTEAMENTO DAS ABAS (ATUALIZADO)
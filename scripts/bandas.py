@@ -0,0 +1,80 @@
+"""
+bandas.py
+Integração espectral por bandas (PFD) como produto de matrizes: os pesos da
+regra do trapézio de cada banda são montados uma vez por grade de
+comprimentos de onda, e os PFDs de qualquer pilha de espectros saem de uma
+única multiplicação.
+"""
+
+import hashlib
+
+import numpy as np
+
+from scripts.calibracao import MemoLRU
+
+
+# Bandas em nm (limites inclusivos), na ordem de exibição das tabelas
+BANDAS_PADRAO = {
+    'PPFD': (400, 700),
+    'BLUE': (400, 500),
+    'GREEN': (500, 600),
+    'RED': (600, 700),
+    'FAR_RED': (700, 780),
+    'UV': (380, 400)
+}
+
+# PAR estendido (ePAR, 400-750 nm) incluindo o vermelho distante fotossinteticamente ativo
+BANDAS_EPAR = {
+    'ePAR': (400, 750),
+    **BANDAS_PADRAO
+}
+
+CONJUNTOS_BANDAS = {
+    'PAR (padrão)': BANDAS_PADRAO,
+    'ePAR (400-750 nm)': BANDAS_EPAR
+}
+
+_pesos = MemoLRU(capacidade=32)
+
+
+def rotulo_banda(nome, bandas):
+    """Rótulo de tabela, ex.: 'FAR RED (700-780nm)'"""
+    inicio, fim = bandas[nome]
+    return f"{nome.replace('_', ' ')} ({inicio}-{fim}nm)"
+
+
+def pesos_bandas(wavelengths, bandas=BANDAS_PADRAO):
+    """Matriz (n_bandas, n_comprimentos) com os pesos do trapézio de cada banda
+
+    Cada linha reproduz np.trapezoid(espectro[mascara], wavelengths[mascara])
+    com mascara = (wl >= inicio) & (wl <= fim); bandas com menos de dois
+    pontos na grade ficam com peso zero.
+    """
+    wl = np.ascontiguousarray(wavelengths, dtype=float)
+    chave = (hashlib.sha1(wl.tobytes()).hexdigest(), tuple(bandas.items()))
+    pesos = _pesos.get(chave)
+    if pesos is not None:
+        return pesos
+
+    pesos = np.zeros((len(bandas), wl.size))
+    for linha, (inicio, fim) in enumerate(bandas.values()):
+        idx = np.flatnonzero((wl >= inicio) & (wl <= fim))
+        if idx.size < 2:
+            continue
+        meio_dx = np.diff(wl[idx]) / 2
+        np.add.at(pesos[linha], idx[:-1], meio_dx)
+        np.add.at(pesos[linha], idx[1:], meio_dx)
+
+    pesos.setflags(write=False)
+    _pesos.put(chave, pesos)
+    return pesos
+
+
+def calcular_pfd(espectros, wavelengths, bandas=BANDAS_PADRAO):
+    """PFD (μmol/m²/s) de cada banda para um espectro ou uma pilha (..., n_comprimentos)"""
+    return np.asarray(espectros, dtype=float) @ pesos_bandas(wavelengths, bandas).T / 1000
+
+
+def pfd_como_dicionario(pfd, bandas=BANDAS_PADRAO):
+    """Converte o vetor de PFDs de um espectro em {banda: valor}"""
+    return {nome: float(valor) for nome, valor in zip(bandas, pfd)}
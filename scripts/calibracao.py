@@ -0,0 +1,851 @@
+"""
+calibracao.py
+Motor de cálculo da calibração de bancadas LAAC, independente do Streamlit.
+Recebe os dados da bancada e os parâmetros explicitamente, permitindo rodar
+em lote, benchmarks e processos de trabalho com o mesmo código das páginas.
+"""
+
+import copy
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from scipy import stats
+from scipy.interpolate import interp1d
+from scipy.special import erf
+
+
+# ============================================================================
+# VALORES PADRÃO
+# ============================================================================
+
+VALORES_REFERENCIA_PADRAO = np.array([0, 0.3, 0.5, 0.7, 1.0])
+
+# Cada canal da bancada é um item de dados_bancada: matriz de calibração
+# ('dados' x 'valores_referencia'), espectro do LED na biblioteca espectral
+# ('espectro') e saídas LAMP alimentadas ('saidas_lamp': CH1, CH2, ...).
+# O branco também alimenta o CH4.
+DADOS_BANCADA_PADRAO = {
+    'azul': {
+        'dados': np.array([
+            [24.86, 29.3, 27.6, 22.53, 29.51],
+            [76.45, 74.32, 73.75, 58.78, 66.12],
+            [114.8, 106.9, 114.6, 102.9, 100.9],
+            [135.5, 127.1, 138.0, 120.2, 119.8],
+            [175.7, 177.0, 164.1, 145.0, 170.0]
+        ]).T,
+        'valores_referencia': VALORES_REFERENCIA_PADRAO,
+        'espectro': 'LED_Azul',
+        'saidas_lamp': (2,)
+    },
+    'vermelho': {
+        'dados': np.array([
+            [58.12, 57.3, 54.3, 55.9, 52.0],
+            [143.9, 168.3, 160.4, 147.6, 158.1],
+            [235.3, 227.2, 198.0, 233.5, 224.5],
+            [279.5, 293.3, 272.2, 302.7, 281.7],
+            [360.5, 354.2, 407.3, 398.5, 367.8]
+        ]).T,
+        'valores_referencia': VALORES_REFERENCIA_PADRAO,
+        'espectro': 'LED_Vermelho',
+        'saidas_lamp': (1,)
+    },
+    'branco': {
+        'dados': np.array([
+            [20.61, 24.51, 24.24, 22.42, 23.14],
+            [62.13, 67.69, 58.93, 59.12, 55.09],
+            [69.18, 92.19, 91.02, 86.68, 84.73],
+            [109.8, 104.6, 117.0, 113.7, 110.3],
+            [120.8, 150.9, 143.3, 130.7, 143.9]
+        ]).T,
+        'valores_referencia': VALORES_REFERENCIA_PADRAO,
+        'espectro': 'LED_Branco',
+        'saidas_lamp': (3, 4)
+    }
+}
+
+CANAIS = tuple(DADOS_BANCADA_PADRAO)
+
+PARAMETROS_CANAIS_PADRAO = {
+    'intensidade_max_total': 650.0,
+    'intensidade_min_total': 120.0,
+    'proporcao_azul': 1.0,
+    'proporcao_vermelho': 1.0,
+    'proporcao_branco': 1.0
+}
+
+PARAMETROS_GAUSSIANOS_PADRAO = {
+    'canal_vermelho': {'sigma': 0.30, 'mi': 0.5},
+    'canal_azul': {'sigma': 0.30, 'mi': -0.5},
+    'canal_branco': {'sigma': 0.30, 'mi': 0.0}
+}
+
+# Parâmetros de canais que não estão nos padrões (bancadas com mais canais)
+PROPORCAO_PADRAO = 1.0
+GAUSSIANA_PADRAO = {'sigma': 0.30, 'mi': 0.0}
+
+PARAMETROS_TEMPORAIS_PADRAO = {
+    'hora_inicio': 6,
+    'hora_fim': 18,
+    'n_pontos': 60
+}
+
+
+def valores_padrao():
+    """Retorna cópias independentes de todos os valores padrão do sistema"""
+    return {
+        'dados_bancada': copy.deepcopy(DADOS_BANCADA_PADRAO),
+        'parametros_canais': copy.deepcopy(PARAMETROS_CANAIS_PADRAO),
+        'parametros_gaussianos': copy.deepcopy(PARAMETROS_GAUSSIANOS_PADRAO),
+        'parametros_temporais': copy.deepcopy(PARAMETROS_TEMPORAIS_PADRAO)
+    }
+
+
+# ============================================================================
+# MOTOR DE CALIBRAÇÃO
+# ============================================================================
+
+@lru_cache(maxsize=32)
+def _matriz_reamostragem_cubica(n_origem, n_destino):
+    """Matriz (n_destino, n_origem) equivalente ao interp1d cúbico em [-1, 1]"""
+    x_origem = np.linspace(-1, 1, n_origem)
+    x_destino = np.linspace(-1, 1, n_destino)
+    matriz = interp1d(x_origem, np.eye(n_origem), kind='cubic', axis=0)(x_destino)
+    matriz.setflags(write=False)
+    return matriz
+
+
+def limites_operacao(proporcao_canal, intensidade_max_total, intensidade_min_total,
+                     a, b, limite_max_calibracao, limite_min_calibracao):
+    """Intensidades calibradas e valores normalizados de operação (aceita broadcast)"""
+    # Distribuir intensidades totais pelas proporções e limitar pela calibração
+    intensidade_max_bruta = np.minimum(
+        intensidade_max_total * proporcao_canal, limite_max_calibracao)
+    intensidade_min_bruta = np.maximum(
+        intensidade_min_total * proporcao_canal, limite_min_calibracao)
+
+    # Ajustar mínimo para não ser maior que o máximo
+    intensidade_min_bruta = np.where(
+        intensidade_min_bruta > intensidade_max_bruta,
+        np.maximum(limite_min_calibracao, intensidade_max_bruta * 0.1),
+        intensidade_min_bruta)
+
+    # Converter para valores normalizados (regressão inversa) limitados a 0-1
+    com_inclinacao = a != 0
+    a_seguro = np.where(com_inclinacao, a, 1.0)
+    valor_max_normalizado = np.clip(np.where(
+        com_inclinacao, (intensidade_max_bruta - b) / a_seguro, 0.0), 0, 1)
+    valor_min_normalizado = np.clip(np.where(
+        com_inclinacao, (intensidade_min_bruta - b) / a_seguro, 0.0), 0, 1)
+
+    # Converter de volta para PPFD respeitando os limites da calibração
+    intensidade_max_calibrada = np.minimum(
+        a * valor_max_normalizado + b, limite_max_calibracao)
+    intensidade_min_calibrada = np.maximum(
+        a * valor_min_normalizado + b, limite_min_calibracao)
+
+    # Garantir que mínimo não seja maior que máximo
+    intensidade_min_calibrada = np.where(
+        intensidade_min_calibrada > intensidade_max_calibrada,
+        intensidade_max_calibrada * 0.1,
+        intensidade_min_calibrada)
+
+    return intensidade_max_calibrada, intensidade_min_calibrada, valor_max_normalizado, valor_min_normalizado
+
+
+def coeficientes_gaussiana(sigma, mi, valor_max_norm, valor_min_norm, a, b):
+    """Converte o perfil normalizado em intensidade = p + q·gaussiana (aceita broadcast)"""
+    def gaussiana(x):
+        return np.exp(-((x - mi)**2) / (2 * sigma**2))
+
+    # Extremos contínuos da gaussiana em [-1, 1]
+    gauss_max = gaussiana(np.clip(mi, -1, 1))
+    gauss_min = np.minimum(gaussiana(-1.0), gaussiana(1.0))
+    gauss_range = gauss_max - gauss_min
+    gauss_range_seguro = np.where(gauss_range > 0, gauss_range, 1.0)
+    gauss_min = np.where(gauss_range > 0, gauss_min, 0.0)
+
+    c0 = a * valor_min_norm + b
+    c1 = a * (valor_max_norm - valor_min_norm)
+    q = c1 / gauss_range_seguro
+    p = c0 - q * gauss_min
+    return p, q
+
+
+def _nos_perfil(sigma, mi, p, q, limite_min, limite_max):
+    """Pontos de quebra ordenados (..., 7) de clip(p + q·gaussiana) em [-1, 1]
+
+    Um par por limite onde a gaussiana o cruza; quando não existe, cai em μ e
+    só subdivide um trecho. μ também é nó para o ponto médio nunca cair no
+    pico que apenas toca um limite.
+    """
+    nos = [np.full(sigma.shape, -1.0), np.full(sigma.shape, 1.0), np.clip(mi, -1, 1)]
+    for limite in (limite_min, limite_max):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g_limite = (limite - p) / q
+        valido = (q != 0) & (g_limite > 0) & (g_limite < 1)
+        d = sigma * np.sqrt(-2.0 * np.log(np.where(valido, g_limite, 1.0)))
+        nos.extend((np.clip(mi - d, -1, 1), np.clip(mi + d, -1, 1)))
+    return np.sort(np.stack(nos, axis=-1), axis=-1)
+
+
+def _trechos_perfil(inicio, fim, regime_inicio, regime_fim, sigma, mi, p, q, limite_min, limite_max):
+    """Integral de cada trecho, no regime avaliado no meio de [regime_inicio, regime_fim]"""
+    largura = fim - inicio
+    valor_meio = p + q * np.exp(-(((regime_inicio + regime_fim) / 2 - mi)**2) / (2 * sigma**2))
+    escala = sigma * np.sqrt(2.0)
+    linear = p * largura + q * sigma * np.sqrt(np.pi / 2) * \
+        (erf((fim - mi) / escala) - erf((inicio - mi) / escala))
+    return np.where(valor_meio < limite_min, limite_min * largura,
+                    np.where(valor_meio > limite_max, limite_max * largura, linear))
+
+
+def integral_total_perfil_gaussiano(sigma, mi, p, q, limite_min, limite_max):
+    """Integral exata de clip(p + q·gaussiana) em [-1, 1] para grades inteiras de parâmetros"""
+    sigma, mi, p, q, limite_min, limite_max = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (sigma, mi, p, q, limite_min, limite_max)))
+    nos = _nos_perfil(sigma, mi, p, q, limite_min, limite_max)
+
+    inicio, fim = nos[..., :-1], nos[..., 1:]
+    parametros = (v[..., None] for v in (sigma, mi, p, q, limite_min, limite_max))
+    return _trechos_perfil(inicio, fim, inicio, fim, *parametros).sum(axis=-1)
+
+
+def integral_perfil_gaussiano(x, sigma, mi, p, q, limite_min, limite_max):
+    """Integral exata de clip(p + q·exp(-(x-μ)²/2σ²)) de -1 até cada x
+
+    A curva só muda de regime (linear ou saturada em um limite) onde a
+    gaussiana cruza um dos limites, então basta somar trechos com a forma
+    fechada da função erro entre esses pontos de quebra. Parâmetros em
+    vetor (um por canal) dão a matriz (canais, pontos) em uma só avaliação.
+    """
+    x = np.clip(np.asarray(x, dtype=float), -1.0, 1.0)
+    parametros = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (sigma, mi, p, q, limite_min, limite_max)))
+    forma = parametros[0].shape
+    sigma, mi, p, q, limite_min, limite_max = (v.reshape(-1, 1) for v in parametros)
+
+    nos = _nos_perfil(sigma[:, 0], mi[:, 0], p[:, 0], q[:, 0], limite_min[:, 0], limite_max[:, 0])
+    inicio, fim = nos[:, :-1], nos[:, 1:]
+    acumulado = np.concatenate((np.zeros((len(nos), 1)), np.cumsum(_trechos_perfil(
+        inicio, fim, inicio, fim, sigma, mi, p, q, limite_min, limite_max), axis=1)), axis=1)
+
+    # Trecho de cada x: último nó <= x (o trecho final inclui x = 1)
+    x_plano = x.ravel()
+    idx = (nos[:, None, :] <= x_plano[None, :, None]).sum(axis=-1) - 1
+    idx = np.clip(idx, 0, inicio.shape[1] - 1)
+    no_x = np.take_along_axis(nos, idx, axis=1)
+    parcial = _trechos_perfil(no_x, x_plano[None, :], no_x,
+                              np.take_along_axis(fim, idx, axis=1),
+                              sigma, mi, p, q, limite_min, limite_max)
+    resultado = np.take_along_axis(acumulado, idx, axis=1) + parcial
+    return resultado.reshape(forma + x.shape)
+
+
+def perfil_gaussiano(x, sigma, mi, p, q, limite_min, limite_max):
+    """Intensidade contínua clip(p + q·gaussiana) em qualquer ponto de [-1, 1]"""
+    return np.clip(p + q * np.exp(-((x - mi)**2) / (2 * sigma**2)), limite_min, limite_max)
+
+
+def formatar_linhas_lamp(segundos, intensidades):
+    """Formata de uma vez as linhas 'HH MM SS INTENSIDADE' a partir de segundos do dia"""
+    segundos = np.asarray(segundos, dtype=np.int64)
+    horas, resto = np.divmod(segundos, 3600)
+    minutos, segs = np.divmod(resto, 60)
+    # np.rint arredonda meio para par, como o round() do Python
+    valores = np.column_stack((horas, minutos, segs,
+                               np.rint(intensidades).astype(np.int64)))
+    return ("%02d %02d %02d %d\n" * len(valores)) % tuple(valores.ravel().tolist())
+
+
+class MemoLRU:
+    """Memória de resultados com chave por valor e descarte LRU limitado"""
+
+    def __init__(self, capacidade=64):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def get(self, chave, padrao=None):
+        """Obtém um item e o marca como usado mais recentemente"""
+        if chave not in self._itens:
+            return padrao
+        self._itens.move_to_end(chave)
+        return self._itens[chave]
+
+    def put(self, chave, valor):
+        """Armazena um item descartando os menos usados além da capacidade"""
+        self._itens[chave] = valor
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+
+    def clear(self):
+        self._itens.clear()
+
+
+class MemoBytes(MemoLRU):
+    """Memória LRU de conteúdos binários limitada pelo total de bytes"""
+
+    def __init__(self, capacidade_bytes=64 * 1024 * 1024):
+        super().__init__(capacidade=None)
+        self.capacidade_bytes = capacidade_bytes
+        self.total_bytes = 0
+
+    def put(self, chave, valor):
+        """Armazena um conteúdo descartando os menos usados além do limite de bytes"""
+        if chave in self._itens:
+            self.total_bytes -= len(self._itens[chave])
+        self._itens[chave] = valor
+        self._itens.move_to_end(chave)
+        self.total_bytes += len(valor)
+        while self.total_bytes > self.capacidade_bytes and len(self._itens) > 1:
+            _, descartado = self._itens.popitem(last=False)
+            self.total_bytes -= len(descartado)
+
+    def clear(self):
+        super().clear()
+        self.total_bytes = 0
+
+
+def _somente_leitura(dados):
+    """Protege os arrays de um resultado compartilhado pela memória"""
+    for valor in dados.values():
+        if isinstance(valor, np.ndarray):
+            valor.setflags(write=False)
+    return dados
+
+
+class _SomasRegressao:
+    """Somas Σy, Σy² e Σx·y de um vetor y contra referências x centradas"""
+
+    def __init__(self, y, x_centro):
+        y = np.asarray(y, dtype=float)
+        # Deslocamento fixo reduz cancelamento numérico em Σy²
+        self.deslocamento = float(y.mean()) if y.size else 0.0
+        y_desl = y - self.deslocamento
+        self.sy = float(y_desl.sum())
+        self.syy = float(np.dot(y_desl, y_desl))
+        self.sxy = float(np.dot(x_centro, y))
+
+    def atualizar(self, xc, antigo, novo):
+        """Substitui um valor de y em O(1)"""
+        antigo_desl = antigo - self.deslocamento
+        novo_desl = novo - self.deslocamento
+        self.sy += novo_desl - antigo_desl
+        self.syy += novo_desl * novo_desl - antigo_desl * antigo_desl
+        self.sxy += xc * (novo - antigo)
+
+
+class EstatisticasCanal:
+    """Estatísticas suficientes de um canal, atualizadas célula a célula"""
+
+    def __init__(self, dados, valores_referencia):
+        dados = np.asarray(dados, dtype=float)
+        self.n_rep = dados.shape[0]
+        self.x = np.asarray(valores_referencia, dtype=float)
+        self.x_media = float(self.x.mean()) if self.x.size else 0.0
+        self.x_centro = self.x - self.x_media
+        self.sxx = float(np.dot(self.x_centro, self.x_centro))
+
+        self.somas_colunas = dados.sum(axis=0)
+        self.colunas_ordenadas = [sorted(coluna) for coluna in dados.T.tolist()]
+        self.medias = self.somas_colunas / self.n_rep
+        self.medianas = np.median(dados, axis=0)
+
+        self.somas_media = _SomasRegressao(self.medias, self.x_centro)
+        self.somas_mediana = _SomasRegressao(self.medianas, self.x_centro)
+
+    def _mediana_coluna(self, coluna):
+        ordenada = self.colunas_ordenadas[coluna]
+        meio = len(ordenada) // 2
+        if len(ordenada) % 2:
+            return ordenada[meio]
+        return (ordenada[meio - 1] + ordenada[meio]) / 2
+
+    def atualizar(self, coluna, antigo, novo):
+        """Aplica a troca de uma célula da matriz de calibração"""
+        xc = self.x_centro[coluna]
+
+        self.somas_colunas[coluna] += novo - antigo
+        media_antiga = self.medias[coluna]
+        self.medias[coluna] = self.somas_colunas[coluna] / self.n_rep
+        self.somas_media.atualizar(xc, media_antiga, self.medias[coluna])
+
+        ordenada = self.colunas_ordenadas[coluna]
+        ordenada.pop(bisect_left(ordenada, antigo))
+        insort(ordenada, novo)
+        mediana_antiga = self.medianas[coluna]
+        self.medianas[coluna] = self._mediana_coluna(coluna)
+        self.somas_mediana.atualizar(xc, mediana_antiga, self.medianas[coluna])
+
+    def regressao(self, somas):
+        """Regressão linear equivalente a stats.linregress a partir das somas"""
+        n = len(self.x)
+        if n < 2 or self.sxx == 0.0:
+            return None
+
+        y_media_desl = somas.sy / n
+        ssxm = self.sxx / n
+        ssym = max(somas.syy / n - y_media_desl**2, 0.0)
+        ssxym = somas.sxy / n
+
+        # y constante: o resíduo das atualizações incrementais não conta como variância
+        if ssym <= 1e-12 * (1.0 + (somas.deslocamento + y_media_desl)**2):
+            ssym = ssxym = 0.0
+            r = np.nan
+        else:
+            r = min(1.0, max(-1.0, ssxym / np.sqrt(ssxm * ssym)))
+
+        slope = ssxym / ssxm
+        intercept = somas.deslocamento + y_media_desl - slope * self.x_media
+        if n == 2:
+            p_value = 1.0 if ssym == 0.0 else 0.0
+            std_err = 0.0
+        else:
+            df = n - 2
+            t = r * np.sqrt(df / ((1.0 - r + 1.0e-20) * (1.0 + r + 1.0e-20)))
+            p_value = 2 * stats.t.sf(abs(t), df)
+            std_err = np.sqrt((1 - r**2) * ssym / ssxm / df)
+
+        return {
+            'a': slope,
+            'b': intercept,
+            'r2': r**2,
+            'r': r,
+            'p_value': p_value,
+            'std_err': std_err
+        }
+
+
+class MotorCalibracao:
+    """Cálculos de calibração e fotoperíodo sem dependência de sessão"""
+
+    def __init__(self, dados_bancada, parametros_canais, parametros_gaussianos,
+                 parametros_temporais, memo=None, integracao='numerico',
+                 estatisticas=None, regressoes=None):
+        self.dados_bancada = dados_bancada
+        self.parametros_canais = parametros_canais
+        self.parametros_gaussianos = parametros_gaussianos
+        self.parametros_temporais = parametros_temporais
+        self.memo = memo if memo is not None else MemoLRU()
+        # 'numerico' (soma de retângulos) ou 'analitico' (forma fechada com erf)
+        self.integracao = integracao
+        # Canais sem parâmetros próprios (bancadas com mais canais) recebem os padrões
+        for canal in self.canais:
+            parametros_canais.setdefault(f'proporcao_{canal}', PROPORCAO_PADRAO)
+            parametros_gaussianos.setdefault(f'canal_{canal}', dict(GAUSSIANA_PADRAO))
+        # Estatísticas e regressões recebidas (ex.: guardadas na sessão) são
+        # reaproveitadas; só os canais que faltam são calculados
+        self.estatisticas = estatisticas if estatisticas is not None else {}
+        self.regressoes = regressoes if regressoes is not None else {}
+        faltantes = tuple(canal for canal in self.canais if canal not in self.regressoes)
+        if faltantes:
+            self.calcular_regressoes(faltantes)
+
+    @classmethod
+    def padrao(cls):
+        """Cria um motor com os valores padrão de calibração"""
+        return cls(**valores_padrao())
+
+    @property
+    def canais(self):
+        """Canais da bancada, na ordem de dados_bancada"""
+        return tuple(self.dados_bancada)
+
+    def espectro_canal(self, canal):
+        """Nome do espectro do LED do canal na biblioteca espectral"""
+        return self.dados_bancada[canal].get('espectro')
+
+    def saidas_lamp(self):
+        """Pares (saída LAMP, canal) ordenados pela saída
+
+        Canais sem 'saidas_lamp' ocupam as próximas saídas livres, na ordem
+        de dados_bancada.
+        """
+        saidas = {}
+        for canal in self.canais:
+            for saida in map(int, self.dados_bancada[canal].get('saidas_lamp', ())):
+                if saida in saidas:
+                    raise ValueError(
+                        f"Saída LAMP_CH{saida} usada por {saidas[saida]} e {canal}")
+                saidas[saida] = canal
+        proxima = max(saidas, default=0) + 1
+        for canal in self.canais:
+            if 'saidas_lamp' not in self.dados_bancada[canal]:
+                saidas[proxima] = canal
+                proxima += 1
+        return sorted(saidas.items())
+
+    def canais_lamp(self):
+        """Canais na ordem da sua primeira saída LAMP (ordem das tabelas e arquivos)"""
+        return tuple(dict.fromkeys(canal for _, canal in self.saidas_lamp()))
+
+    def calcular_mediana(self, dados):
+        """Calcula a mediana dos dados"""
+        return np.median(dados, axis=0)
+
+    def calcular_regressao(self, x, y):
+        """Calcula regressão linear"""
+        if len(x) < 2 or len(y) < 2:
+            return {'a': 0, 'b': 0, 'r2': 0, 'r': 0, 'p_value': 1, 'std_err': 0}
+
+        slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+        return {
+            'a': slope,
+            'b': intercept,
+            'r2': r_value**2,
+            'r': r_value,
+            'p_value': p_value,
+            'std_err': std_err
+        }
+
+    def calcular_regressoes(self, canais=None):
+        """Recalcula do zero as estatísticas e regressões dos canais"""
+        for canal in canais or self.canais:
+            dados = self.dados_bancada[canal]
+            self.estatisticas[canal] = EstatisticasCanal(
+                dados['dados'], dados['valores_referencia'])
+            self.regressoes[canal] = self._montar_regressao_canal(canal)
+
+    def atualizar_celula(self, canal, repeticao, coluna, valor):
+        """Altera uma célula da calibração e invalida só a regressão do canal"""
+        dados = self.dados_bancada[canal]['dados']
+        antigo = float(dados[repeticao, coluna])
+        if valor == antigo:
+            return False
+
+        dados[repeticao, coluna] = valor
+        self.estatisticas[canal].atualizar(coluna, antigo, float(valor))
+        self.regressoes[canal] = self._montar_regressao_canal(canal)
+        return True
+
+    def _montar_regressao_canal(self, canal):
+        """Monta o dicionário de regressões a partir das estatísticas do canal"""
+        est = self.estatisticas[canal]
+        x = self.dados_bancada[canal]['valores_referencia']
+        medianas = est.medianas.copy()
+        medias = est.medias.copy()
+
+        regressao_mediana = est.regressao(est.somas_mediana)
+        if regressao_mediana is None:
+            regressao_mediana = self.calcular_regressao(x, medianas)
+        valores_previstos_mediana = regressao_mediana['a'] * \
+            x + regressao_mediana['b']
+
+        regressao_media = est.regressao(est.somas_media)
+        if regressao_media is None:
+            regressao_media = self.calcular_regressao(x, medias)
+        valores_previstos_media = regressao_media['a'] * \
+            x + regressao_media['b']
+
+        return {
+            'medianas': medianas,
+            'medias': medias,
+            'regressao_mediana': regressao_mediana,
+            'regressao_media': regressao_media,
+            'valores_previstos_mediana': valores_previstos_mediana,
+            'valores_previstos_media': valores_previstos_media,
+            # Máximo medido na calibração
+            'limite_max_calibracao': np.max(medias),
+            # Mínimo medido na calibração
+            'limite_min_calibracao': np.min(medias)
+        }
+
+    def calcular_gaussiana(self, x, sigma, mi, intensidade_max, intensidade_min):
+        """Calcula a distribuição gaussiana"""
+        return intensidade_min + (intensidade_max - intensidade_min) * np.exp(-((x - mi)**2) / (2 * sigma**2))
+
+    def normalizar_para_ppfd(self, canal, valor_normalizado):
+        """Converte valor normalizado (0-1) para PPFD usando regressão da calibração"""
+        reg = self.regressoes[canal]['regressao_media']
+        return reg['a'] * valor_normalizado + reg['b']
+
+    def ppfd_para_normalizado(self, canal, ppfd):
+        """Converte PPFD para valor normalizado (0-1) usando regressão inversa"""
+        reg = self.regressoes[canal]['regressao_media']
+        if reg['a'] != 0:
+            return (ppfd - reg['b']) / reg['a']
+        return 0
+
+    def _coeficientes_canais(self, canais):
+        """Empilha inclinação, intercepto e limites de calibração por canal"""
+        regs = [self.regressoes[canal] for canal in canais]
+        a = np.array([reg['regressao_media']['a'] for reg in regs], dtype=float)
+        b = np.array([reg['regressao_media']['b'] for reg in regs], dtype=float)
+        limite_max = np.array([reg['limite_max_calibracao'] for reg in regs], dtype=float)
+        limite_min = np.array([reg['limite_min_calibracao'] for reg in regs], dtype=float)
+        return a, b, limite_max, limite_min
+
+    def calcular_intensidades_canais(self, canais=None):
+        """Calcula intensidades máximas e mínimas de vários canais de uma vez"""
+        params = self.parametros_canais
+        todos = self.canais
+        canais = canais or todos
+
+        # Calcular proporções normalizadas sobre todos os canais da bancada
+        proporcoes = np.array([params[f'proporcao_{canal}'] for canal in todos])
+        proporcoes_norm = proporcoes / proporcoes.sum()
+        proporcao_canal = proporcoes_norm[[todos.index(canal) for canal in canais]]
+
+        a, b, limite_max_calibracao, limite_min_calibracao = self._coeficientes_canais(canais)
+
+        return limites_operacao(
+            proporcao_canal, params['intensidade_max_total'], params['intensidade_min_total'],
+            a, b, limite_max_calibracao, limite_min_calibracao)
+
+    def calcular_intensidade_canal(self, canal):
+        """Calcula intensidade máxima e mínima para um canal considerando calibração"""
+        resultado = self.calcular_intensidades_canais((canal,))
+        return tuple(valor[0] for valor in resultado)
+
+    def gerar_dados_canais(self, canais=None, parametros_gaussianos=None):
+        """Gera o bloco (canais, pontos) de intensidade, integral, DLI e ICE"""
+        canais = canais or self.canais
+        if parametros_gaussianos is None:
+            parametros_gaussianos = self.parametros_gaussianos
+        sigmas = np.array([parametros_gaussianos[f'canal_{canal}']['sigma']
+                           for canal in canais], dtype=float)[:, None]
+        mis = np.array([parametros_gaussianos[f'canal_{canal}']['mi']
+                        for canal in canais], dtype=float)[:, None]
+
+        intensidade_max, intensidade_min, valor_max_norm, valor_min_norm = \
+            self.calcular_intensidades_canais(canais)
+        a, b, limite_max_calibracao, limite_min_calibracao = self._coeficientes_canais(canais)
+
+        tempo = self.parametros_temporais
+        n_pontos = tempo['n_pontos']
+
+        # Gerar gaussianas no domínio normalizado [-1, 1] e normalizar cada linha para [0, 1]
+        x_vals = np.linspace(-1, 1, n_pontos)
+        gaussiana_norm = self.calcular_gaussiana(x_vals, sigmas, mis, 1.0, 0.0)
+        gauss_min = gaussiana_norm.min(axis=1, keepdims=True)
+        gauss_range = gaussiana_norm.max(axis=1, keepdims=True) - gauss_min
+        gaussiana_norm = np.where(
+            gauss_range > 0,
+            (gaussiana_norm - gauss_min) / np.where(gauss_range > 0, gauss_range, 1.0),
+            gaussiana_norm)
+
+        # Mapear para [valor_min_norm, valor_max_norm] e converter para PPFD (afim por canal)
+        valores_norm = valor_min_norm[:, None] + \
+            gaussiana_norm * (valor_max_norm - valor_min_norm)[:, None]
+        intensidades = np.clip(a[:, None] * valores_norm + b[:, None],
+                               limite_min_calibracao[:, None], limite_max_calibracao[:, None])
+
+        # Reamostragem cúbica para 200 pontos em poucas amostras
+        if n_pontos < 50:
+            intensidades = intensidades @ _matriz_reamostragem_cubica(n_pontos, 200).T
+            x_vals = np.linspace(-1, 1, 200)
+
+        horas_decimais = np.linspace(
+            tempo['hora_inicio'], tempo['hora_fim'], len(x_vals))
+
+        fotoperiodo_segundos = (tempo['hora_fim'] - tempo['hora_inicio']) * 3600
+        delta_t_segundos = fotoperiodo_segundos / (len(x_vals) - 1)
+        integral = np.cumsum(intensidades, axis=1) * delta_t_segundos / 1_000_000
+
+        dli_final = integral[:, -1]
+        if fotoperiodo_segundos > 0:
+            ice = dli_final * 1_000_000 / fotoperiodo_segundos
+        else:
+            ice = np.zeros_like(dli_final)
+
+        bloco = {
+            'canais': tuple(canais),
+            'x': x_vals,
+            'hora_decimal': horas_decimais,
+            'Intensidade': intensidades,
+            'Integral': integral,
+            'DLI_final': dli_final,
+            'ICE': ice,
+            'intensidade_max': intensidade_max,
+            'intensidade_min': intensidade_min,
+            'limite_max_calibracao': limite_max_calibracao,
+            'limite_min_calibracao': limite_min_calibracao
+        }
+
+        if self.integracao == 'analitico':
+            # Valores numéricos mantidos para conferência
+            bloco['DLI_final_numerico'] = dli_final
+            bloco.update(self.integrar_analitico(
+                canais, horas_decimais, parametros_gaussianos))
+
+        return bloco
+
+    def coeficientes_perfil(self, canais=None, parametros_gaussianos=None):
+        """Parâmetros contínuos do perfil: intensidade = clip(p + q·gaussiana)"""
+        canais = canais or self.canais
+        if parametros_gaussianos is None:
+            parametros_gaussianos = self.parametros_gaussianos
+        sigmas = np.array([parametros_gaussianos[f'canal_{canal}']['sigma']
+                           for canal in canais], dtype=float)
+        mis = np.array([parametros_gaussianos[f'canal_{canal}']['mi']
+                        for canal in canais], dtype=float)
+
+        _, _, valor_max_norm, valor_min_norm = self.calcular_intensidades_canais(canais)
+        a, b, limite_max, limite_min = self._coeficientes_canais(canais)
+        p, q = coeficientes_gaussiana(sigmas, mis, valor_max_norm, valor_min_norm, a, b)
+        return sigmas, mis, p, q, limite_min, limite_max
+
+    def integrar_analitico(self, canais=None, horas=None, parametros_gaussianos=None):
+        """DLI, ICE e integral acumulada exatos em quaisquer horários"""
+        canais = canais or self.canais
+        tempo = self.parametros_temporais
+        if horas is None:
+            horas = np.linspace(tempo['hora_inicio'], tempo['hora_fim'], tempo['n_pontos'])
+        horas = np.asarray(horas, dtype=float)
+
+        fotoperiodo_segundos = (tempo['hora_fim'] - tempo['hora_inicio']) * 3600
+        if fotoperiodo_segundos <= 0:
+            zeros = np.zeros(len(canais))
+            return {'Integral': np.zeros((len(canais), horas.size)),
+                    'DLI_final': zeros, 'ICE': zeros.copy()}
+
+        # Horário -> domínio normalizado [-1, 1]; dt = (fotoperíodo / 2) dx
+        x = -1 + 2 * (horas - tempo['hora_inicio']) / (tempo['hora_fim'] - tempo['hora_inicio'])
+        pontos = np.append(x, 1.0)
+        acumulado = integral_perfil_gaussiano(
+            pontos, *self.coeficientes_perfil(canais, parametros_gaussianos)
+        ) * (fotoperiodo_segundos / 2) / 1_000_000
+
+        dli_final = acumulado[:, -1]
+        return {
+            'Integral': acumulado[:, :-1],
+            'DLI_final': dli_final,
+            'ICE': dli_final * 1_000_000 / fotoperiodo_segundos
+        }
+
+    def dados_do_bloco(self, bloco, canal):
+        """Extrai do bloco vetorizado o dicionário de um único canal"""
+        i = bloco['canais'].index(canal)
+        dados = {'x': bloco['x'], 'hora_decimal': bloco['hora_decimal']}
+        for chave in ('Intensidade', 'Integral', 'DLI_final', 'ICE', 'intensidade_max',
+                      'intensidade_min', 'limite_max_calibracao', 'limite_min_calibracao',
+                      'DLI_final_numerico'):
+            if chave in bloco:
+                dados[chave] = bloco[chave][i]
+        return dados
+
+    def chave_canal(self, canal, sigma, mi):
+        """Chave por valor de tudo que determina a curva de um canal"""
+        reg = self.regressoes[canal]
+        params = self.parametros_canais
+        tempo = self.parametros_temporais
+        return (
+            canal,
+            float(reg['regressao_media']['a']), float(reg['regressao_media']['b']),
+            float(reg['limite_max_calibracao']), float(reg['limite_min_calibracao']),
+            tuple(float(params[f'proporcao_{c}']) for c in self.canais),
+            float(params['intensidade_max_total']), float(params['intensidade_min_total']),
+            float(sigma), float(mi),
+            tempo['hora_inicio'], tempo['hora_fim'], tempo['n_pontos'],
+            self.integracao
+        )
+
+    def gerar_dados_canal(self, canal, sigma, mi):
+        """Gera dados para um canal específico"""
+        chave = self.chave_canal(canal, sigma, mi)
+        dados = self.memo.get(chave)
+        if dados is None:
+            bloco = _somente_leitura(self.gerar_dados_canais(
+                (canal,), {f'canal_{canal}': {'sigma': sigma, 'mi': mi}}))
+            dados = self.dados_do_bloco(bloco, canal)
+            self.memo.put(chave, dados)
+        return dados
+
+    def get_dados_canal(self, canal):
+        """Obtém dados de um canal específico"""
+        params_gauss = self.parametros_gaussianos[f'canal_{canal}']
+        return self.gerar_dados_canal(canal, params_gauss['sigma'], params_gauss['mi'])
+
+    def get_dados_canais(self, canais=None):
+        """Obtém os dados de vários canais, calculando os ausentes em um único bloco"""
+        canais = canais or self.canais
+        chaves = {}
+        for canal in canais:
+            params_gauss = self.parametros_gaussianos[f'canal_{canal}']
+            chaves[canal] = self.chave_canal(
+                canal, params_gauss['sigma'], params_gauss['mi'])
+
+        faltantes = tuple(canal for canal in canais if chaves[canal] not in self.memo)
+        if faltantes:
+            bloco = _somente_leitura(self.gerar_dados_canais(faltantes))
+            for canal in faltantes:
+                self.memo.put(chaves[canal], self.dados_do_bloco(bloco, canal))
+
+        return {canal: self.memo.get(chaves[canal]) for canal in canais}
+
+    def gerar_conteudo_lamp(self, dados, params_temp):
+        """Gera o conteúdo formatado para arquivos LAMP"""
+        # Se houver menos de 50 pontos, usar interpolação para mais pontos
+        if len(dados['hora_decimal']) < 50:
+            # Interpolar para ter pelo menos 10 pontos
+            n_pontos_arquivo = 10
+            horas_interp = np.linspace(
+                params_temp['hora_inicio'], params_temp['hora_fim'], n_pontos_arquivo)
+            f = interp1d(dados['hora_decimal'],
+                         dados['Intensidade'], kind='linear')
+            intensidades_interp = f(horas_interp)
+        else:
+            # Usar todos os pontos (limitado a 50 para não ficar muito grande)
+            n_pontos_arquivo = min(50, len(dados['hora_decimal']))
+            idx_selecionados = np.linspace(
+                0, len(dados['hora_decimal'])-1, n_pontos_arquivo, dtype=int)
+            horas_interp = dados['hora_decimal'][idx_selecionados]
+            intensidades_interp = dados['Intensidade'][idx_selecionados]
+
+        # Converter hora decimal para horas, minutos, segundos (truncando cada parte)
+        hora_int = np.trunc(horas_interp)
+        minutos = (horas_interp - hora_int) * 60
+        minuto_int = np.trunc(minutos)
+        segundo_int = np.trunc((minutos - minuto_int) * 60)
+        segundos = hora_int * 3600 + minuto_int * 60 + segundo_int
+
+        return formatar_linhas_lamp(segundos, intensidades_interp)
+
+    def iterar_conteudo_lamp(self, canal, resolucao_segundos=1, linhas_por_bloco=3600):
+        """Gera o arquivo LAMP em alta resolução, um bloco de linhas por vez
+
+        As intensidades vêm do perfil contínuo do canal, avaliado apenas no
+        bloco corrente, de modo que a memória não cresce com a resolução.
+        """
+        tempo = self.parametros_temporais
+        inicio = int(round(tempo['hora_inicio'] * 3600))
+        fim = int(round(tempo['hora_fim'] * 3600))
+        duracao = fim - inicio
+        sigma, mi, p, q, limite_min, limite_max = (
+            v[0] for v in self.coeficientes_perfil((canal,)))
+
+        for bloco_inicio in range(inicio, fim + 1, resolucao_segundos * linhas_por_bloco):
+            bloco_fim = min(bloco_inicio + resolucao_segundos * linhas_por_bloco, fim + 1)
+            segundos = np.arange(bloco_inicio, bloco_fim, resolucao_segundos)
+            if duracao > 0:
+                x = -1 + 2 * (segundos - inicio) / duracao
+            else:
+                x = np.zeros(len(segundos))
+            intensidades = perfil_gaussiano(x, sigma, mi, p, q, limite_min, limite_max)
+            yield formatar_linhas_lamp(segundos, intensidades)
+
+    def escrever_conteudo_lamp(self, destino, canal, resolucao_segundos=1):
+        """Escreve o arquivo LAMP em alta resolução em um destino binário (ex.: ZIP)"""
+        for bloco in self.iterar_conteudo_lamp(canal, resolucao_segundos):
+            destino.write(bloco.encode())
+
+    def gerar_conteudo_lamp_ice(self, dados, params_temp):
+        """Gera o conteúdo simplificado para arquivos LAMP com apenas ICE inicial e final"""
+        # Converter ICE para inteiro
+        ice_int = int(round(dados['ICE']))
+
+        # Linha 1: Horário de início con ICE
+        linha_inicio = f"{params_temp['hora_inicio']:02d} 00 00 {ice_int}\n"
+
+        # Linha 2: Horário de fim con ICE
+        linha_fim = f"{params_temp['hora_fim']:02d} 00 00 {ice_int}\n"
+
+        return linha_inicio + linha_fim
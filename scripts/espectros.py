@@ -0,0 +1,437 @@
+"""
+espectros.py
+Biblioteca espectral compilada: o spectra_data.json é convertido uma única
+vez em um arquivo binário (.npy com todos os valores em sequência) e um
+índice com nome, tipo de dado e deslocamentos de cada espectro. A carga usa
+memória mapeada, então cada espectro é uma visão sem cópia, e a compilação
+só é refeita quando o checksum do JSON de origem muda.
+
+Espectros importados de arquivos do espectrômetro (scripts/importacao.py)
+não passam pelo JSON: são anexados ao fim do .npy e registrados no índice
+com origem "importado", e as recompilações do JSON os preservam.
+"""
+
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from scripts.calibracao import MemoLRU
+
+
+VERSAO_FORMATO = 1
+
+# Chaves aceitas para o vetor de dados de um espectro, em ordem de prioridade
+CHAVES_DADOS = ("irradiance", "absorbance", "values", "data")
+
+PASTA_COMPILADA = ".biblioteca"
+
+# Bibliotecas já abertas neste processo: caminho -> (assinatura, biblioteca)
+_abertas = {}
+
+
+def checksum_arquivo(caminho):
+    """SHA-256 do conteúdo de um arquivo"""
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def caminhos_compilados(origem):
+    """Arquivos de dados e de índice da versão compilada de um JSON"""
+    origem = Path(origem)
+    pasta = origem.parent / PASTA_COMPILADA
+    return pasta / f"{origem.stem}.npy", pasta / f"{origem.stem}.indice.json"
+
+
+def escrever_atomico(caminho, escrever):
+    """Escreve em arquivo temporário e substitui o destino de uma só vez"""
+    temporario = caminho.with_name(caminho.name + f".{os.getpid()}.tmp")
+    try:
+        with open(temporario, "wb") as f:
+            escrever(f)
+        os.replace(temporario, caminho)
+    finally:
+        if temporario.exists():
+            temporario.unlink()
+
+
+def _versao(base, entradas, dados):
+    """Versão da biblioteca: o checksum do JSON, encadeado com cada espectro importado"""
+    if not entradas:
+        return base
+    resumo = hashlib.sha256(base.encode("utf-8"))
+    for entrada in entradas:
+        resumo.update(entrada["nome"].encode("utf-8"))
+        for inicio, n in ((entrada["inicio_wl"], entrada["n_wl"]),
+                          (entrada["inicio_valores"], entrada["n_valores"])):
+            resumo.update(np.ascontiguousarray(dados[inicio:inicio + n]).tobytes())
+    return resumo.hexdigest()
+
+
+def _importados_anteriores(origem):
+    """Espectros importados da compilação atual, copiados para a memória: [(entrada, wl, valores)]"""
+    caminho_dados, caminho_indice = caminhos_compilados(origem)
+    indice = _ler_indice(caminho_indice)
+    if indice is None or not caminho_dados.exists():
+        return []
+    dados = np.load(caminho_dados, mmap_mode="r")
+    return [(entrada,
+             np.array(dados[entrada["inicio_wl"]:entrada["inicio_wl"] + entrada["n_wl"]]),
+             np.array(dados[entrada["inicio_valores"]:entrada["inicio_valores"] + entrada["n_valores"]]))
+            for entrada in indice["espectros"] if entrada.get("origem") == "importado"]
+
+
+def compilar_biblioteca(origem, checksum=None):
+    """Converte o JSON de espectros no par .npy + índice e retorna o índice
+
+    Espectros importados na compilação anterior são mantidos, exceto os que
+    passaram a existir com o mesmo nome no JSON.
+    """
+    origem = Path(origem)
+    with origem.open("r", encoding="utf-8") as f:
+        espectros = json.load(f)
+    importados = [item for item in _importados_anteriores(origem)
+                  if item[0]["nome"] not in espectros]
+
+    entradas = []
+    partes = []
+    posicao = 0
+
+    def anexar(valores):
+        nonlocal posicao
+        vetor = np.asarray(valores, dtype=float).ravel()
+        partes.append(vetor)
+        inicio = posicao
+        posicao += vetor.size
+        return inicio, vetor.size
+
+    for nome, obj in espectros.items():
+        entrada = {"nome": nome, "tipo": None, "problema": None}
+
+        wl = obj.get("wavelengths")
+        if isinstance(wl, list):
+            entrada["inicio_wl"], entrada["n_wl"] = anexar(wl)
+        else:
+            entrada["inicio_wl"], entrada["n_wl"] = posicao, None
+            entrada["problema"] = "wavelengths missing or not list"
+
+        tipo = next((k for k in CHAVES_DADOS if k in obj), None)
+        entrada["tipo"] = tipo
+        valores = obj.get(tipo) if tipo else None
+        if isinstance(valores, list):
+            entrada["inicio_valores"], entrada["n_valores"] = anexar(valores)
+        else:
+            entrada["inicio_valores"], entrada["n_valores"] = posicao, None
+            if entrada["problema"] is None:
+                entrada["problema"] = (f"{tipo} not list" if tipo else
+                                       "no data array (irradiance/absorbance/...)")
+        entradas.append(entrada)
+
+    for entrada, wl, valores in importados:
+        entrada = dict(entrada)
+        entrada["inicio_wl"], entrada["n_wl"] = anexar(wl)
+        entrada["inicio_valores"], entrada["n_valores"] = anexar(valores)
+        entradas.append(entrada)
+
+    stat = origem.stat()
+    checksum = checksum or checksum_arquivo(origem)
+    dados = np.concatenate(partes) if partes else np.zeros(0)
+    indice = {
+        "versao_formato": VERSAO_FORMATO,
+        "checksum": checksum,
+        "versao": _versao(checksum, entradas[len(espectros):], dados),
+        "mtime_ns": stat.st_mtime_ns,
+        "tamanho": stat.st_size,
+        "espectros": entradas
+    }
+
+    caminho_dados, caminho_indice = caminhos_compilados(origem)
+    caminho_dados.parent.mkdir(exist_ok=True)
+    escrever_atomico(caminho_dados, lambda f: np.save(f, dados))
+    escrever_atomico(caminho_indice, lambda f: f.write(
+        json.dumps(indice, ensure_ascii=False).encode("utf-8")))
+    return indice
+
+
+def _ler_indice(caminho_indice):
+    try:
+        with open(caminho_indice, "r", encoding="utf-8") as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if indice.get("versao_formato") != VERSAO_FORMATO:
+        return None
+    return indice
+
+
+def carregar_biblioteca(origem):
+    """Abre a biblioteca compilada de um JSON, recompilando apenas se a origem mudou
+
+    mtime e tamanho iguais aos registrados dispensam o checksum; se diferirem,
+    o checksum decide entre reaproveitar (arquivo apenas tocado) e recompilar.
+    """
+    origem = Path(origem).resolve()
+    stat = origem.stat()
+    caminho_dados, caminho_indice = caminhos_compilados(origem)
+
+    # O índice entra na assinatura para enxergar importações feitas por outro processo
+    aberta = _abertas.get(origem)
+    if aberta and aberta[0] == _assinatura(stat, caminho_indice):
+        return aberta[1]
+
+    indice = _ler_indice(caminho_indice)
+    valido = indice is not None and caminho_dados.exists()
+
+    if not (valido and (indice["mtime_ns"], indice["tamanho"]) == (stat.st_mtime_ns, stat.st_size)):
+        checksum = checksum_arquivo(origem)
+        if valido and indice["checksum"] == checksum:
+            # Conteúdo igual: só atualiza a assinatura rápida
+            indice.update(mtime_ns=stat.st_mtime_ns, tamanho=stat.st_size)
+            escrever_atomico(caminho_indice, lambda f: f.write(
+                json.dumps(indice, ensure_ascii=False).encode("utf-8")))
+        else:
+            indice = compilar_biblioteca(origem, checksum)
+
+    biblioteca = BibliotecaEspectral(indice, np.load(caminho_dados, mmap_mode="r"))
+    _abertas[origem] = (_assinatura(stat, caminho_indice), biblioteca)
+    return biblioteca
+
+
+def _assinatura(stat, caminho_indice):
+    try:
+        mtime_indice = caminho_indice.stat().st_mtime_ns
+    except OSError:
+        mtime_indice = None
+    return stat.st_mtime_ns, stat.st_size, mtime_indice
+
+
+def _anexar_npy(caminho, valores):
+    """Anexa valores a um .npy 1-D sem reescrevê-lo e retorna a posição do primeiro
+
+    Os dados vão para o fim do arquivo e só o cabeçalho (que o np.save deixa
+    com folga para o tamanho crescer) é regravado no lugar. Retorna None se o
+    arquivo não for 1-D ou o novo cabeçalho não couber.
+    """
+    formato = np.lib.format
+    with open(caminho, "r+b") as f:
+        versao = formato.read_magic(f)
+        if versao not in ((1, 0), (2, 0)):
+            return None
+        ler, escrever = ((formato.read_array_header_1_0, formato.write_array_header_1_0)
+                         if versao == (1, 0) else
+                         (formato.read_array_header_2_0, formato.write_array_header_2_0))
+        forma, fortran, dtype = ler(f)
+        tamanho_cabecalho = f.tell()
+        if len(forma) != 1 or fortran:
+            return None
+
+        cabecalho = io.BytesIO()
+        escrever(cabecalho, {"descr": formato.dtype_to_descr(dtype), "fortran_order": False,
+                             "shape": (forma[0] + valores.size,)})
+        cabecalho = cabecalho.getvalue()
+        if len(cabecalho) != tamanho_cabecalho:
+            return None
+
+        # Dados antes do cabeçalho: interrompido no meio, o arquivo continua válido
+        f.seek(tamanho_cabecalho + forma[0] * dtype.itemsize)
+        f.write(np.ascontiguousarray(valores, dtype=dtype).tobytes())
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(len(formato.MAGIC_PREFIX) + 2)
+        f.write(cabecalho[len(formato.MAGIC_PREFIX) + 2:])
+    return forma[0]
+
+
+def anexar_espectros(origem, novos, metadados=None):
+    """Anexa espectros à biblioteca compilada de um JSON sem reescrevê-la
+
+    novos segue o formato do JSON ({nome: {'wavelengths': ..., tipo: ...}});
+    metadados opcionais ({nome: {...}}) são guardados na entrada do índice.
+    Nomes já presentes na biblioteca são recusados. Retorna a biblioteca
+    atualizada.
+    """
+    origem = Path(origem).resolve()
+    biblioteca = carregar_biblioteca(origem)
+    caminho_dados, caminho_indice = caminhos_compilados(origem)
+
+    repetidos = [nome for nome in novos if nome in biblioteca]
+    if repetidos:
+        raise ValueError(f"Espectros já existentes na biblioteca: {', '.join(repetidos)}")
+
+    entradas = []
+    partes = []
+    posicao = 0
+    for nome, obj in novos.items():
+        tipo = next((k for k in CHAVES_DADOS if k in obj), None)
+        wl = np.asarray(obj.get("wavelengths", []), dtype=float).ravel()
+        valores = np.asarray(obj.get(tipo, []) if tipo else [], dtype=float).ravel()
+        if tipo is None or wl.size == 0 or wl.size != valores.size:
+            raise ValueError(f"Espectro {nome} sem comprimentos de onda e valores de mesmo tamanho")
+        entradas.append({"nome": nome, "tipo": tipo, "problema": None,
+                         "inicio_wl": posicao, "n_wl": wl.size,
+                         "inicio_valores": posicao + wl.size, "n_valores": valores.size,
+                         "origem": "importado", **(metadados or {}).get(nome, {})})
+        partes += [wl, valores]
+        posicao += 2 * wl.size
+    bloco = np.concatenate(partes) if partes else np.zeros(0)
+    versao = _versao(biblioteca.versao, entradas, bloco)
+
+    inicio = _anexar_npy(caminho_dados, bloco)
+    if inicio is None:
+        inicio = biblioteca.dados.size
+        dados = np.concatenate([np.asarray(biblioteca.dados), bloco])
+        escrever_atomico(caminho_dados, lambda f: np.save(f, dados))
+    for entrada in entradas:
+        entrada["inicio_wl"] += inicio
+        entrada["inicio_valores"] += inicio
+
+    indice = dict(biblioteca.indice)
+    indice["espectros"] = indice["espectros"] + entradas
+    indice["versao"] = versao
+    escrever_atomico(caminho_indice, lambda f: f.write(
+        json.dumps(indice, ensure_ascii=False).encode("utf-8")))
+
+    _abertas.pop(origem, None)
+    return carregar_biblioteca(origem)
+
+
+class BibliotecaEspectral:
+    """Espectros compilados acessados como visões somente leitura de um único array"""
+
+    def __init__(self, indice, dados, grades_em_cache=8):
+        self.indice = indice
+        self.dados = dados
+        self.versao = indice.get("versao", indice["checksum"])
+        self._entradas = {entrada["nome"]: entrada for entrada in indice["espectros"]}
+        self._linhas = {nome: i for i, nome in enumerate(self._entradas)}
+        # Matrizes (n_espectros, n_comprimentos) já reamostradas, por grade
+        self.reamostradas = MemoLRU(grades_em_cache)
+        self._inconsistencias = None
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, nome):
+        return nome in self._entradas
+
+    def __iter__(self):
+        return iter(self._entradas)
+
+    def nomes(self):
+        return list(self._entradas)
+
+    def tipo(self, nome):
+        """Chave do vetor de dados no JSON (irradiance, absorbance, ...)"""
+        return self._entradas[nome]["tipo"]
+
+    def _visao(self, inicio, n):
+        if n is None:
+            return self.dados[0:0]
+        return self.dados[inicio:inicio + n]
+
+    def comprimentos_onda(self, nome):
+        entrada = self._entradas[nome]
+        return self._visao(entrada["inicio_wl"], entrada["n_wl"])
+
+    def valores(self, nome):
+        entrada = self._entradas[nome]
+        return self._visao(entrada["inicio_valores"], entrada["n_valores"])
+
+    def espectro(self, nome):
+        """Espectro no mesmo formato do JSON ({'wavelengths': ..., tipo: ...}), sem cópia"""
+        if nome not in self._entradas:
+            return {}
+        espectro = {"wavelengths": self.comprimentos_onda(nome)}
+        tipo = self.tipo(nome)
+        if tipo:
+            espectro[tipo] = self.valores(nome)
+        return espectro
+
+    def como_dicionario(self):
+        """Todos os espectros no formato do JSON, como visões do array mapeado"""
+        return {nome: self.espectro(nome) for nome in self._entradas}
+
+    def linha(self, nome):
+        """Posição do espectro nas matrizes reamostradas"""
+        return self._linhas[nome]
+
+    def _reamostrar_todos(self, grade):
+        """Interpola toda a biblioteca na grade com uma única chamada de np.interp
+
+        Cada espectro é deslocado para um trecho próprio do eixo (k·passo), de
+        forma que os segmentos concatenados formam um único eixo crescente.
+        Fora da faixa medida vale o primeiro/último valor, como no np.interp.
+        """
+        n_espectros = len(self._entradas)
+        matriz = np.zeros((n_espectros, grade.size))
+        validos = [(i, e) for i, e in enumerate(self._entradas.values())
+                   if e["problema"] is None and e["n_wl"] and e["n_valores"] == e["n_wl"]]
+        if not validos or grade.size == 0:
+            return matriz
+
+        linhas = np.array([i for i, _ in validos])
+        tamanhos = np.array([e["n_wl"] for _, e in validos])
+        inicio = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+        segmento = np.repeat(np.arange(len(validos)), tamanhos)
+
+        # Índices de todos os pontos no array compilado, sem fatiar espectro por espectro
+        posicao = np.arange(tamanhos.sum()) - np.repeat(inicio, tamanhos)
+        dados = np.asarray(self.dados)
+        wl = dados[np.repeat([e["inicio_wl"] for _, e in validos], tamanhos) + posicao]
+        valores = dados[np.repeat([e["inicio_valores"] for _, e in validos], tamanhos) + posicao]
+
+        # Ordenar cada espectro pelo comprimento de onda sem misturar segmentos
+        decrescente = np.diff(wl) < 0
+        if np.any(decrescente & (segmento[1:] == segmento[:-1])):
+            ordem = np.lexsort((wl, segmento))
+            wl, valores = wl[ordem], valores[ordem]
+
+        fim = inicio + tamanhos - 1
+        passo = (max(wl.max(), grade.max()) - min(wl.min(), grade.min())) * 2 + 1
+        deslocamento = np.arange(len(validos))[:, None] * passo
+
+        bloco = np.interp(grade[None, :] + deslocamento, wl + segmento * passo, valores)
+        bloco = np.where(grade[None, :] < wl[inicio][:, None], valores[inicio][:, None], bloco)
+        bloco = np.where(grade[None, :] > wl[fim][:, None], valores[fim][:, None], bloco)
+        matriz[linhas] = bloco
+        return matriz
+
+    def matriz_reamostrada(self, grade):
+        """Matriz (n_espectros, n_comprimentos) da biblioteca na grade, reaproveitada entre chamadas"""
+        grade = np.ascontiguousarray(grade, dtype=float)
+        chave = hashlib.sha1(grade.tobytes()).hexdigest()
+        matriz = self.reamostradas.get(chave)
+        if matriz is None:
+            matriz = self._reamostrar_todos(grade)
+            matriz.setflags(write=False)
+            self.reamostradas.put(chave, matriz)
+        return matriz
+
+    def reamostrar(self, nome, grade):
+        """Espectro na grade: uma linha da matriz reamostrada (zeros se ausente)"""
+        if nome not in self._linhas:
+            return np.zeros(len(grade))
+        return self.matriz_reamostrada(grade)[self._linhas[nome]]
+
+    def inconsistencias(self):
+        """Espectros cujo vetor de dados não acompanha os comprimentos de onda
+
+        Calculadas uma vez por versão da biblioteca: a instância só é trocada
+        quando o JSON de origem muda.
+        """
+        if self._inconsistencias is None:
+            problemas = []
+            for nome, entrada in self._entradas.items():
+                if entrada["problema"]:
+                    problemas.append((nome, entrada["problema"], entrada["n_wl"], None))
+                elif entrada["n_valores"] != entrada["n_wl"]:
+                    problemas.append((nome, entrada["tipo"], entrada["n_wl"], entrada["n_valores"]))
+            self._inconsistencias = tuple(problemas)
+        return list(self._inconsistencias)
@@ -1,16 +1,24 @@
+"""
+fix_spectra_interpolate.py
+Repairs spectra whose data array length does not match the wavelengths.
+
+Usage:
+    python -m scripts.fix_spectra_interpolate
+"""
+
 import json
+import shutil
 from pathlib import Path
 import numpy as np
-from scipy.interpolate import interp1d
+
+from scripts.espectros import escrever_atomico
 
 CANDIDATE_KEYS = ("irradiance", "transmittance",
                   "absorbance", "values", "data")
 
 
-def fix_file(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        j = json.load(f)
-
+def fix_spectra(j: dict):
+    """Fix length mismatches in an already loaded spectra dict, in place"""
     modified = False
     report = []
 
@@ -48,26 +56,31 @@ def fix_file(path: Path):
             reason = "fp single value -> broadcast"
         else:
             # assume fp sampled uniformly across wl range -> map onto wl
+            # (linear, 0 outside the range)
             xp_fp = np.linspace(wl.min(), wl.max(), fp.size)
-            try:
-                f = interp1d(xp_fp, fp, kind="linear",
-                             bounds_error=False, fill_value=0.0)
-                new_fp = f(wl)
-                reason = f"interpolated from {fp.size} -> {wl.size}"
-            except Exception as e:
-                new_fp = np.zeros_like(wl, dtype=float)
-                reason = f"interp failed: {e} -> zeros"
+            new_fp = np.interp(wl, xp_fp, fp, left=0.0, right=0.0)
+            reason = f"interpolated from {fp.size} -> {wl.size}"
 
         # write back
         obj[found_key] = new_fp.tolist()
         modified = True
         report.append((name, found_key, fp.size, wl.size, reason))
 
+    return report, modified
+
+
+def fix_file(path: Path):
+    """Fix a spectra JSON; the original is kept as .bak and the file is replaced atomically"""
+    path = Path(path)
+    with path.open("r", encoding="utf-8") as f:
+        j = json.load(f)
+
+    report, modified = fix_spectra(j)
+
     if modified:
-        bak = path.with_suffix(path.suffix + ".bak")
-        path.replace(bak)  # move original to .bak
-        with path.open("w", encoding="utf-8") as f:
-            json.dump(j, f, indent=2, ensure_ascii=False)
+        shutil.copy2(path, path.with_suffix(path.suffix + ".bak"))
+        escrever_atomico(path, lambda f: f.write(
+            json.dumps(j, indent=2, ensure_ascii=False).encode("utf-8")))
     return report, modified
 
 
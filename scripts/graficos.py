@@ -0,0 +1,243 @@
+"""
+graficos.py
+Dados das séries ECharts em colunas: os valores saem dos arrays NumPy com um
+único arredondamento vetorizado (np.round(...).tolist()), sem um dicionário
+por ponto. Séries que compartilham o eixo x leem um bloco dataset
+({dimensão: coluna}) por encode, então x é enviado uma única vez; a cor e os
+demais estilos ficam na série.
+
+Séries longas (espectros na resolução nativa, curvas do fotoperíodo em
+segundos) são reduzidas por Largest-Triangle-Three-Buckets a um orçamento de
+pontos por gráfico, preservando picos e mudanças de direção.
+
+impressao_digital resume as entradas de um gráfico (arrays pelo conteúdo)
+para que as opções já montadas sejam reaproveitadas entre reruns.
+
+Gráficos grandes (muitos pontos somando todas as séries, ou uma série acima
+do orçamento) recebem o perfil leve: sem animação nem símbolos, sem
+suavização e com os modos large/progressive do ECharts onde existem.
+"""
+
+import hashlib
+
+import numpy as np
+
+
+# Orçamento padrão de pontos por série (ou por dataset) enviado ao navegador
+PONTOS_POR_GRAFICO = 1000
+
+PASSADAS_LTTB = 3
+
+# Limites do perfil leve: pontos de uma série e total do gráfico. O limite por
+# série fica abaixo do orçamento do LTTB, senão uma série já reduzida nunca o
+# ultrapassaria (e o largeThreshold das séries nunca seria atingido); a grade
+# padrão da varredura (25x25) continua abaixo dele
+LIMIAR_PONTOS_SERIE = PONTOS_POR_GRAFICO * 3 // 4
+LIMIAR_PONTOS_GRAFICO = 1500
+# Elementos desenhados por quadro no modo progressivo
+PASSO_PROGRESSIVO = 500
+# Tipos de série com modo large (desenho em lote) e progressivo no ECharts
+TIPOS_LARGE = ("scatter", "bar")
+TIPOS_PROGRESSIVOS = ("scatter", "bar", "heatmap")
+
+
+def indices_lttb(x, y, limite=PONTOS_POR_GRAFICO):
+    """Índices dos pontos mantidos pelo Largest-Triangle-Three-Buckets
+
+    x crescente; y é (n,) ou (k, n). Com várias séries sobre o mesmo x a área
+    de cada triângulo é somada entre elas (cada uma dividida pela própria
+    amplitude) e todas ficam com os mesmos pontos. O primeiro e o último
+    ponto são sempre mantidos. Vetorizado por passadas: a âncora de cada balde
+    é primeiro a média do balde anterior e depois o ponto escolhido nele na
+    passada anterior; com PASSADAS_LTTB o erro fica no do LTTB sequencial.
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    n = x.size
+    if limite is None or n <= max(limite, 3):
+        return np.arange(n)
+
+    Y = np.nan_to_num(np.atleast_2d(np.asarray(y, dtype=float)))
+    amplitude = Y.max(axis=1) - Y.min(axis=1)
+    Y = Y / np.where(amplitude > 0, amplitude, 1.0)[:, None]
+
+    # Baldes contíguos com os pontos internos 1..n-2
+    n_baldes = max(limite, 3) - 2
+    bordas = (np.arange(n_baldes + 1) * (n - 2) // n_baldes) + 1
+    inicios = bordas[:-1] - 1
+    contagem = np.diff(bordas)
+    balde = np.repeat(np.arange(n_baldes), contagem)
+    x_int, Y_int = x[1:-1], Y[:, 1:-1]
+
+    media_x = np.add.reduceat(x_int, inicios) / contagem
+    media_Y = np.add.reduceat(Y_int, inicios, axis=1) / contagem
+    # Terceiro vértice: média do balde seguinte (o último ponto para o último balde)
+    cx = np.append(media_x[1:], x[-1])
+    cY = np.concatenate((media_Y[:, 1:], Y[:, -1:]), axis=1)
+    ax, aY = np.append(x[0], media_x[:-1]), np.concatenate((Y[:, :1], media_Y[:, :-1]), axis=1)
+
+    area = np.empty_like(Y_int)
+    termo = np.empty_like(Y_int)
+    for _ in range(PASSADAS_LTTB):
+        # |(ax − cx)·y − (ax − x)·(cY − aY) − (ax − cx)·aY|, constantes expandidas por balde
+        d = ax - cx
+        np.multiply(np.repeat(d, contagem), Y_int, out=area)
+        np.multiply(np.repeat(ax, contagem) - x_int, np.repeat(cY - aY, contagem, axis=1), out=termo)
+        area -= termo
+        area -= np.repeat(d * aY, contagem, axis=1)
+        np.abs(area, out=area)
+        soma = area.sum(axis=0)
+
+        # Primeiro ponto de área máxima em cada balde
+        maximo = np.maximum.reduceat(soma, inicios)
+        candidatos = np.flatnonzero(soma == np.repeat(maximo, contagem))
+        escolhidos = candidatos[np.searchsorted(balde[candidatos], np.arange(n_baldes))] + 1
+        ax = np.append(x[0], x[escolhidos[:-1]])
+        aY = np.concatenate((Y[:, :1], Y[:, escolhidos[:-1]]), axis=1)
+
+    return np.concatenate(([0], escolhidos, [n - 1]))
+
+
+def coluna(valores, casas=None):
+    """Array como lista para o JSON, arredondado de uma vez; valores não finitos viram None"""
+    a = np.asarray(valores, dtype=float).ravel()
+    if casas is not None:
+        a = np.round(a, casas)
+    finitos = np.isfinite(a)
+    if finitos.all():
+        return a.tolist()
+    return np.where(finitos, a, None).tolist()
+
+
+def pontos(x, y, casas=None, limite=PONTOS_POR_GRAFICO):
+    """Pares [[x, y], ...] de uma série que não compartilha o eixo x com outras"""
+    casas_x, casas_y = casas if isinstance(casas, tuple) else (casas, casas)
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if limite is not None and x.size > limite:
+        indices = indices_lttb(x, y, limite)
+        x, y = x[indices], y[indices]
+    pares = np.column_stack((x if casas_x is None else np.round(x, casas_x),
+                             y if casas_y is None else np.round(y, casas_y)))
+    finitos = np.isfinite(pares)
+    if finitos.all():
+        return pares.tolist()
+    return np.where(finitos, pares, None).tolist()
+
+
+def conjunto_dados(x, colunas, casas=None, casas_x=None, nome_x="x", limite=PONTOS_POR_GRAFICO):
+    """Bloco dataset com a coluna x e uma coluna por série ({nome: valores})
+
+    Acima do limite, todas as colunas são reduzidas aos mesmos pontos (LTTB).
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    if limite is not None and x.size > limite:
+        indices = indices_lttb(x, np.vstack([np.ravel(v) for v in colunas.values()]), limite)
+        x = x[indices]
+        colunas = {nome: np.ravel(valores)[indices] for nome, valores in colunas.items()}
+    return {
+        "dimensions": [nome_x, *colunas],
+        "source": {nome_x: coluna(x, casas_x),
+                   **{nome: coluna(valores, casas) for nome, valores in colunas.items()}}
+    }
+
+
+def serie_dataset(nome, dimensao, tipo="line", indice=0, nome_x="x", **opcoes):
+    """Série que lê x e y de um dataset; o tooltip mostra só a própria coluna"""
+    return {
+        "name": nome,
+        "type": tipo,
+        "datasetIndex": indice,
+        "encode": {"x": nome_x, "y": dimensao, "tooltip": [dimensao]},
+        **opcoes
+    }
+
+
+def conjuntos_dados(series, casas=None, casas_x=None, nome_x="x", limite=PONTOS_POR_GRAFICO):
+    """Datasets para séries {dimensão: (x, y)}, um por eixo x distinto
+
+    Séries com o mesmo x (comparado byte a byte) ficam no mesmo dataset.
+    Retorna (lista de datasets, {dimensão: índice do dataset}).
+    """
+    grupos = {}
+    for dimensao, (x, y) in series.items():
+        x = np.ascontiguousarray(x, dtype=float)
+        chave = (x.size, x.tobytes())
+        grupos.setdefault(chave, (x, {}))[1][dimensao] = y
+    datasets = []
+    indices = {}
+    for x, colunas in grupos.values():
+        indices.update(dict.fromkeys(colunas, len(datasets)))
+        datasets.append(conjunto_dados(x, colunas, casas, casas_x, nome_x, limite))
+    return datasets, indices
+
+
+def _resumir(resumo, valor):
+    if isinstance(valor, np.ndarray) and not valor.dtype.hasobject:
+        resumo.update(f"a{valor.dtype.str}{valor.shape}".encode())
+        resumo.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, np.ndarray):
+        _resumir(resumo, valor.tolist())
+    elif isinstance(valor, dict):
+        resumo.update(b"d%d" % len(valor))
+        for chave, item in valor.items():
+            _resumir(resumo, chave)
+            _resumir(resumo, item)
+    elif isinstance(valor, (list, tuple)):
+        resumo.update(b"l%d" % len(valor))
+        for item in valor:
+            _resumir(resumo, item)
+    else:
+        resumo.update(f"{type(valor).__name__}:{valor!r};".encode())
+
+
+def impressao_digital(*partes):
+    """Resumo BLAKE2 de entradas aninhadas (dicts, listas, arrays e escalares)
+
+    Arrays entram pelo dtype, forma e bytes (o repr do NumPy abrevia arrays
+    longos); dicts na ordem de inserção, que também é a ordem das opções.
+    """
+    resumo = hashlib.blake2b(digest_size=16)
+    _resumir(resumo, partes)
+    return resumo.hexdigest()
+
+
+def pontos_series(options):
+    """Número de pontos de cada série, lendo data ou a coluna y do dataset"""
+    datasets = options.get("dataset", [])
+    if isinstance(datasets, dict):
+        datasets = [datasets]
+    contagem = []
+    for serie in options.get("series", []):
+        if "data" in serie:
+            contagem.append(len(serie["data"]))
+        elif "encode" in serie and datasets:
+            fonte = datasets[serie.get("datasetIndex", 0)]["source"]
+            contagem.append(len(fonte[serie["encode"]["y"]]))
+        else:
+            contagem.append(0)
+    return contagem
+
+
+def grafico_grande(options):
+    """Se o gráfico deve usar o perfil leve (pelo tamanho e número das séries)"""
+    contagem = pontos_series(options)
+    return bool(contagem) and (max(contagem) > LIMIAR_PONTOS_SERIE
+                               or sum(contagem) > LIMIAR_PONTOS_GRAFICO)
+
+
+def aplicar_perfil_grande(options):
+    """Perfil leve no lugar: sem animação, símbolos e suavização; large/progressive por tipo"""
+    options["animation"] = False
+    for serie in options.get("series", []):
+        serie["animation"] = False
+        tipo = serie.get("type", "line")
+        if tipo == "line":
+            serie["showSymbol"] = False
+            serie["smooth"] = False
+        if tipo in TIPOS_LARGE:
+            serie["large"] = True
+            serie["largeThreshold"] = LIMIAR_PONTOS_SERIE
+        if tipo in TIPOS_PROGRESSIVOS:
+            serie["progressive"] = PASSO_PROGRESSIVO
+            serie["progressiveThreshold"] = LIMIAR_PONTOS_GRAFICO
+    return options
@@ -0,0 +1,272 @@
+"""
+importacao.py
+Importação de exportações de espectrômetros (CSV/TXT/XLSX/XLS) para a
+biblioteca espectral. O arquivo é lido em blocos e cada bloco é acumulado
+nos intervalos de uma grade canônica (soma e contagem por intervalo), então
+a memória depende do tamanho da grade e do bloco, não do número de amostras:
+medidas densas são decimadas pela média de cada intervalo e medidas esparsas
+são interpoladas entre os intervalos preenchidos. O espectro resultante é
+anexado à biblioteca compilada.
+
+Uso:
+    python -m scripts.importacao <arquivo> [--nome N] [--tipo irradiance|absorbance]
+                                 [--colunas 0 1] [--passo 1.0] [--biblioteca spectra_data.json]
+"""
+
+import argparse
+import contextlib
+import io
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scripts.espectros import anexar_espectros
+
+
+# Grade canônica: múltiplos de PASSO_CANONICO dentro de FAIXA_CANONICA (nm),
+# recortada depois para a faixa efetivamente medida
+FAIXA_CANONICA = (200.0, 1100.0)
+PASSO_CANONICO = 1.0
+
+TAMANHO_BLOCO = 50_000
+
+FORMATOS = {".csv": "texto", ".txt": "texto", ".dat": "texto", ".xlsx": "xlsx", ".xls": "xls"}
+
+# Separador e decimal testados na detecção, em ordem de preferência
+LAYOUTS_TEXTO = (("\t", "."), ("\t", ","), (";", "."), (";", ","), (",", "."),
+                 (r"\s+", "."), (r"\s+", ","))
+
+LINHAS_DETECCAO = 500
+
+
+def grade_canonica(passo=PASSO_CANONICO, faixa=FAIXA_CANONICA):
+    """Comprimentos de onda da grade canônica"""
+    inicio = np.ceil(faixa[0] / passo) * passo
+    return inicio + passo * np.arange(int(np.floor((faixa[1] - inicio) / passo)) + 1)
+
+
+def _para_numeros(coluna, decimal="."):
+    """Valores de planilha/texto como float; o que não for número vira NaN"""
+    serie = pd.Series(coluna)
+    if not pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype(str).str.strip()
+        if decimal != ".":
+            serie = serie.str.replace(decimal, ".", regex=False)
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+
+
+def _numerico(campo, decimal):
+    try:
+        return np.isfinite(float(campo.strip().strip('"').replace(decimal, ".")))
+    except ValueError:
+        return False
+
+
+def _detectar_layout(linhas, colunas):
+    """(linhas de cabeçalho, separador, decimal) do primeiro trecho numérico do texto"""
+    melhor = None
+    for separador, decimal in LAYOUTS_TEXTO:
+        consecutivas = 0
+        for i, linha in enumerate(linhas):
+            campos = re.split(separador, linha.strip()) if separador == r"\s+" else linha.split(separador)
+            numerica = all(c < len(campos) and _numerico(campos[c], decimal) for c in colunas)
+            consecutivas = consecutivas + 1 if numerica else 0
+            # Três linhas numéricas seguidas (ou o fim do trecho lido) marcam o início dos dados
+            if consecutivas == 3 or (consecutivas and i == len(linhas) - 1):
+                inicio = i - consecutivas + 1
+                if melhor is None or inicio < melhor[0]:
+                    melhor = (inicio, separador, decimal)
+                break
+    if melhor is None:
+        raise ValueError("Nenhuma coluna numérica de comprimento de onda e valor encontrada")
+    return melhor
+
+
+def _abrir(fonte):
+    """Caminho ou arquivo enviado (file-like) como fluxo binário posicionado no início
+
+    Arquivos recebidos já abertos não são fechados ao fim da leitura.
+    """
+    if hasattr(fonte, "read"):
+        fonte.seek(0)
+        return contextlib.nullcontext(fonte)
+    return open(fonte, "rb")
+
+
+def _blocos_texto(fonte, colunas, tamanho_bloco):
+    with _abrir(fonte) as bruto:
+        cabeca = io.TextIOWrapper(bruto, encoding="utf-8", errors="replace", newline="")
+        linhas = [linha for _, linha in zip(range(LINHAS_DETECCAO), cabeca)]
+        cabeca.detach()
+        pular, separador, decimal = _detectar_layout(linhas, colunas)
+
+        bruto.seek(0)
+        leitor = pd.read_csv(bruto, sep=separador, decimal=decimal, header=None, skiprows=pular,
+                             chunksize=tamanho_bloco, on_bad_lines="skip", encoding="utf-8",
+                             encoding_errors="replace", skip_blank_lines=True)
+        for bloco in leitor:
+            # Bloco só com o rodapé (ex.: ">>>>>End Spectral Data<<<<<") tem menos colunas
+            if not set(colunas) <= set(bloco.columns):
+                continue
+            yield (_para_numeros(bloco[colunas[0]], decimal),
+                   _para_numeros(bloco[colunas[1]], decimal))
+
+
+def _blocos_xlsx(fonte, colunas, tamanho_bloco, planilha=None):
+    import openpyxl
+
+    with _abrir(fonte) as bruto:
+        livro = openpyxl.load_workbook(bruto, read_only=True, data_only=True)
+        try:
+            folha = livro[planilha] if planilha else livro.active
+            primeira, ultima = min(colunas), max(colunas)
+            linhas = []
+            for linha in folha.iter_rows(min_col=primeira + 1, max_col=ultima + 1, values_only=True):
+                linhas.append(linha)
+                if len(linhas) == tamanho_bloco:
+                    yield _colunas_linhas(linhas, colunas, primeira)
+                    linhas = []
+            if linhas:
+                yield _colunas_linhas(linhas, colunas, primeira)
+        finally:
+            livro.close()
+
+
+def _colunas_linhas(linhas, colunas, primeira):
+    def coluna(c):
+        return [linha[c - primeira] if c - primeira < len(linha) else None for linha in linhas]
+    return _para_numeros(coluna(colunas[0]), ","), _para_numeros(coluna(colunas[1]), ",")
+
+
+def _blocos_xls(fonte, colunas, tamanho_bloco, planilha=None):
+    import xlrd
+
+    with _abrir(fonte) as bruto:
+        livro = xlrd.open_workbook(file_contents=bruto.read(), on_demand=True)
+        try:
+            folha = livro.sheet_by_name(planilha) if planilha else livro.sheet_by_index(0)
+            for inicio in range(0, folha.nrows, tamanho_bloco):
+                fim = min(inicio + tamanho_bloco, folha.nrows)
+                yield (_para_numeros(folha.col_values(colunas[0], inicio, fim), ","),
+                       _para_numeros(folha.col_values(colunas[1], inicio, fim), ","))
+        finally:
+            livro.release_resources()
+
+
+def ler_blocos(fonte, formato=None, colunas=(0, 1), tamanho_bloco=TAMANHO_BLOCO, planilha=None):
+    """Gera (wavelengths, valores) em blocos de até tamanho_bloco linhas
+
+    fonte é um caminho ou um arquivo aberto em modo binário; formato ('texto',
+    'xlsx' ou 'xls') é deduzido da extensão quando omitido. Linhas de
+    cabeçalho e rodapé não numéricas são descartadas (NaN nos blocos).
+    """
+    if formato is None:
+        nome = getattr(fonte, "name", fonte)
+        formato = FORMATOS.get(Path(str(nome)).suffix.lower())
+        if formato is None:
+            raise ValueError(f"Formato não reconhecido: {nome}")
+    if formato == "texto":
+        return _blocos_texto(fonte, colunas, tamanho_bloco)
+    if formato == "xlsx":
+        return _blocos_xlsx(fonte, colunas, tamanho_bloco, planilha)
+    if formato == "xls":
+        return _blocos_xls(fonte, colunas, tamanho_bloco, planilha)
+    raise ValueError(f"Formato não suportado: {formato}")
+
+
+def reamostrar_blocos(blocos, grade):
+    """Acumula blocos (wavelengths, valores) na grade e retorna o espectro reamostrado
+
+    Cada amostra cai no intervalo do ponto da grade mais próximo; por
+    intervalo guardam-se a soma dos valores, a dos comprimentos de onda e a
+    contagem. No fim, a média de cada intervalo preenchido é posicionada no
+    comprimento de onda médio das suas amostras e interpolada na grade, o que
+    decima medidas densas e preserva as esparsas. Retorna:
+      wavelengths  grade recortada à faixa medida
+      valores      espectro na grade
+      amostras     número de amostras válidas lidas
+    """
+    grade = np.asarray(grade, dtype=float)
+    bordas = np.concatenate(([grade[0] - (grade[1] - grade[0]) / 2],
+                             (grade[1:] + grade[:-1]) / 2,
+                             [grade[-1] + (grade[-1] - grade[-2]) / 2]))
+    soma = np.zeros(grade.size)
+    soma_wl = np.zeros(grade.size)
+    contagem = np.zeros(grade.size)
+    amostras = 0
+
+    for wl, valores in blocos:
+        validos = np.isfinite(wl) & np.isfinite(valores) & (wl >= bordas[0]) & (wl < bordas[-1])
+        wl, valores = wl[validos], valores[validos]
+        intervalo = np.searchsorted(bordas, wl, side="right") - 1
+        soma += np.bincount(intervalo, valores, minlength=grade.size)
+        soma_wl += np.bincount(intervalo, wl, minlength=grade.size)
+        contagem += np.bincount(intervalo, minlength=grade.size)
+        amostras += wl.size
+
+    preenchidos = np.flatnonzero(contagem)
+    if preenchidos.size < 2:
+        raise ValueError("Menos de dois pontos da grade com amostras na faixa canônica")
+
+    media = soma[preenchidos] / contagem[preenchidos]
+    wl_media = soma_wl[preenchidos] / contagem[preenchidos]
+    recorte = grade[preenchidos[0]:preenchidos[-1] + 1]
+    return {
+        'wavelengths': recorte,
+        'valores': np.interp(recorte, wl_media, media),
+        'amostras': amostras
+    }
+
+
+def importar_espectro(fonte, biblioteca, nome=None, tipo="irradiance", formato=None,
+                      colunas=(0, 1), passo=PASSO_CANONICO, escala=1.0,
+                      tamanho_bloco=TAMANHO_BLOCO, planilha=None):
+    """Lê uma exportação do espectrômetro, reamostra na grade canônica e anexa à biblioteca
+
+    biblioteca é o caminho do spectra_data.json cuja versão compilada recebe
+    o espectro; nome padrão é o nome do arquivo sem extensão. Retorna a
+    biblioteca atualizada e o resumo da importação.
+    """
+    arquivo = Path(str(getattr(fonte, "name", fonte))).name
+    nome = nome or Path(arquivo).stem
+    espectro = reamostrar_blocos(
+        ler_blocos(fonte, formato, tuple(colunas), tamanho_bloco, planilha),
+        grade_canonica(passo))
+
+    valores = espectro['valores'] * escala
+    atualizada = anexar_espectros(
+        biblioteca, {nome: {'wavelengths': espectro['wavelengths'], tipo: valores}},
+        {nome: {'arquivo': arquivo, 'amostras': int(espectro['amostras']), 'passo': float(passo)}})
+    return {
+        'biblioteca': atualizada,
+        'nome': nome,
+        'amostras': espectro['amostras'],
+        'pontos': espectro['wavelengths'].size,
+        'faixa': (float(espectro['wavelengths'][0]), float(espectro['wavelengths'][-1]))
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa espectros medidos para a biblioteca espectral")
+    parser.add_argument("arquivos", nargs="+", help="Exportações do espectrômetro (CSV/TXT/XLSX/XLS)")
+    parser.add_argument("--nome", default=None, help="Nome na biblioteca (apenas com um arquivo)")
+    parser.add_argument("--tipo", default="irradiance", choices=("irradiance", "absorbance"))
+    parser.add_argument("--colunas", type=int, nargs=2, default=(0, 1),
+                        help="Colunas (a partir de 0) do comprimento de onda e do valor")
+    parser.add_argument("--passo", type=float, default=PASSO_CANONICO, help="Passo da grade em nm")
+    parser.add_argument("--escala", type=float, default=1.0, help="Fator aplicado aos valores")
+    parser.add_argument("--planilha", default=None, help="Planilha (XLSX/XLS); padrão: a primeira")
+    parser.add_argument("--biblioteca", default=str(Path(__file__).parents[1] / "spectra_data.json"),
+                        help="JSON de origem da biblioteca")
+    args = parser.parse_args()
+    if args.nome and len(args.arquivos) > 1:
+        parser.error("--nome só pode ser usado com um arquivo")
+
+    for caminho in args.arquivos:
+        resumo = importar_espectro(caminho, args.biblioteca, args.nome, args.tipo,
+                                   colunas=args.colunas, passo=args.passo, escala=args.escala,
+                                   planilha=args.planilha)
+        print(f"{resumo['nome']}: {resumo['amostras']} amostras -> {resumo['pontos']} pontos "
+              f"({resumo['faixa'][0]:g}-{resumo['faixa'][1]:g} nm)")
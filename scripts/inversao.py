@@ -0,0 +1,124 @@
+"""
+inversao.py
+Solução inversa do fotoperíodo: a partir de um DLI (ou ICE) alvo por canal,
+encontra o σ da gaussiana que produz esse valor, respeitando o recorte pelos
+limites de calibração e indicando quando o alvo não é atingível.
+
+Os candidatos são avaliados com o mesmo modo de integração do motor, para
+que o σ aplicado reproduza o alvo no valor exibido. Só o σ é resolvido:
+proporções e totais são compartilhados entre os canais e ficam como estão;
+um alvo fora da faixa atingível pede ajuste manual desses parâmetros.
+"""
+
+import copy
+
+import numpy as np
+from scipy.optimize import brentq
+
+from scripts.varredura import FAIXAS_VARREDURA, varrer_parametros
+
+
+GRANDEZAS_ALVO = {
+    'DLI_final': 'DLI (mol/m²)',
+    'ICE': 'ICE (μmol/m²/s)'
+}
+
+
+def _avaliar_sigma(motor, canal, grandeza, mi, sigmas):
+    """Avalia a grandeza alvo de um canal para um vetor de σ (μ fixo)
+
+    Na integração analítica usa a varredura em forma fechada; na numérica,
+    a mesma soma de retângulos de gerar_dados_canais (sem passar pela memória
+    do motor).
+    """
+    if motor.integracao == 'analitico':
+        resultado = varrer_parametros(motor, canal, mi=[mi], sigma=sigmas)
+        return np.asarray(resultado[grandeza][0])
+    return np.array([
+        motor.gerar_dados_canais((canal,), {f'canal_{canal}': {'sigma': sigma, 'mi': mi}})[grandeza][0]
+        for sigma in np.atleast_1d(sigmas)])
+
+
+def resolver_canal(motor, canal, alvo, grandeza='DLI_final', faixa_sigma=None,
+                   n_grade=64, tolerancia=1e-6):
+    """Encontra o σ que leva um canal ao valor alvo de DLI ou ICE
+
+    O μ atual do canal é mantido. A grandeza é avaliada em uma grade de σ
+    para localizar o intervalo com troca de sinal, refinado por Brent. Se o
+    alvo está fora da faixa atingível, retorna o σ do extremo mais próximo.
+    """
+    if grandeza not in GRANDEZAS_ALVO:
+        raise ValueError(f"Grandeza alvo inválida: {grandeza}")
+
+    sigma_min, sigma_max = faixa_sigma or FAIXAS_VARREDURA['sigma']
+    mi = motor.parametros_gaussianos[f'canal_{canal}']['mi']
+
+    sigmas = np.linspace(sigma_min, sigma_max, n_grade)
+    valores = _avaliar_sigma(motor, canal, grandeza, mi, sigmas)
+    faixa = (float(valores.min()), float(valores.max()))
+
+    resultado = {
+        'canal': canal,
+        'grandeza': grandeza,
+        'alvo': float(alvo),
+        'mi': mi,
+        'faixa_atingivel': faixa
+    }
+
+    erro = valores - alvo
+    exato = np.flatnonzero(np.abs(erro) <= tolerancia)
+    troca = np.flatnonzero(np.sign(erro[:-1]) * np.sign(erro[1:]) < 0)
+
+    if exato.size:
+        sigma = sigmas[exato[0]]
+    elif troca.size:
+        i = troca[0]
+        sigma = brentq(
+            lambda s: _avaliar_sigma(motor, canal, grandeza, mi, [s])[0] - alvo,
+            sigmas[i], sigmas[i + 1], xtol=tolerancia)
+    else:
+        # Alvo inatingível: fica no σ que mais se aproxima
+        i = int(np.argmin(np.abs(erro)))
+        resultado.update({
+            'sigma': float(sigmas[i]),
+            'valor_obtido': float(valores[i]),
+            'atingivel': False,
+            'mensagem': (f"Alvo {alvo:.3f} fora da faixa atingível "
+                         f"[{faixa[0]:.3f}, {faixa[1]:.3f}] com μ={mi:.2f} "
+                         f"e σ entre {sigma_min:.2f} e {sigma_max:.2f}; ajuste proporções "
+                         f"ou totais de intensidade")
+        })
+        return resultado
+
+    valor = _avaliar_sigma(motor, canal, grandeza, mi, [sigma])[0]
+    resultado.update({
+        'sigma': float(sigma),
+        'valor_obtido': float(valor),
+        'atingivel': True,
+        'mensagem': f"σ={sigma:.3f} atinge {valor:.3f}"
+    })
+    return resultado
+
+
+def resolver_alvos(motor, alvos, grandeza='DLI_final', faixa_sigma=None):
+    """Resolve o σ de vários canais a partir de um dicionário {canal: alvo}
+
+    Retorna cópias de parametros_canais e parametros_gaussianos com os σ
+    encontrados, além do resultado de cada canal. As proporções e totais são
+    compartilhados entre canais e não são resolvidos: parametros_canais volta
+    inalterado e alvos fora da faixa de σ ficam com atingivel=False.
+    """
+    parametros_gaussianos = copy.deepcopy(motor.parametros_gaussianos)
+    resultados = {}
+
+    for canal, alvo in alvos.items():
+        resultado = resolver_canal(motor, canal, alvo, grandeza, faixa_sigma)
+        parametros_gaussianos[f'canal_{canal}']['sigma'] = resultado['sigma']
+        resultados[canal] = resultado
+
+    return {
+        'parametros_canais': copy.deepcopy(motor.parametros_canais),
+        'parametros_gaussianos': parametros_gaussianos,
+        'resultados': resultados,
+        'todos_atingiveis': all(r['atingivel'] for r in resultados.values())
+    }
@@ -0,0 +1,183 @@
+"""
+lote.py
+Exportação em lote de várias bancadas: cada configuração (dados de
+calibração e parâmetros dos canais) passa pelo motor de calibração em um
+processo próprio, gerando um pacote LAMP por bancada e uma tabela resumo.
+
+Uso:
+    python -m scripts.lote <pasta_ou_manifesto.json> --saida <pasta> [--processos N] [--resolucao S]
+"""
+
+import argparse
+import copy
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scripts.calibracao import MotorCalibracao, valores_padrao
+from scripts.pacote_lamp import PacoteLamp
+
+
+SECOES_CONFIGURACAO = ('parametros_canais', 'parametros_gaussianos', 'parametros_temporais')
+
+
+def configuracao_bancada(dados):
+    """Completa a configuração de uma bancada com os valores padrão
+
+    Canais fora do padrão (ex.: vermelho distante, UV, verde) são aceitos
+    desde que tragam a matriz de calibração completa.
+    """
+    config = valores_padrao()
+    for canal, calibracao in dados.get('dados_bancada', {}).items():
+        if canal not in config['dados_bancada']:
+            faltantes = {'dados', 'valores_referencia'} - set(calibracao)
+            if faltantes:
+                raise ValueError(
+                    f"Canal {canal} sem {', '.join(sorted(faltantes))} na bancada")
+            config['dados_bancada'][canal] = {}
+        canal_config = config['dados_bancada'][canal]
+        for chave in ('dados', 'valores_referencia'):
+            if chave in calibracao:
+                canal_config[chave] = np.asarray(calibracao[chave], dtype=float)
+        if 'espectro' in calibracao:
+            canal_config['espectro'] = calibracao['espectro']
+        if 'saidas_lamp' in calibracao:
+            canal_config['saidas_lamp'] = tuple(int(s) for s in calibracao['saidas_lamp'])
+    for secao in SECOES_CONFIGURACAO:
+        for chave, valor in dados.get(secao, {}).items():
+            if isinstance(valor, dict) and chave in config[secao]:
+                config[secao][chave].update(valor)
+            else:
+                config[secao][chave] = valor
+    return config
+
+
+def configuracao_para_json(motor, nome):
+    """Serializa a bancada atual no formato aceito pela exportação em lote"""
+    return json.dumps({
+        'nome': nome,
+        'dados_bancada': {
+            canal: {chave: np.asarray(valor).tolist() for chave, valor in calibracao.items()}
+            for canal, calibracao in motor.dados_bancada.items()
+        },
+        **{secao: copy.deepcopy(getattr(motor, secao)) for secao in SECOES_CONFIGURACAO}
+    }, indent=2, ensure_ascii=False)
+
+
+def listar_bancadas(origem):
+    """Lê as bancadas de uma pasta de JSONs ou de um manifesto
+
+    O manifesto é um JSON {"bancadas": [...]} cujos itens são caminhos
+    (relativos ao manifesto) ou configurações completas em linha.
+    """
+    origem = Path(origem)
+    if origem.is_dir():
+        itens = sorted(origem.glob('*.json'))
+    else:
+        with origem.open('r', encoding='utf-8') as f:
+            itens = [item if isinstance(item, dict) else origem.parent / item
+                     for item in json.load(f)['bancadas']]
+
+    bancadas = []
+    for i, item in enumerate(itens):
+        if isinstance(item, dict):
+            dados, nome_padrao = item, f"bancada_{i + 1:02d}"
+        else:
+            caminho = Path(item)
+            with caminho.open('r', encoding='utf-8') as f:
+                dados = json.load(f)
+            nome_padrao = caminho.stem
+        bancadas.append((dados.get('nome', nome_padrao), dados))
+    return bancadas
+
+
+def nome_arquivo_bancada(nome):
+    """Nome da bancada seguro para arquivo: sem separadores de pasta nem caracteres reservados"""
+    nome = re.sub(r'[^\w.\-]+', '_', str(nome)).strip('._')
+    return nome or 'bancada'
+
+
+def nomes_arquivos_unicos(nomes):
+    """Nomes de arquivo das bancadas; colisões após a limpeza ganham sufixo _2, _3..."""
+    usados = set()
+    arquivos = []
+    for nome in nomes:
+        base = nome_arquivo_bancada(nome)
+        arquivo, n = base, 1
+        while arquivo.lower() in usados:
+            n += 1
+            arquivo = f"{base}_{n}"
+        usados.add(arquivo.lower())
+        arquivos.append(arquivo)
+    return arquivos
+
+
+def processar_bancada(nome, dados, saida, resolucao_segundos=None, nome_arquivo=None):
+    """Calibra uma bancada, grava seu pacote LAMP e devolve as linhas do resumo"""
+    inicio = time.perf_counter()
+    try:
+        motor = MotorCalibracao(**configuracao_bancada(dados))
+        arquivo = Path(saida) / f"{nome_arquivo or nome_arquivo_bancada(nome)}.zip"
+        arquivo.write_bytes(PacoteLamp().gerar(motor, resolucao_segundos))
+        dados_canais = motor.get_dados_canais()
+    except Exception as e:
+        return [{'Bancada': nome, 'Erro': str(e)}]
+
+    duracao = time.perf_counter() - inicio
+    return [{
+        'Bancada': nome,
+        'Canal': canal.capitalize(),
+        'ICE_μmol_m2_s': round(dados_canais[canal]['ICE'], 1),
+        'DLI_mol_m2': round(dados_canais[canal]['DLI_final'], 3),
+        'Intensidade_Max': round(dados_canais[canal]['intensidade_max'], 1),
+        'Intensidade_Min': round(dados_canais[canal]['intensidade_min'], 1),
+        'R2': round(motor.regressoes[canal]['regressao_media']['r2'], 4),
+        'Arquivo': arquivo.name,
+        'Tempo_s': round(duracao, 3)
+    } for canal in motor.canais_lamp()]
+
+
+def _processar(argumentos):
+    return processar_bancada(*argumentos)
+
+
+def exportar_lote(origem, saida, processos=None, resolucao_segundos=None):
+    """Processa todas as bancadas em paralelo e grava resumo.csv na pasta de saída"""
+    saida = Path(saida)
+    saida.mkdir(parents=True, exist_ok=True)
+    bancadas = listar_bancadas(origem)
+    # Nomes distintos podem virar o mesmo arquivo (ex.: "A/B" e "A:B"); cada pacote recebe o seu
+    arquivos = nomes_arquivos_unicos(nome for nome, _ in bancadas)
+    tarefas = [(nome, dados, saida, resolucao_segundos, arquivo)
+               for (nome, dados), arquivo in zip(bancadas, arquivos)]
+
+    processos = min(processos or os.cpu_count() or 1, max(len(tarefas), 1))
+    if processos == 1:
+        linhas = [_processar(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            linhas = list(executor.map(_processar, tarefas))
+
+    resumo = pd.DataFrame([linha for grupo in linhas for linha in grupo])
+    resumo.to_csv(saida / "resumo.csv", index=False)
+    return resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportação LAMP em lote de várias bancadas")
+    parser.add_argument("origem", help="Pasta com JSONs de bancadas ou manifesto JSON")
+    parser.add_argument("--saida", default="lamp_lote", help="Pasta de saída dos pacotes")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="Número de processos (padrão: núcleos disponíveis)")
+    parser.add_argument("--resolucao", type=int, default=None,
+                        help="Segundos entre linhas da curva (padrão: arquivo compacto)")
+    args = parser.parse_args()
+
+    resumo = exportar_lote(args.origem, args.saida, args.processos, args.resolucao)
+    print(resumo.to_string(index=False))
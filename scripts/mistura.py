@@ -0,0 +1,138 @@
+"""
+mistura.py
+Mistura espectral dos LEDs com restrições: mínimos quadrados (opcionalmente
+ponderados por um espectro, ex.: absorção de um fotorreceptor) com cada
+coeficiente limitado a [inferior, superior]. O problema é reduzido às
+equações normais (k×k, k = número de canais) e resolvido por conjunto ativo;
+partindo da solução anterior o conjunto ativo costuma já estar certo, e
+re-resolver custa um único sistema k×k.
+"""
+
+import numpy as np
+
+from scripts.bandas import calcular_pfd
+
+
+def limites_mistura(leds, wavelengths, limite_max_calibracao):
+    """Limites (inferior, superior) do coeficiente de cada LED
+
+    O coeficiente multiplica o espectro do LED; o superior é o que leva o
+    PPFD (400-700 nm) do LED ao máximo medido na calibração do canal. O
+    inferior é 0 (canal desligado). LEDs sem emissão na grade ficam sem
+    limite superior.
+    """
+    ppfd_leds = calcular_pfd(leds, wavelengths, {'PPFD': (400, 700)})[..., 0]
+    limite = np.asarray(limite_max_calibracao, dtype=float)
+    com_emissao = ppfd_leds > 0
+    superior = np.where(com_emissao, limite / np.where(com_emissao, ppfd_leds, 1.0), np.inf)
+    return np.zeros_like(superior), superior
+
+
+def resolver_misturas(leds, alvos, inferior=None, superior=None, pesos=None, inicio=None,
+                      max_iteracoes=None):
+    """Mistura de vários alvos (m, n) com a mesma base de LEDs, resolvidos em conjunto
+
+    Minimiza ||√pesos·(x @ leds − alvo)||² com inferior ≤ x ≤ superior para
+    cada alvo. As equações normais (G = leds·pesos·ledsᵀ) são comuns a todos;
+    a cada iteração os alvos com o mesmo conjunto de canais livres são
+    resolvidos em um único sistema com vários lados direitos. inicio (m, k)
+    são soluções anteriores, cujos coeficientes nos limites definem o
+    conjunto ativo inicial. Retorna:
+      coeficientes  (m, k)
+      residuo       (m,) norma ponderada do erro de cada alvo
+      saturados     (m, k) coeficientes no limite superior
+      iteracoes     número de passos do conjunto ativo
+    """
+    leds = np.atleast_2d(np.asarray(leds, dtype=float))
+    alvos = np.atleast_2d(np.asarray(alvos, dtype=float))
+    k = leds.shape[0]
+    m = alvos.shape[0]
+    inferior = np.zeros(k) if inferior is None else np.broadcast_to(
+        np.asarray(inferior, dtype=float), (k,))
+    superior = np.full(k, np.inf) if superior is None else np.broadcast_to(
+        np.asarray(superior, dtype=float), (k,))
+    ponderados = leds if pesos is None else leds * np.asarray(pesos, dtype=float)
+
+    # Equações normais de cada alvo: min ½xᵀGx − hᵀx
+    G = ponderados @ leds.T
+    H = alvos @ ponderados.T
+    tolerancia = 1e-12 * np.maximum(np.abs(H).max(axis=1, initial=0.0),
+                                    max(np.abs(G).max(initial=0.0), 1.0))
+
+    if inicio is not None and np.shape(inicio) == (m, k):
+        X = np.clip(np.asarray(inicio, dtype=float), inferior, superior)
+    else:
+        X = np.tile(inferior, (m, 1))
+    # -1 no limite inferior, +1 no superior, 0 livre
+    estado = np.where(X <= inferior, -1, np.where(X >= superior, 1, 0))
+    pendentes = np.ones(m, dtype=bool)
+    linhas = np.arange(m)
+    # Padrão de canais livres de cada alvo codificado em um inteiro
+    bits = 1 << np.arange(k)
+
+    iteracoes = 0
+    for iteracoes in range(1, (max_iteracoes or 4 * k + 10) + 1):
+        livre = estado == 0
+        X = np.where(estado < 0, inferior, np.where(estado > 0, superior, X))
+
+        # Um sistema por padrão de canais livres, com todos os alvos que o compartilham
+        candidato = X.copy()
+        codigos = livre @ bits
+        for codigo in np.unique(codigos[pendentes]):
+            padrao = (codigo & bits) > 0
+            if not padrao.any():
+                continue
+            sel = linhas[pendentes & (codigos == codigo)]
+            rhs = H[np.ix_(sel, padrao)] - X[np.ix_(sel, ~padrao)] @ G[np.ix_(~padrao, padrao)]
+            candidato[np.ix_(sel, padrao)] = np.linalg.lstsq(
+                G[np.ix_(padrao, padrao)], rhs.T, rcond=None)[0].T
+
+        # Passo até o primeiro limite violado pelo candidato
+        direcao = candidato - X
+        with np.errstate(divide='ignore', invalid='ignore'):
+            passo = np.where(direcao < 0, (inferior - X) / direcao,
+                             np.where(direcao > 0, (superior - X) / direcao, np.inf))
+        passo = np.where(livre, passo, np.inf)
+        bloqueio = passo.argmin(axis=1)
+        passo_min = passo[linhas, bloqueio]
+        bloqueados = pendentes & (passo_min < 1)
+        X = np.where(bloqueados[:, None], X + np.where(bloqueados, np.maximum(passo_min, 0.0), 0.0)[:, None] * direcao,
+                     np.where(pendentes[:, None], candidato, X))
+        estado[bloqueados, bloqueio[bloqueados]] = np.where(
+            direcao[bloqueados, bloqueio[bloqueados]] < 0, -1, 1)
+
+        # Multiplicadores: no inferior o gradiente deve ser ≥ 0, no superior ≤ 0
+        otimos = pendentes & ~bloqueados
+        gradiente = X @ G - H
+        violacao = np.where(estado < 0, -gradiente, np.where(estado > 0, gradiente, 0.0))
+        liberar = violacao.argmax(axis=1)
+        convergiu = violacao[linhas, liberar] <= tolerancia
+        estado[otimos & ~convergiu, liberar[otimos & ~convergiu]] = 0
+        pendentes &= ~(otimos & convergiu)
+        if not pendentes.any():
+            break
+
+    erro = X @ leds - alvos
+    erro_quadratico = erro * erro if pesos is None else pesos * erro * erro
+    return {
+        'coeficientes': X,
+        'residuo': np.sqrt(erro_quadratico.sum(axis=1)),
+        'saturados': (estado > 0) & np.isfinite(superior),
+        'iteracoes': iteracoes
+    }
+
+
+def resolver_mistura(leds, alvo, inferior=None, superior=None, pesos=None, inicio=None,
+                     max_iteracoes=None):
+    """Mistura de um único alvo (ver resolver_misturas); inicio é a solução anterior (k,)"""
+    k = np.atleast_2d(leds).shape[0]
+    resultado = resolver_misturas(
+        leds, np.asarray(alvo, dtype=float)[None, :], inferior, superior, pesos,
+        None if inicio is None or np.shape(inicio) != (k,) else np.asarray(inicio)[None, :],
+        max_iteracoes)
+    return {
+        'coeficientes': resultado['coeficientes'][0],
+        'residuo': float(resultado['residuo'][0]),
+        'saturados': resultado['saturados'][0],
+        'iteracoes': resultado['iteracoes']
+    }
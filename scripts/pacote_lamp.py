@@ -0,0 +1,191 @@
+"""
+pacote_lamp.py
+Montagem do pacote ZIP com todos os arquivos LAMP (curva completa e ICE),
+com cache endereçado pelo conteúdo das entradas: o mesmo conjunto de
+parâmetros devolve os mesmos bytes sem reprocessar, e uma alteração só
+recodifica os arquivos dos canais afetados.
+"""
+
+import hashlib
+import io
+import zipfile
+
+import pandas as pd
+
+from scripts.calibracao import MemoBytes
+
+
+README_PACOTE = """ARQUIVOS DE CONFIGURAÇÃO LAMP - AMBOS FORMATOS
+Gerado em: {gerado_em}
+
+ESTRUTURA DO ZIP:
+├── curva_completa/        - Arquivos con curva gaussiana completa
+{estrutura_curva}
+│
+└── ice_simplificado/     - Arquivos simplificados con ICE
+{estrutura_ice}
+
+VALORES DE ICE POR CANAL:
+{valores_ice}
+
+Configurações utilizadas:
+- Intensidade Total Máxima: {intensidade_max_total} μmol/m²/s
+- Intensidade Total Mínima: {intensidade_min_total} μmol/m²/s
+- Fotoperíodo: {hora_inicio}:00 às {hora_fim}:00
+- Número de pontos: {n_pontos}
+- Resolução da curva: {resolucao}
+
+FORMATO DOS ARQUIVOS:
+
+1. Curva completa:
+HH MM SS INTENSIDADE
+(Múltiplas linhas ao longo do fotoperíodo)
+
+2. ICE simplificado:
+HH_INICIO 00 00 ICE
+HH_FIM 00 00 ICE
+(Apenas 2 linhas: início e fim con valor de ICE)
+"""
+
+
+def arquivos_lamp(motor):
+    """Pares (arquivo LAMP, canal) das saídas da bancada; saídas extras de um canal são cópias"""
+    return tuple((f"LAMP_CH{saida}.txt", canal) for saida, canal in motor.saidas_lamp())
+
+
+def _estrutura_readme(arquivos, prefixo, sufixo, largura, descricao):
+    """Linhas da árvore de arquivos do README para uma pasta do ZIP"""
+    linhas = []
+    vistos = set()
+    for i, (nome_arquivo, canal) in enumerate(arquivos):
+        ramo = "└──" if i == len(arquivos) - 1 else "├──"
+        origem = "Cópia do" if canal in vistos else "Canal"
+        vistos.add(canal)
+        nome = nome_arquivo.replace('.txt', sufixo)
+        linhas.append(f"{prefixo}{ramo} {nome:<{largura}} - {origem} {canal.capitalize()} ({descricao})")
+    return "\n".join(linhas)
+
+
+def _hash(chave):
+    """Resumo SHA-256 da representação de uma chave por valor"""
+    return hashlib.sha256(repr(chave).encode()).hexdigest()
+
+
+class PacoteLamp:
+    """Gera o ZIP dos arquivos LAMP com cache de pacotes e de arquivos individuais"""
+
+    def __init__(self, capacidade_pacotes_bytes=32 * 1024 * 1024,
+                 capacidade_membros_bytes=64 * 1024 * 1024):
+        self.pacotes = MemoBytes(capacidade_pacotes_bytes)
+        self.membros = MemoBytes(capacidade_membros_bytes)
+
+    def _chave_canal(self, motor, canal):
+        params_gauss = motor.parametros_gaussianos[f'canal_{canal}']
+        return motor.chave_canal(canal, params_gauss['sigma'], params_gauss['mi'])
+
+    def chave_pacote(self, motor, resolucao_segundos=None):
+        """Hash de todas as entradas que afetam o conteúdo do pacote"""
+        chaves = tuple(self._chave_canal(motor, canal) for canal in motor.canais)
+        return _hash((chaves, arquivos_lamp(motor), resolucao_segundos))
+
+    def _membro(self, chave, gerar):
+        """Conteúdo codificado de um arquivo, recodificado só quando a chave muda"""
+        chave = _hash(chave)
+        conteudo = self.membros.get(chave)
+        if conteudo is None:
+            conteudo = gerar()
+            self.membros.put(chave, conteudo)
+        return conteudo
+
+    def _curva(self, motor, canal, resolucao_segundos):
+        """Arquivo de curva completa de um canal"""
+        if resolucao_segundos is None:
+            dados = motor.get_dados_canal(canal)
+            return motor.gerar_conteudo_lamp(dados, motor.parametros_temporais).encode()
+        destino = io.BytesIO()
+        motor.escrever_conteudo_lamp(destino, canal, resolucao_segundos)
+        return destino.getvalue()
+
+    def _ice(self, motor, canal):
+        """Arquivo simplificado com o ICE de um canal"""
+        dados = motor.get_dados_canal(canal)
+        return motor.gerar_conteudo_lamp_ice(dados, motor.parametros_temporais).encode()
+
+    def _tabela_ice(self, dados_canais):
+        """CSV com ICE, DLI e intensidades de cada canal"""
+        ice_data = []
+        for canal_nome in dados_canais:
+            dados_canal = dados_canais[canal_nome]
+            ice_data.append({
+                'Canal': canal_nome.capitalize(),
+                'ICE_μmol_m2_s': round(dados_canal['ICE'], 1),
+                'DLI_mol_m2': round(dados_canal['DLI_final'], 3),
+                'Intensidade_Max': round(dados_canal['intensidade_max'], 1),
+                'Intensidade_Min': round(dados_canal['intensidade_min'], 1)
+            })
+        return pd.DataFrame(ice_data).to_csv(index=False)
+
+    def _readme(self, motor, resolucao_segundos):
+        """README do pacote, com o horário em que o ZIP foi gerado"""
+        params = motor.parametros_canais
+        tempo = motor.parametros_temporais
+        dados_canais = motor.get_dados_canais(motor.canais_lamp())
+        arquivos = arquivos_lamp(motor)
+        return README_PACOTE.format(
+            gerado_em=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+            estrutura_curva=_estrutura_readme(
+                arquivos, "│   ", ".txt", 17, "curva completa"),
+            estrutura_ice=_estrutura_readme(
+                arquivos, "    ", "_ICE.txt", 16, "apenas ICE"),
+            valores_ice="\n".join(
+                f"- {canal.capitalize()}: {dados['ICE']:.1f} μmol/m²/s"
+                for canal, dados in dados_canais.items()),
+            intensidade_max_total=params['intensidade_max_total'],
+            intensidade_min_total=params['intensidade_min_total'],
+            hora_inicio=tempo['hora_inicio'],
+            hora_fim=tempo['hora_fim'],
+            n_pontos=tempo['n_pontos'],
+            resolucao=("padrão (até 50 linhas)" if resolucao_segundos is None
+                       else f"{resolucao_segundos} s"))
+
+    def _montar(self, motor, resolucao_segundos):
+        """Monta o ZIP (sem o README) reaproveitando os arquivos cujos canais não mudaram"""
+        dados_canais = motor.get_dados_canais(motor.canais_lamp())
+        arquivos = arquivos_lamp(motor)
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for nome_arquivo, canal in arquivos:
+                chave = self._chave_canal(motor, canal)
+                zip_file.writestr(
+                    f"curva_completa/{nome_arquivo}",
+                    self._membro(('curva', chave, resolucao_segundos),
+                                 lambda: self._curva(motor, canal, resolucao_segundos)))
+
+            for nome_arquivo, canal in arquivos:
+                chave = self._chave_canal(motor, canal)
+                nome_ice = nome_arquivo.replace('.txt', '_ICE.txt')
+                zip_file.writestr(
+                    f"ice_simplificado/{nome_ice}",
+                    self._membro(('ice', chave), lambda: self._ice(motor, canal)))
+
+            zip_file.writestr("valores_ice.csv", self._tabela_ice(dados_canais))
+
+        return buffer.getvalue()
+
+    def gerar(self, motor, resolucao_segundos=None):
+        """Bytes do ZIP para a configuração atual, montado apenas se ainda não existir
+
+        O pacote em cache não tem README: ele é acrescentado a cada geração
+        para que o horário "Gerado em" seja o do download.
+        """
+        chave = self.chave_pacote(motor, resolucao_segundos)
+        pacote = self.pacotes.get(chave)
+        if pacote is None:
+            pacote = self._montar(motor, resolucao_segundos)
+            self.pacotes.put(chave, pacote)
+
+        buffer = io.BytesIO(pacote)
+        with zipfile.ZipFile(buffer, 'a', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("README.txt", self._readme(motor, resolucao_segundos))
+        return buffer.getvalue()
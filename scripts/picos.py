@@ -0,0 +1,85 @@
+"""
+picos.py
+Análise vetorizada de picos espectrais: posição, altura, proeminência e
+largura a meia altura (FWHM) com cruzamentos interpolados, para um espectro
+ou uma matriz inteira de espectros (um por linha) em uma única chamada.
+"""
+
+import numpy as np
+from scipy.signal import peak_prominences, peak_widths
+
+
+def _medir_picos(wl, perfil, indices):
+    """Proeminência e FWHM dos picos de um espectro, em uma passada por pico (scipy.signal)"""
+    altura = perfil[indices]
+    proeminencia = peak_prominences(perfil, indices)[0]
+
+    # FWHM em altura/2 absoluta: referência igual à altura e bases nas bordas, de modo
+    # que cada lado segue até o primeiro ponto em altura/2 (ou a borda do espectro)
+    bordas = (np.zeros_like(indices), np.full_like(indices, len(perfil) - 1))
+    _, _, esq, dir_ = peak_widths(perfil, indices, rel_height=0.5,
+                                  prominence_data=(altura, *bordas))
+    posicao = np.arange(len(perfil))
+    fwhm = np.interp(dir_, posicao, wl) - np.interp(esq, posicao, wl)
+    return altura, proeminencia, fwhm
+
+
+def analisar_picos(wavelengths, espectros, limiar=0.0, relativo=False):
+    """Encontra e mede os máximos locais estritos de cada espectro
+
+    limiar é absoluto, ou uma fração do máximo de cada espectro quando
+    relativo=True. Retorna arrays paralelos, um elemento por pico, ordenados
+    por espectro e comprimento de onda:
+      espectro      linha do espectro na matriz de entrada
+      indice        posição do pico na grade
+      wavelength    comprimento de onda do pico
+      altura        valor do espectro no pico
+      proeminencia  altura acima da maior das duas bases (definição topográfica)
+      fwhm          largura em nm entre os cruzamentos interpolados de altura/2
+    """
+    wl = np.asarray(wavelengths, dtype=float)
+    y = np.atleast_2d(np.asarray(espectros, dtype=float))
+
+    resultado = {chave: np.zeros(0, dtype=int if chave in ('espectro', 'indice') else float)
+                 for chave in ('espectro', 'indice', 'wavelength', 'altura', 'proeminencia', 'fwhm')}
+    if y.shape[1] < 3:
+        return resultado
+
+    # Máximos locais estritos a partir do limiar
+    centro = y[:, 1:-1]
+    maximo_local = (centro > y[:, :-2]) & (centro > y[:, 2:])
+    corte = limiar * np.nanmax(y, axis=1, keepdims=True) if relativo else limiar
+    maximo_local &= centro >= corte
+    linhas, colunas = np.nonzero(maximo_local)
+    if linhas.size == 0:
+        return resultado
+    indices = colunas + 1
+
+    # np.nonzero devolve as linhas em ordem: um grupo de picos por espectro
+    inicios = np.flatnonzero(np.r_[True, linhas[1:] != linhas[:-1]])
+    medidas = [_medir_picos(wl, y[linhas[i]], grupo)
+               for i, grupo in zip(inicios, np.split(indices, inicios[1:]))]
+    altura, proeminencia, fwhm = (np.concatenate(m) for m in zip(*medidas))
+
+    return {
+        'espectro': linhas,
+        'indice': indices,
+        'wavelength': wl[indices],
+        'altura': altura,
+        'proeminencia': proeminencia,
+        'fwhm': fwhm
+    }
+
+
+def picos_como_lista(resultado, espectro=0):
+    """Picos de um espectro como lista de dicionários (formato das tabelas da página)"""
+    selecionados = resultado['espectro'] == espectro
+    return [{
+        'wavelength': float(w),
+        'intensity': float(h),
+        'prominence': float(p),
+        'fwhm': float(f)
+    } for w, h, p, f in zip(resultado['wavelength'][selecionados],
+                            resultado['altura'][selecionados],
+                            resultado['proeminencia'][selecionados],
+                            resultado['fwhm'][selecionados])]
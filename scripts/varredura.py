@@ -0,0 +1,162 @@
+"""
+varredura.py
+Varredura vetorizada de parâmetros do fotoperíodo (σ, μ, proporções e
+intensidades totais) sobre o motor de calibração, em uma única operação
+NumPy com broadcast e integração analítica.
+"""
+
+import numpy as np
+import pandas as pd
+
+from scripts.calibracao import (
+    CANAIS,
+    coeficientes_gaussiana,
+    integral_total_perfil_gaussiano,
+    limites_operacao,
+)
+
+
+def parametros_varredura(canais=CANAIS):
+    """Parâmetros varríveis de uma bancada: σ, μ, proporção de cada canal e totais"""
+    return ('sigma', 'mi', *(f'proporcao_{canal}' for canal in canais),
+            'intensidade_max_total', 'intensidade_min_total')
+
+
+PARAMETROS_VARREDURA = parametros_varredura()
+
+ROTULOS_VARREDURA = {
+    'sigma': 'σ',
+    'mi': 'μ',
+    'proporcao_azul': 'Proporção Azul',
+    'proporcao_vermelho': 'Proporção Vermelho',
+    'proporcao_branco': 'Proporção Branco',
+    'intensidade_max_total': 'Máx. Total (μmol/m²/s)',
+    'intensidade_min_total': 'Mín. Total (μmol/m²/s)'
+}
+
+# Faixa das proporções, igual à dos controles da interface
+FAIXA_PROPORCAO = (1.0, 5.0)
+
+# Faixas padrão de cada eixo, iguais às dos controles da interface
+FAIXAS_VARREDURA = {
+    'sigma': (0.1, 1.0),
+    'mi': (-1.0, 1.0),
+    'proporcao_azul': FAIXA_PROPORCAO,
+    'proporcao_vermelho': FAIXA_PROPORCAO,
+    'proporcao_branco': FAIXA_PROPORCAO,
+    'intensidade_max_total': (0.0, 2000.0),
+    'intensidade_min_total': (0.0, 1000.0)
+}
+
+
+def rotulo_varredura(nome):
+    """Rótulo de um parâmetro varrível, gerado para as proporções de canais extras"""
+    if nome in ROTULOS_VARREDURA:
+        return ROTULOS_VARREDURA[nome]
+    if nome.startswith('proporcao_'):
+        return f"Proporção {nome[len('proporcao_'):].replace('_', ' ').capitalize()}"
+    return nome
+
+
+def faixa_varredura(nome):
+    """Faixa padrão de um eixo; proporções de canais extras usam FAIXA_PROPORCAO"""
+    if nome in FAIXAS_VARREDURA:
+        return FAIXAS_VARREDURA[nome]
+    if nome.startswith('proporcao_'):
+        return FAIXA_PROPORCAO
+    raise ValueError(f"Parâmetro de varredura desconhecido: {nome}")
+
+
+METRICAS_VARREDURA = {
+    'DLI_final': 'DLI (mol/m²)',
+    'ICE': 'ICE (μmol/m²/s)',
+    'pico_ppfd': 'Pico PPFD (μmol/m²/s)'
+}
+
+
+def valores_atuais(motor, canal):
+    """Valores correntes de cada parâmetro varrível para um canal"""
+    gauss = motor.parametros_gaussianos[f'canal_{canal}']
+    params = motor.parametros_canais
+    valores = {'sigma': gauss['sigma'], 'mi': gauss['mi']}
+    for nome in parametros_varredura(motor.canais)[2:]:
+        valores[nome] = params[nome]
+    return valores
+
+
+def varrer_parametros(motor, canal, **grades):
+    """Avalia DLI, ICE e pico de PPFD de um canal em toda a grade de parâmetros
+
+    Cada argumento nomeado (ver parametros_varredura) recebe uma sequência de
+    valores e vira um eixo do resultado, na ordem em que foi passado. Os
+    parâmetros omitidos ficam fixos nos valores atuais do motor.
+    """
+    desconhecidos = set(grades) - set(parametros_varredura(motor.canais))
+    if desconhecidos:
+        raise ValueError(
+            f"Parâmetros de varredura desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    dims = tuple(grades)
+    coords = {nome: np.atleast_1d(np.asarray(grades[nome], dtype=float)) for nome in dims}
+
+    # Cada parâmetro varrido ocupa seu próprio eixo; os demais são escalares
+    valores = {nome: np.asarray(valor, dtype=float)
+               for nome, valor in valores_atuais(motor, canal).items()}
+    for eixo, nome in enumerate(dims):
+        forma = [1] * len(dims)
+        forma[eixo] = -1
+        valores[nome] = coords[nome].reshape(forma)
+
+    reg = motor.regressoes[canal]
+    a = reg['regressao_media']['a']
+    b = reg['regressao_media']['b']
+    limite_max = reg['limite_max_calibracao']
+    limite_min = reg['limite_min_calibracao']
+
+    soma_proporcoes = sum(valores[f'proporcao_{c}'] for c in motor.canais)
+    proporcao_canal = valores[f'proporcao_{canal}'] / soma_proporcoes
+
+    intensidade_max, intensidade_min, valor_max_norm, valor_min_norm = limites_operacao(
+        proporcao_canal, valores['intensidade_max_total'], valores['intensidade_min_total'],
+        a, b, limite_max, limite_min)
+
+    p, q = coeficientes_gaussiana(
+        valores['sigma'], valores['mi'], valor_max_norm, valor_min_norm, a, b)
+    integral_x = integral_total_perfil_gaussiano(
+        valores['sigma'], valores['mi'], p, q, limite_min, limite_max)
+
+    # O perfil é monotônico na gaussiana: o pico está em um dos extremos
+    pico = np.maximum(np.clip(a * valor_max_norm + b, limite_min, limite_max),
+                      np.clip(a * valor_min_norm + b, limite_min, limite_max))
+
+    tempo = motor.parametros_temporais
+    fotoperiodo_segundos = (tempo['hora_fim'] - tempo['hora_inicio']) * 3600
+    forma = tuple(coords[nome].size for nome in dims)
+    if fotoperiodo_segundos > 0:
+        # dt = (fotoperíodo / 2) dx; ICE é a média da intensidade no domínio
+        dli = integral_x * (fotoperiodo_segundos / 2) / 1_000_000
+        ice = integral_x / 2
+    else:
+        dli = np.zeros(forma)
+        ice = np.zeros(forma)
+
+    return {
+        'canal': canal,
+        'dims': dims,
+        'coords': coords,
+        'DLI_final': np.broadcast_to(dli, forma),
+        'ICE': np.broadcast_to(ice, forma),
+        'pico_ppfd': np.broadcast_to(pico, forma),
+        'intensidade_max': np.broadcast_to(intensidade_max, forma),
+        'intensidade_min': np.broadcast_to(intensidade_min, forma)
+    }
+
+
+def varredura_para_dataframe(resultado):
+    """Converte o resultado da varredura em tabela longa (uma linha por configuração)"""
+    dims = resultado['dims']
+    malhas = np.meshgrid(*(resultado['coords'][nome] for nome in dims), indexing='ij')
+    colunas = {nome: malha.ravel() for nome, malha in zip(dims, malhas)}
+    for metrica in METRICAS_VARREDURA:
+        colunas[metrica] = np.ravel(resultado[metrica])
+    return pd.DataFrame(colunas)